@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from pathlib import Path
+from typing import Dict, List, Any
+
+from profiling import is_admin, list_profiles, PROFILE_SUFFIX
+from settings import PROFILING_DIR
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Dependency to require the admin token
+def require_admin(x_admin_token: str = Header("")):
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def get_profiles() -> List[Dict[str, Any]]:
+    """List recent request profiles, newest first"""
+    return list_profiles()
+
+@router.get("/profiles/{name}", dependencies=[Depends(require_admin)])
+async def get_profile(name: str):
+    """Download a profile; open it at https://www.speedscope.app"""
+    path = Path(PROFILING_DIR) / name
+    if not name.endswith(PROFILE_SUFFIX) or path.name != name or not path.exists():
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return FileResponse(path, media_type="application/json")
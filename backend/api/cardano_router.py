@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, List, Any
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, List, Any, Optional
 import logging
 from cardano.cardano_service import CardanoService
+from cardano.token_registry import find_tokens
+from database import get_database
 
 router = APIRouter(prefix="/cardano", tags=["cardano"])
 logger = logging.getLogger(__name__)
@@ -61,6 +63,64 @@ async def get_asset_info(
         logger.error(f"Error getting asset info: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting asset info: {str(e)}")
 
+@router.get("/asset/{asset}/stats")
+async def get_asset_stats(
+    asset: str,
+    exact: bool = False,
+    cardano_service: CardanoService = Depends(get_cardano_service)
+) -> Dict[str, Any]:
+    """Get mint/burn, transaction and address counts for an asset"""
+    try:
+        return await cardano_service.get_asset_stats(asset, exact=exact)
+    except Exception as e:
+        logger.error(f"Error getting asset stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting asset stats: {str(e)}")
+
+@router.get("/asset/{asset}/history")
+async def get_asset_history(
+    asset: str,
+    page: int = Query(1, ge=1),
+    count: int = Query(100, ge=1, le=100),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cardano_service: CardanoService = Depends(get_cardano_service)
+) -> List[Dict[str, Any]]:
+    """Get one page of an asset's mint and burn history"""
+    try:
+        return await cardano_service.get_asset_history(asset, page=page, count=count, order=order)
+    except Exception as e:
+        logger.error(f"Error getting asset history: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting asset history: {str(e)}")
+
+@router.get("/asset/{asset}/transactions")
+async def get_asset_transactions(
+    asset: str,
+    page: int = Query(1, ge=1),
+    count: int = Query(100, ge=1, le=100),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cardano_service: CardanoService = Depends(get_cardano_service)
+) -> List[Dict[str, Any]]:
+    """Get one page of the transactions involving an asset"""
+    try:
+        return await cardano_service.get_asset_transactions(asset, page=page, count=count, order=order)
+    except Exception as e:
+        logger.error(f"Error getting asset transactions: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting asset transactions: {str(e)}")
+
+@router.get("/asset/{asset}/addresses")
+async def get_asset_addresses(
+    asset: str,
+    page: int = Query(1, ge=1),
+    count: int = Query(100, ge=1, le=100),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cardano_service: CardanoService = Depends(get_cardano_service)
+) -> List[Dict[str, Any]]:
+    """Get one page of the addresses holding an asset"""
+    try:
+        return await cardano_service.get_asset_addresses(asset, page=page, count=count, order=order)
+    except Exception as e:
+        logger.error(f"Error getting asset addresses: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting asset addresses: {str(e)}")
+
 @router.get("/parameters")
 async def get_protocol_parameters(
     cardano_service: CardanoService = Depends(get_cardano_service)
@@ -86,12 +146,14 @@ async def get_pools(
 
 @router.get("/tokens")
 async def get_tokens(
-    limit: int = 10,
-    cardano_service: CardanoService = Depends(get_cardano_service)
+    limit: int = Query(10, ge=1, le=100),
+    page: int = Query(1, ge=1),
+    search: Optional[str] = None,
+    db = Depends(get_database)
 ) -> List[Dict[str, Any]]:
-    """Get a list of registered tokens"""
+    """Get a list of registered tokens from the synced token registry"""
     try:
-        return await cardano_service.get_token_registry(limit=limit)
+        return await find_tokens(db, limit=limit, page=page, search=search)
     except Exception as e:
         logger.error(f"Error getting tokens: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting tokens: {str(e)}")
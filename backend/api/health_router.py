@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from typing import Dict, Any
+
+from database import get_database
+from readiness import check_readiness
+
+router = APIRouter(tags=["health"])
+
+@router.get("/health")
+async def health() -> Dict[str, Any]:
+    """Liveness check: the worker is up and serving requests"""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def ready(db = Depends(get_database)):
+    """Readiness check: MongoDB and Blockfrost are reachable and every worker's caches are warm"""
+    result = await check_readiness(db)
+    return JSONResponse(result, status_code=200 if result["ready"] else 503)
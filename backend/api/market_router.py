@@ -1,172 +1,459 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from typing import Dict, List, Any
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import TYPE_CHECKING, Dict, List, Any, Iterable, Optional, Tuple
+import asyncio
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime
-import os
+from datetime import datetime, timedelta, timezone
 
-from api.models import Market, MarketCreate, MarketUpdate
+from database import get_database
+
+from api.models import Market, MarketCreate, MarketUpdate, MarketBulkUpdateItem, MarketBatchGet, BulkItemResult, OraclePrice
+from api.responses import FastJSONResponse, MARKET_PROJECTION, NO_ID, PRIVATE_MARKET_FIELDS, cache_headers, validator_headers, is_not_modified
+from markets.version import markets_version, new_write_id, version_filter, versioned_update
+from markets.kernels import compute_market_stats
+from markets.broadcaster import market_broadcaster
+from markets.recommendations import find_recommendations, recommend
+from markets.derived import derive_fields, derive_updates, rate_derived_updates
+from markets.history import ROLLUPS as HISTORY_ROLLUPS, get_history, record_snapshots
+from markets.rolling import rolling_analytics
+from markets.prices import ingest_prices
+from positions.exposure import get_exposure
+from settings import MARKET_STREAM_HEARTBEAT, MARKETS_BULK_MAX_ITEMS
+
+# pymongo is imported where it is used, so it stays out of the server's import time
+if TYPE_CHECKING:
+    from pymongo.errors import BulkWriteError
 
 router = APIRouter(prefix="/markets", tags=["markets"])
 logger = logging.getLogger(__name__)
 
+# Attempts at a write pinned to the version it was computed from, before giving up on a busy market
+WRITE_ATTEMPTS = 3
+
 # Dependency to get MongoDB
 def get_db():
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[os.environ['DB_NAME']]
-    return db
+    return get_database()
+
+def check_bulk_size(items: List[Any]) -> None:
+    if len(items) > MARKETS_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MARKETS_BULK_MAX_ITEMS} items per bulk request")
+
+def reject_rate_derived_fields(update_data: Dict[str, Any], item: Optional[int] = None) -> None:
+    """422 for fields the rate model would overwrite on write"""
+    fields = rate_derived_updates(update_data)
+    if fields:
+        where = f"Item {item}: " if item is not None else ""
+        raise HTTPException(
+            status_code=422,
+            detail=f"{where}{', '.join(fields)} are derived from the rate model; update rate_model or the supply/borrow totals instead",
+        )
+
+def apply_write_errors(results: List[BulkItemResult], positions: List[int], error: "BulkWriteError") -> None:
+    """Mark the items whose operations failed in an unordered bulk_write"""
+    for write_error in error.details.get("writeErrors", []):
+        result = results[positions[write_error["index"]]]
+        result.status = "duplicate" if write_error.get("code") == 11000 else "error"
+        result.error = write_error.get("errmsg")
+
+def parse_if_match(value: Optional[str]) -> Optional[int]:
+    """Read the expected market version from an If-Match header ("3", W/"3" or *)"""
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must carry a market version")
+
+def market_etag(market: Dict[str, Any]) -> str:
+    """ETag of a single market: its version, in the form If-Match accepts"""
+    return f'"{market.get("version", 1)}"'
+
+async def raise_precondition_failed(db, market_id: str, expected_version: Optional[int]) -> None:
+    """Explain why a version-pinned write matched nothing
+
+    404 if the market is gone, 412 if it is no longer at the If-Match
+    version, and 409 if an unconditional (If-Match: *) write lost a race.
+    Only runs on the failure path, so successful writes pay no extra read.
+    """
+    current = await db.markets.find_one({"id": market_id}, {"version": 1, "_id": 0})
+    if not current:
+        raise HTTPException(status_code=404, detail=f"Market with ID {market_id} not found")
+    if expected_version is None:
+        raise HTTPException(status_code=409, detail=f"Market {market_id} was modified while the update was applied; retry")
+    raise HTTPException(
+        status_code=412,
+        detail=f"Market {market_id} was modified; expected version {expected_version}, current version {current.get('version', 1)}",
+    )
+
+async def get_validators(request: Request, db, surrogate_keys: Iterable[str]) -> Tuple[Dict[str, str], Optional[Response]]:
+    """Build caching headers from the markets version, plus a 304 response if the client is current
+
+    The version is cached per worker, so a matching request is answered
+    without querying the markets collection or serializing anything.
+    """
+    version, updated_at = await markets_version.current(db)
+    etag = f'W/"markets-{version}"'
+    headers = {**cache_headers(surrogate_keys), **validator_headers(etag, updated_at)}
+    if is_not_modified(request, etag, updated_at):
+        return headers, Response(status_code=304, headers=headers)
+    return headers, None
 
 @router.get("/")
-async def get_markets(db = Depends(get_db)) -> List[Market]:
+async def get_markets(request: Request, db = Depends(get_db)) -> List[Market]:
     """Get all markets"""
     try:
-        markets = await db.markets.find().to_list(1000)
-        return [Market(**market) for market in markets]
+        headers, not_modified = await get_validators(request, db, ["markets"])
+        if not_modified:
+            return not_modified
+        
+        markets = await db.markets.find({}, MARKET_PROJECTION).to_list(1000)
+        return FastJSONResponse([rolling_analytics.with_metrics(market) for market in markets], headers=headers)
     except Exception as e:
         logger.error(f"Error getting markets: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting markets: {str(e)}")
 
 @router.get("/stats/overview")
-async def get_market_stats(db = Depends(get_db)) -> Dict[str, Any]:
+async def get_market_stats(request: Request, response: Response, db = Depends(get_db)) -> Dict[str, Any]:
     """Get aggregate market statistics"""
     try:
+        headers, not_modified = await get_validators(request, db, ["markets", "market-stats"])
+        if not_modified:
+            return not_modified
+        response.headers.update(headers)
+        
         # Get all markets
-        markets = await db.markets.find().to_list(1000)
+        markets = await db.markets.find({}, NO_ID).to_list(1000)
+        return compute_market_stats(markets)
+    except Exception as e:
+        logger.error(f"Error getting market stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting market stats: {str(e)}")
+
+@router.get("/recommendations")
+async def get_market_recommendations(
+    request: Request,
+    k: int = Query(3, ge=1, le=50, description="Markets per recommendation list"),
+    min_liquidity_usd: float = Query(0, ge=0, description="Only markets with at least this much liquidity"),
+    collateral_only: bool = Query(False, description="Only markets usable as collateral"),
+    db = Depends(get_db)
+) -> Dict[str, Any]:
+    """Get market recommendations based on current conditions
+
+    Markets are ranked by the risk-adjusted scores stored when they are
+    written. Served by heap selection over the worker's in-memory market
+    snapshot when it is current, otherwise by top-k reads of the score indexes.
+    """
+    try:
+        headers, not_modified = await get_validators(request, db, ["markets", "market-recommendations"])
+        if not_modified:
+            return not_modified
         
-        if not markets:
-            return {
-                "total_supply": 0,
-                "total_borrow": 0,
-                "markets_count": 0,
-                "avg_supply_rate": 0,
-                "avg_borrow_rate": 0,
-                "top_markets": []
-            }
-            
-        # Calculate aggregate statistics
-        total_supply = sum(float(market["total_supply"]) for market in markets)
-        total_borrow = sum(float(market["total_borrow"]) for market in markets)
+        version, _ = await markets_version.current(db)
+        markets = market_broadcaster.markets_at(version)
+        if markets is None:
+            recommendations = await find_recommendations(db, k, min_liquidity_usd, collateral_only)
+        else:
+            recommendations = recommend(markets, k, min_liquidity_usd, collateral_only)
+        return FastJSONResponse(recommendations, headers=headers)
+    except Exception as e:
+        logger.error(f"Error getting market recommendations: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting market recommendations: {str(e)}")
+
+@router.get("/exposure")
+async def get_asset_exposure(asset_id: Optional[List[str]] = Query(None), db = Depends(get_db)) -> Dict[str, Any]:
+    """Per-asset holder counts, summed amounts and health factor histograms
+
+    Read from counters maintained as positions change, one small document
+    per asset, instead of scanning user_positions.
+    """
+    try:
+        return FastJSONResponse({"assets": await get_exposure(db, asset_id)})
+    except Exception as e:
+        logger.error(f"Error getting asset exposure: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting asset exposure: {str(e)}")
+
+@router.get("/bootstrap")
+async def get_market_bootstrap(request: Request, db = Depends(get_db)) -> Dict[str, Any]:
+    """Get markets, stats and recommendations in one response for the dashboard
+
+    The markets collection is read once. The returned version matches the
+    ETag and the version carried by /markets/stream events.
+    """
+    try:
+        headers, not_modified = await get_validators(request, db, ["markets"])
+        if not_modified:
+            return not_modified
         
-        markets_with_supply = [m for m in markets if float(m["total_supply"]) > 0]
-        markets_with_borrow = [m for m in markets if float(m["total_borrow"]) > 0]
+        version, _ = await markets_version.current(db)
+        markets = await db.markets.find({}, MARKET_PROJECTION).to_list(1000)
+        return FastJSONResponse({
+            "version": version,
+            "markets": [rolling_analytics.with_metrics(market) for market in markets],
+            "stats": compute_market_stats(markets),
+            "recommendations": recommend(markets),
+        }, headers=headers)
+    except Exception as e:
+        logger.error(f"Error getting market bootstrap: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting market bootstrap: {str(e)}")
+
+@router.get("/stream")
+async def stream_markets(request: Request):
+    """Stream market changes and recomputed stats as Server-Sent Events
+
+    The first event is a full snapshot; later "markets" events carry the
+    changed and removed markets plus fresh stats and recommendations.
+    Markets have the same fields as in GET /markets.
+    """
+    if not market_broadcaster.ready:
+        raise HTTPException(status_code=503, detail="Market stream is not ready")
+    
+    queue = market_broadcaster.subscribe()
+    
+    async def events():
+        try:
+            yield market_broadcaster.snapshot_message()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=MARKET_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    # Dropped for falling behind; the client reconnects and gets a new snapshot
+                    break
+                yield message
+        finally:
+            market_broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/batch-get")
+async def batch_get_markets(batch: MarketBatchGet, db = Depends(get_db)) -> Dict[str, Any]:
+    """Get several markets by ID in one query"""
+    check_bulk_size(batch.ids)
+    try:
+        markets = await db.markets.find({"id": {"$in": batch.ids}}, MARKET_PROJECTION).to_list(len(batch.ids))
+        found = {market["id"] for market in markets}
+        return FastJSONResponse({
+            "markets": [rolling_analytics.with_metrics(market) for market in markets],
+            "missing": [market_id for market_id in batch.ids if market_id not in found],
+        })
+    except Exception as e:
+        logger.error(f"Error getting markets in batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting markets in batch: {str(e)}")
+
+@router.post("/bulk")
+async def create_markets_bulk(markets: List[MarketCreate], db = Depends(get_db)) -> Dict[str, Any]:
+    """Create many markets with one unordered bulk write"""
+    from pymongo import InsertOne
+    from pymongo.errors import BulkWriteError
+    check_bulk_size(markets)
+    try:
+        results = [BulkItemResult(index=i, status="created") for i in range(len(markets))]
+        
+        # Skip assets that already have a market, or appear twice in the request
+        asset_ids = [market.asset_id for market in markets]
+        existing = {doc["asset_id"] async for doc in db.markets.find({"asset_id": {"$in": asset_ids}}, {"asset_id": 1, "_id": 0})}
         
-        avg_supply_rate = sum(m["supply_apy"] for m in markets_with_supply) / len(markets_with_supply) if markets_with_supply else 0
-        avg_borrow_rate = sum(m["borrow_apy"] for m in markets_with_borrow) / len(markets_with_borrow) if markets_with_borrow else 0
+        positions, documents = [], []
+        for i, market in enumerate(markets):
+            if market.asset_id in existing:
+                results[i].status = "duplicate"
+                results[i].error = f"Market for asset {market.asset_id} already exists"
+                continue
+            existing.add(market.asset_id)
+            
+            new_market = Market(**market.dict())
+            results[i].id = new_market.id
+            documents.append(new_market.dict())
+            positions.append(i)
         
-        # Sort markets by total supply for top markets
-        sorted_markets = sorted(markets, key=lambda x: x["total_supply"], reverse=True)
-        top_markets = [{"id": m["id"], "asset_id": m["asset_id"], "name": m["name"], "total_supply": m["total_supply"]} 
-                      for m in sorted_markets[:5]]
+        # Rates and scores for the whole batch in one pass
+        derive_fields(documents)
+        operations = [InsertOne(document) for document in documents]
+        
+        if operations:
+            try:
+                await db.markets.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                apply_write_errors(results, positions, e)
+            created = [document for document, i in zip(documents, positions) if results[i].status == "created"]
+            await record_snapshots(db, created)
+            await markets_version.bump(db)
         
         return {
-            "total_supply": total_supply,
-            "total_borrow": total_borrow,
-            "markets_count": len(markets),
-            "avg_supply_rate": avg_supply_rate,
-            "avg_borrow_rate": avg_borrow_rate,
-            "top_markets": top_markets
+            "created": sum(1 for result in results if result.status == "created"),
+            "results": [result.dict() for result in results],
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting market stats: {e}")
-        raise HTTPException(status_code=500, detail=f"Error getting market stats: {str(e)}")
+        logger.error(f"Error creating markets in bulk: {e}")
+        raise HTTPException(status_code=500, detail=f"Error creating markets in bulk: {str(e)}")
 
-@router.get("/recommendations")
-async def get_market_recommendations(db = Depends(get_db)) -> Dict[str, Any]:
-    """Get market recommendations based on current conditions"""
+@router.put("/bulk")
+async def update_markets_bulk(items: List[MarketBulkUpdateItem], db = Depends(get_db)) -> Dict[str, Any]:
+    """Apply many market updates with one unordered bulk write
+
+    Items that carry a version only apply to that version of their market and
+    are reported as "conflict" otherwise; items without one are unconditional.
+    Rates and scores are written in the same update as the item's fields.
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+    check_bulk_size(items)
+    updates = [{k: v for k, v in item.update.dict().items() if v is not None} for item in items]
+    for i, update_data in enumerate(updates):
+        reject_rate_derived_fields(update_data, i)
     try:
-        # Get all markets
-        markets = await db.markets.find().to_list(1000)
+        results = [BulkItemResult(index=i, id=item.id, status="updated") for i, item in enumerate(items)]
+        now = datetime.utcnow()
+        write_ids, pending = [], list(range(len(items)))
         
-        if not markets:
-            return {
-                "best_supply_opportunities": [],
-                "best_borrow_opportunities": [],
-                "safest_supply_markets": [],
-                "overall_recommendation": None
-            }
+        # Each round derives from the markets as read and pins the writes to those versions;
+        # items that lose a race with another writer are recomputed in the next round
+        for _ in range(WRITE_ATTEMPTS):
+            ids = list({items[i].id for i in pending})
+            current = {doc["id"]: doc async for doc in db.markets.find({"id": {"$in": ids}}, NO_ID)}
             
-        # Find best supply opportunities (highest APY)
-        supply_opportunities = sorted(
-            [m for m in markets if m["can_supply"] and m["is_active"]], 
-            key=lambda x: x["supply_apy"], 
-            reverse=True
-        )[:3]
-        
-        # Find best borrowing opportunities (lowest APY)
-        borrow_opportunities = sorted(
-            [m for m in markets if m["can_borrow"] and m["is_active"]], 
-            key=lambda x: x["borrow_apy"]
-        )[:3]
+            positions = []
+            for i in pending:
+                market = current.get(items[i].id)
+                if market is None:
+                    results[i].status = "not_found"
+                    results[i].error = f"Market with ID {items[i].id} not found"
+                elif items[i].version is not None and market.get("version", 1) != items[i].version:
+                    results[i].status = "conflict"
+                    results[i].error = f"Market {items[i].id} was modified; expected version {items[i].version}"
+                else:
+                    positions.append(i)
+            if not positions:
+                break
+            
+            write_id = new_write_id()
+            write_ids.append(write_id)
+            markets = [current[items[i].id] for i in positions]
+            fields = derive_updates(markets, [{**updates[i], "updated_at": now, "write_id": write_id} for i in positions])
+            operations = [
+                UpdateOne(version_filter(market["id"], market.get("version", 1)), versioned_update(update))
+                for market, update in zip(markets, fields)
+            ]
+            try:
+                await db.markets.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                apply_write_errors(results, positions, e)
+            
+            # The markets carrying this round's write ID are the ones updated
+            written = {doc["id"] async for doc in db.markets.find({"id": {"$in": ids}, "write_id": write_id}, {"id": 1, "_id": 0})}
+            pending = [i for i in positions if results[i].status == "updated" and items[i].id not in written]
+            if not pending:
+                break
         
-        # Find safest markets (highest collateral factor)
-        safest_markets = sorted(
-            [m for m in markets if m["can_supply"] and m["is_active"]], 
-            key=lambda x: x["collateral_factor"], 
-            reverse=True
-        )[:3]
+        for i in pending:
+            results[i].status = "conflict"
+            results[i].error = f"Market {items[i].id} kept changing; retry the update"
         
-        # Calculate current market conditions
-        markets_with_supply = [m for m in markets if float(m["total_supply"]) > 0]
-        avg_supply_rate = sum(m["supply_apy"] for m in markets_with_supply) / len(markets_with_supply) if markets_with_supply else 0
+        if write_ids:
+            query = {"id": {"$in": [item.id for item in items]}, "write_id": {"$in": write_ids}}
+            updated = await db.markets.find(query, NO_ID).to_list(len(items))
+            if updated:
+                await record_snapshots(db, updated)
+                await markets_version.bump(db)
         
-        # Determine overall market recommendation
-        if avg_supply_rate > 5:
-            overall_rec = "Market supply rates are high - good time to supply assets"
-        elif avg_supply_rate < 2:
-            overall_rec = "Market supply rates are low - might be better to look for other opportunities"
-        else:
-            overall_rec = "Market conditions are balanced - consider both supply and borrow options"
-            
         return {
-            "best_supply_opportunities": [
-                {
-                    "id": m["id"],
-                    "name": m["name"],
-                    "supply_apy": m["supply_apy"],
-                    "total_supply": m["total_supply"],
-                    "liquidity": m["liquidity"]
-                } for m in supply_opportunities
-            ],
-            "best_borrow_opportunities": [
-                {
-                    "id": m["id"],
-                    "name": m["name"],
-                    "borrow_apy": m["borrow_apy"],
-                    "total_borrow": m["total_borrow"],
-                    "liquidity": m["liquidity"]
-                } for m in borrow_opportunities
-            ],
-            "safest_supply_markets": [
-                {
-                    "id": m["id"],
-                    "name": m["name"],
-                    "collateral_factor": m["collateral_factor"],
-                    "supply_apy": m["supply_apy"],
-                    "liquidity": m["liquidity"]
-                } for m in safest_markets
-            ],
-            "overall_recommendation": overall_rec
+            "updated": sum(1 for result in results if result.status == "updated"),
+            "results": [result.dict() for result in results],
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error getting market recommendations: {e}")
-        raise HTTPException(status_code=500, detail=f"Error getting market recommendations: {str(e)}")
+        logger.error(f"Error updating markets in bulk: {e}")
+        raise HTTPException(status_code=500, detail=f"Error updating markets in bulk: {str(e)}")
+
+@router.post("/prices")
+async def ingest_market_prices(prices: List[OraclePrice], db = Depends(get_db)) -> Dict[str, Any]:
+    """Apply a batch of oracle prices with one bulk write
+
+    Prices that moved less than PRICE_MIN_CHANGE are skipped. USD values,
+    rates and scores are written with each price, and the markets version
+    changes once for the whole batch.
+    """
+    check_bulk_size(prices)
+    try:
+        outcomes = await ingest_prices(db, [price.dict() for price in prices])
+        results = [BulkItemResult(index=i, **outcome) for i, outcome in enumerate(outcomes)]
+        return {
+            "updated": sum(1 for result in results if result.status == "updated"),
+            "skipped": sum(1 for result in results if result.status == "skipped"),
+            "results": [result.dict() for result in results],
+        }
+    except Exception as e:
+        logger.error(f"Error ingesting market prices: {e}")
+        raise HTTPException(status_code=500, detail=f"Error ingesting market prices: {str(e)}")
+
+@router.get("/{market_id}/history")
+async def get_market_history(
+    market_id: str,
+    start: Optional[datetime] = Query(None, alias="from", description="Start of the range (UTC); defaults to 24 hours before to"),
+    end: Optional[datetime] = Query(None, alias="to", description="End of the range (UTC); defaults to now"),
+    resolution: Optional[str] = Query(None, description="Rollup to read (1m, 1h or 1d); picked from the range by default"),
+    db = Depends(get_db)
+) -> Dict[str, Any]:
+    """Get APY, utilization and price history for a market
+
+    Long ranges are served from coarser rollups, so every response stays
+    within MARKET_HISTORY_MAX_POINTS points.
+    """
+    # Stored times are naive UTC
+    end = end.astimezone(timezone.utc).replace(tzinfo=None) if end and end.tzinfo else end or datetime.utcnow()
+    start = start.astimezone(timezone.utc).replace(tzinfo=None) if start and start.tzinfo else start or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    if resolution is not None and resolution not in HISTORY_ROLLUPS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(HISTORY_ROLLUPS)}")
+    try:
+        if not await db.markets.find_one({"id": market_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail=f"Market with ID {market_id} not found")
+        return FastJSONResponse(await get_history(db, market_id, start, end, resolution))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting market history: {e}")
+        raise HTTPException(status_code=500, detail=f"Error getting market history: {str(e)}")
 
 @router.get("/{market_id}")
-async def get_market(market_id: str, db = Depends(get_db)) -> Market:
-    """Get a specific market by ID"""
+async def get_market(market_id: str, request: Request, db = Depends(get_db)) -> Market:
+    """Get a specific market by ID
+
+    Validators come from the market itself, so a conditional request for a
+    missing market is still a 404 and the ETag can be sent back as If-Match.
+    """
     try:
-        market = await db.markets.find_one({"id": market_id})
+        market = await db.markets.find_one({"id": market_id}, MARKET_PROJECTION)
         if not market:
             raise HTTPException(status_code=404, detail=f"Market with ID {market_id} not found")
-        return Market(**market)
+        
+        etag = market_etag(market)
+        updated_at = market.get("updated_at") or market["created_at"]
+        headers = {**cache_headers(["markets", f"market-{market_id}"]), **validator_headers(etag, updated_at)}
+        if is_not_modified(request, etag, updated_at):
+            return Response(status_code=304, headers=headers)
+        return FastJSONResponse(rolling_analytics.with_metrics(market), headers=headers)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting market: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting market: {str(e)}")
 
-@router.post("/")
+@router.post("/", response_model_exclude=PRIVATE_MARKET_FIELDS)
 async def create_market(market: MarketCreate, db = Depends(get_db)) -> Market:
     """Create a new market"""
     try:
@@ -176,9 +463,12 @@ async def create_market(market: MarketCreate, db = Depends(get_db)) -> Market:
             raise HTTPException(status_code=400, detail=f"Market for asset {market.asset_id} already exists")
         
         # Create new market
-        new_market = Market(**market.dict())
-        await db.markets.insert_one(new_market.dict())
-        return new_market
+        document = Market(**market.dict()).dict()
+        derive_fields([document])
+        await db.markets.insert_one(document)
+        await record_snapshots(db, [document])
+        await markets_version.bump(db)
+        return Market(**document)
     except HTTPException:
         raise
     except Exception as e:
@@ -186,26 +476,50 @@ async def create_market(market: MarketCreate, db = Depends(get_db)) -> Market:
         raise HTTPException(status_code=500, detail=f"Error creating market: {str(e)}")
 
 @router.put("/{market_id}")
-async def update_market(market_id: str, market: MarketUpdate, db = Depends(get_db)) -> Market:
-    """Update a market"""
+async def update_market(market_id: str, market: MarketUpdate, request: Request, db = Depends(get_db)) -> Market:
+    """Update a market with one find_one_and_update
+
+    If-Match is required (428 without it): the ETag of GET /markets/{id},
+    i.e. the market's version, or * for whatever version is current. The
+    update and the rates and scores it leads to are written together, pinned
+    to that version, so the write applies to exactly the market the client
+    saw or fails with 412. Derived fields are computed from this worker's
+    market snapshot when it holds that version, and from one read otherwise.
+    """
+    from pymongo import ReturnDocument
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        raise HTTPException(
+            status_code=428,
+            detail="If-Match is required: send the market's ETag, or * to update whatever version is current",
+        )
+    expected_version = parse_if_match(if_match)
+    
+    # Update only provided fields
+    update_data = {k: v for k, v in market.dict().items() if v is not None}
+    reject_rate_derived_fields(update_data)
     try:
-        # Check if market exists
-        existing = await db.markets.find_one({"id": market_id})
-        if not existing:
-            raise HTTPException(status_code=404, detail=f"Market with ID {market_id} not found")
-        
-        # Update only provided fields
-        update_data = {k: v for k, v in market.dict().items() if v is not None}
-        
         # Add updated timestamp
         update_data["updated_at"] = datetime.utcnow()
         
-        # Update market
-        await db.markets.update_one({"id": market_id}, {"$set": update_data})
+        current = market_broadcaster.market(market_id, expected_version) if expected_version is not None else None
+        if current is None:
+            current = await db.markets.find_one(version_filter(market_id, expected_version), NO_ID)
+            if not current:
+                await raise_precondition_failed(db, market_id, expected_version)
         
-        # Get updated market
-        updated = await db.markets.find_one({"id": market_id})
-        return Market(**updated)
+        fields = derive_updates([current], [update_data])[0]
+        updated = await db.markets.find_one_and_update(
+            version_filter(market_id, current.get("version", 1)),
+            versioned_update(fields),
+            projection=MARKET_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if not updated:
+            await raise_precondition_failed(db, market_id, expected_version)
+        
+        await asyncio.gather(record_snapshots(db, [updated]), markets_version.bump(db))
+        return FastJSONResponse(updated, headers={"ETag": market_etag(updated)})
     except HTTPException:
         raise
     except Exception as e:
@@ -213,145 +527,22 @@ async def update_market(market_id: str, market: MarketUpdate, db = Depends(get_d
         raise HTTPException(status_code=500, detail=f"Error updating market: {str(e)}")
 
 @router.delete("/{market_id}")
-async def delete_market(market_id: str, db = Depends(get_db)) -> Dict[str, Any]:
-    """Delete a market"""
+async def delete_market(market_id: str, request: Request, db = Depends(get_db)) -> Dict[str, Any]:
+    """Delete a market, optionally only if its version matches If-Match"""
     try:
-        # Check if market exists
-        existing = await db.markets.find_one({"id": market_id})
-        if not existing:
-            raise HTTPException(status_code=404, detail=f"Market with ID {market_id} not found")
+        expected_version = parse_if_match(request.headers.get("if-match"))
         
         # Delete market
-        await db.markets.delete_one({"id": market_id})
+        result = await db.markets.delete_one(version_filter(market_id, expected_version))
+        if result.deleted_count == 0:
+            if expected_version is None:
+                raise HTTPException(status_code=404, detail=f"Market with ID {market_id} not found")
+            await raise_precondition_failed(db, market_id, expected_version)
         
+        await markets_version.bump(db)
         return {"message": f"Market {market_id} deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error deleting market: {e}")
         raise HTTPException(status_code=500, detail=f"Error deleting market: {str(e)}")
-
-@router.get("/stats/overview")
-async def get_market_stats(db = Depends(get_db)) -> Dict[str, Any]:
-    """Get aggregate market statistics"""
-    try:
-        # Get all markets
-        markets = await db.markets.find().to_list(1000)
-        
-        if not markets:
-            return {
-                "total_supply": 0,
-                "total_borrow": 0,
-                "markets_count": 0,
-                "avg_supply_rate": 0,
-                "avg_borrow_rate": 0,
-                "top_markets": []
-            }
-            
-        # Calculate aggregate statistics
-        total_supply = sum(float(market["total_supply"]) for market in markets)
-        total_borrow = sum(float(market["total_borrow"]) for market in markets)
-        
-        markets_with_supply = [m for m in markets if float(m["total_supply"]) > 0]
-        markets_with_borrow = [m for m in markets if float(m["total_borrow"]) > 0]
-        
-        avg_supply_rate = sum(m["supply_apy"] for m in markets_with_supply) / len(markets_with_supply) if markets_with_supply else 0
-        avg_borrow_rate = sum(m["borrow_apy"] for m in markets_with_borrow) / len(markets_with_borrow) if markets_with_borrow else 0
-        
-        # Sort markets by total supply for top markets
-        sorted_markets = sorted(markets, key=lambda x: x["total_supply"], reverse=True)
-        top_markets = [{"id": m["id"], "asset_id": m["asset_id"], "name": m["name"], "total_supply": m["total_supply"]} 
-                      for m in sorted_markets[:5]]
-        
-        return {
-            "total_supply": total_supply,
-            "total_borrow": total_borrow,
-            "markets_count": len(markets),
-            "avg_supply_rate": avg_supply_rate,
-            "avg_borrow_rate": avg_borrow_rate,
-            "top_markets": top_markets
-        }
-    except Exception as e:
-        logger.error(f"Error getting market stats: {e}")
-        raise HTTPException(status_code=500, detail=f"Error getting market stats: {str(e)}")
-
-@router.get("/recommendations")
-async def get_market_recommendations(db = Depends(get_db)) -> Dict[str, Any]:
-    """Get market recommendations based on current conditions"""
-    try:
-        # Get all markets
-        markets = await db.markets.find().to_list(1000)
-        
-        if not markets:
-            return {
-                "best_supply_opportunities": [],
-                "best_borrow_opportunities": [],
-                "safest_supply_markets": [],
-                "overall_recommendation": None
-            }
-            
-        # Find best supply opportunities (highest APY)
-        supply_opportunities = sorted(
-            [m for m in markets if m["can_supply"] and m["is_active"]], 
-            key=lambda x: x["supply_apy"], 
-            reverse=True
-        )[:3]
-        
-        # Find best borrowing opportunities (lowest APY)
-        borrow_opportunities = sorted(
-            [m for m in markets if m["can_borrow"] and m["is_active"]], 
-            key=lambda x: x["borrow_apy"]
-        )[:3]
-        
-        # Find safest markets (highest collateral factor)
-        safest_markets = sorted(
-            [m for m in markets if m["can_supply"] and m["is_active"]], 
-            key=lambda x: x["collateral_factor"], 
-            reverse=True
-        )[:3]
-        
-        # Calculate current market conditions
-        markets_with_supply = [m for m in markets if float(m["total_supply"]) > 0]
-        avg_supply_rate = sum(m["supply_apy"] for m in markets_with_supply) / len(markets_with_supply) if markets_with_supply else 0
-        
-        # Determine overall market recommendation
-        if avg_supply_rate > 5:
-            overall_rec = "Market supply rates are high - good time to supply assets"
-        elif avg_supply_rate < 2:
-            overall_rec = "Market supply rates are low - might be better to look for other opportunities"
-        else:
-            overall_rec = "Market conditions are balanced - consider both supply and borrow options"
-            
-        return {
-            "best_supply_opportunities": [
-                {
-                    "id": m["id"],
-                    "name": m["name"],
-                    "supply_apy": m["supply_apy"],
-                    "total_supply": m["total_supply"],
-                    "liquidity": m["liquidity"]
-                } for m in supply_opportunities
-            ],
-            "best_borrow_opportunities": [
-                {
-                    "id": m["id"],
-                    "name": m["name"],
-                    "borrow_apy": m["borrow_apy"],
-                    "total_borrow": m["total_borrow"],
-                    "liquidity": m["liquidity"]
-                } for m in borrow_opportunities
-            ],
-            "safest_supply_markets": [
-                {
-                    "id": m["id"],
-                    "name": m["name"],
-                    "collateral_factor": m["collateral_factor"],
-                    "supply_apy": m["supply_apy"],
-                    "liquidity": m["liquidity"]
-                } for m in safest_markets
-            ],
-            "overall_recommendation": overall_rec
-        }
-    except Exception as e:
-        logger.error(f"Error getting market recommendations: {e}")
-        raise HTTPException(status_code=500, detail=f"Error getting market recommendations: {str(e)}")
@@ -19,6 +19,13 @@ class AssetMetadata(BaseModel):
     decimals: Optional[int] = None
 
 # Models for AaveADA DeFi protocol
+class RateModel(BaseModel):
+    """Kinked interest-rate model parameters (annual percentages)"""
+    base_rate: float  # borrow rate at zero utilization
+    slope1: float  # added up to the optimal utilization
+    slope2: float  # added from the optimal utilization to 100%
+    optimal_utilization: float  # 0-1 value; the kink
+
 class Market(BaseModel):
     """Represents a lending/borrowing market for an asset"""
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -45,6 +52,9 @@ class Market(BaseModel):
     liquidation_penalty: float  # 0-1 value
     reserve_factor: float  # 0-1 value
     
+    # Drives supply_apy, borrow_apy and utilization_rate; the configured default when unset
+    rate_model: Optional[RateModel] = None
+    
     # Market state
     is_active: bool = True
     can_supply: bool = True
@@ -54,6 +64,15 @@ class Market(BaseModel):
     # Price data
     price_usd: float
     price_oracle: str  # Description or ID of price oracle source
+    price_updated_at: Optional[datetime] = None  # Set by oracle price batches
+    
+    # Incremented on every write; used for If-Match preconditions
+    version: int = 1
+    write_id: Optional[str] = None  # Write that produced this version
+    
+    # Risk-adjusted recommendation scores and the APY volatility state behind them
+    scores: Optional[Dict[str, float]] = None
+    score_state: Optional[Dict[str, float]] = None
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -75,6 +94,7 @@ class UserPosition(BaseModel):
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    revalued_at: Optional[datetime] = None  # Last repricing at market prices
 
 class Transaction(BaseModel):
     """Represents a protocol transaction (supply, borrow, repay, withdraw)"""
@@ -116,6 +136,7 @@ class MarketCreate(BaseModel):
     liquidation_threshold: float
     liquidation_penalty: float
     reserve_factor: float
+    rate_model: Optional[RateModel] = None
     is_active: bool = True
     can_supply: bool = True
     can_borrow: bool = True
@@ -138,9 +159,38 @@ class MarketUpdate(BaseModel):
     liquidation_threshold: Optional[float] = None
     liquidation_penalty: Optional[float] = None
     reserve_factor: Optional[float] = None
+    rate_model: Optional[RateModel] = None
     is_active: Optional[bool] = None
     can_supply: Optional[bool] = None
     can_borrow: Optional[bool] = None
     can_use_as_collateral: Optional[bool] = None
     price_usd: Optional[float] = None
     price_oracle: Optional[str] = None
+
+class MarketBulkUpdateItem(BaseModel):
+    """A market update addressed by market ID, used in bulk updates
+
+    version works like If-Match on PUT /markets/{id}: when set, the update
+    only applies to that version of the market. Without it the update is
+    unconditional.
+    """
+    id: str
+    update: MarketUpdate
+    version: Optional[int] = None
+
+class MarketBatchGet(BaseModel):
+    """Model for fetching several markets by ID"""
+    ids: List[str]
+
+class OraclePrice(BaseModel):
+    """One oracle price for an asset, used in price batches"""
+    asset_id: str
+    price_usd: float = Field(..., gt=0)
+    price_oracle: Optional[str] = None
+
+class BulkItemResult(BaseModel):
+    """Outcome of one item in a bulk request, in request order"""
+    index: int
+    id: Optional[str] = None
+    status: str  # "created", "updated", "skipped", "not_found", "duplicate", "conflict", "error"
+    error: Optional[str] = None
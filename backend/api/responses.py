@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable
+
+import orjson
+from bson import Decimal128, ObjectId
+from fastapi import Request
+from fastapi.responses import Response
+
+from settings import MARKETS_CACHE_MAX_AGE, MARKETS_STALE_WHILE_REVALIDATE
+
+# Projection for reads that are returned as-is; _id is an ObjectId and not part of our models
+NO_ID = {"_id": 0}
+
+# Bookkeeping fields of market documents for writers; never sent to clients
+PRIVATE_MARKET_FIELDS = {"write_id", "score_state"}
+
+# Projection for market documents returned as-is, by REST reads and the market stream alike
+MARKET_PROJECTION = {**NO_ID, **{field: 0 for field in PRIVATE_MARKET_FIELDS}}
+
+def public_market(market: Dict[str, Any]) -> Dict[str, Any]:
+    """A market document already in memory, reduced to what MARKET_PROJECTION returns"""
+    return {key: value for key, value in market.items() if key not in MARKET_PROJECTION}
+
+def _default(value: Any) -> Any:
+    """Encode the types orjson does not handle natively"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Serialize content with orjson; datetimes are written in ISO 8601 and non-finite floats as null"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(Response):
+    """JSON response for trusted database documents
+
+    Returning it from a route skips response_model validation and FastAPI's
+    jsonable_encoder, so documents are serialized once, straight from the
+    dicts Motor returns.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def cache_headers(
+    surrogate_keys: Iterable[str],
+    max_age: int = MARKETS_CACHE_MAX_AGE,
+    stale_while_revalidate: int = MARKETS_STALE_WHILE_REVALIDATE,
+) -> Dict[str, str]:
+    """Headers for responses that are identical for every user
+
+    Cache-Control lets nginx and browsers reuse the response for max_age
+    seconds and serve it stale while refreshing. Surrogate-Key tags the
+    response so a CDN can purge everything for a market at once.
+    """
+    return {
+        "Cache-Control": (
+            f"public, max-age={max_age}, "
+            f"stale-while-revalidate={stale_while_revalidate}, stale-if-error={stale_while_revalidate}"
+        ),
+        "Surrogate-Key": " ".join(surrogate_keys),
+    }
+
+def _as_utc(value: datetime) -> datetime:
+    """Mongo returns naive UTC datetimes; HTTP dates have one-second resolution"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def validator_headers(etag: str, last_modified: datetime) -> Dict[str, str]:
+    """ETag and Last-Modified headers for a representation"""
+    return {"ETag": etag, "Last-Modified": format_datetime(_as_utc(last_modified), usegmt=True)}
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Whether the request's validators still match, so a 304 can be sent
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110) and is
+    compared weakly, since compression may change the bytes but not the content.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        wanted = etag[2:] if etag.startswith("W/") else etag
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == wanted:
+                return True
+        return False
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(last_modified) <= since
+    return False
@@ -1,22 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Path
 from typing import Dict, List, Any
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
-import os
 
+from database import get_database
 from api.models import UserPosition
+from api.responses import FastJSONResponse, NO_ID
 from cardano.cardano_service import CardanoService
+from markets.kernels import compute_borrow_limit, compute_health_factor
 
 router = APIRouter(prefix="/users", tags=["users"])
 logger = logging.getLogger(__name__)
 
 # Dependency to get MongoDB
 def get_db():
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[os.environ['DB_NAME']]
-    return db
+    return get_database()
 
 # Dependency to get the CardanoService
 def get_cardano_service():
@@ -26,6 +24,14 @@ def get_cardano_service():
         logger.error(f"Failed to initialize CardanoService: {e}")
         raise HTTPException(status_code=500, detail=f"Cardano service error: {str(e)}")
 
+async def get_collateral_factors(db, supplies: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Collateral factor by asset_id for the markets behind the collateral supplies"""
+    asset_ids = [supply["asset_id"] for supply in supplies if supply["used_as_collateral"]]
+    if not asset_ids:
+        return {}
+    cursor = db.markets.find({"asset_id": {"$in": asset_ids}}, {"_id": 0, "asset_id": 1, "collateral_factor": 1})
+    return {market["asset_id"]: market["collateral_factor"] async for market in cursor}
+
 @router.get("/{address}")
 async def get_user_position(
     address: str,
@@ -35,7 +41,7 @@ async def get_user_position(
     """Get a user's position and wallet info"""
     try:
         # Get user position from database
-        position = await db.user_positions.find_one({"user_address": address})
+        position = await db.user_positions.find_one({"user_address": address}, NO_ID)
         
         # If no position exists, create an empty one
         if not position:
@@ -58,10 +64,10 @@ async def get_user_position(
             }
         
         # Combine data
-        return {
+        return FastJSONResponse({
             "position": position,
             "address_info": address_info
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting user position: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting user position: {str(e)}")
@@ -116,21 +122,12 @@ async def simulate_supply(
         # Update totals
         position["total_supplied_usd"] = sum(supply["amount_usd"] for supply in position["supplies"])
         
-        # Calculate new borrow limit
-        borrow_limit_usd = 0
-        for supply in position["supplies"]:
-            if supply["used_as_collateral"]:
-                supply_market = await db.markets.find_one({"asset_id": supply["asset_id"]})
-                if supply_market:
-                    borrow_limit_usd += supply["amount_usd"] * supply_market["collateral_factor"]
+        # Calculate new borrow limit and health factor
+        collateral_factors = await get_collateral_factors(db, position["supplies"])
+        borrow_limit_usd = compute_borrow_limit(position["supplies"], collateral_factors)
         
         position["borrow_limit_usd"] = borrow_limit_usd
-        
-        # Calculate health factor
-        if position["total_borrowed_usd"] > 0:
-            position["health_factor"] = borrow_limit_usd / position["total_borrowed_usd"]
-        else:
-            position["health_factor"] = float('inf')  # No borrows, infinite health
+        position["health_factor"] = compute_health_factor(borrow_limit_usd, position["total_borrowed_usd"])
         
         # Save updated position
         position["updated_at"] = datetime.utcnow()
@@ -180,12 +177,8 @@ async def simulate_borrow(
         amount_usd = amount_float * market["price_usd"]
         
         # Calculate current borrow limit
-        borrow_limit_usd = 0
-        for supply in position["supplies"]:
-            if supply["used_as_collateral"]:
-                supply_market = await db.markets.find_one({"asset_id": supply["asset_id"]})
-                if supply_market:
-                    borrow_limit_usd += supply["amount_usd"] * supply_market["collateral_factor"]
+        collateral_factors = await get_collateral_factors(db, position["supplies"])
+        borrow_limit_usd = compute_borrow_limit(position["supplies"], collateral_factors)
         
         # Calculate new total borrowed
         new_total_borrowed_usd = position["total_borrowed_usd"] + amount_usd
@@ -226,10 +219,7 @@ async def simulate_borrow(
         position["borrow_limit_usd"] = borrow_limit_usd
         
         # Calculate new health factor
-        if position["total_borrowed_usd"] > 0:
-            position["health_factor"] = borrow_limit_usd / position["total_borrowed_usd"]
-        else:
-            position["health_factor"] = float('inf')  # No borrows, infinite health
+        position["health_factor"] = compute_health_factor(borrow_limit_usd, position["total_borrowed_usd"])
         
         # Save updated position
         position["updated_at"] = datetime.utcnow()
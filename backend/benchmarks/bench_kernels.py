@@ -0,0 +1,166 @@
+"""Micro-benchmarks for the pure market and position compute kernels
+
+Each kernel runs at every size (markets or positions); the best per-call time
+over several rounds is reported. Every run is appended to
+benchmarks/results/kernels.jsonl so results can be tracked over time, and is
+compared with benchmarks/baselines/kernels.json: the script exits with
+status 1 when a kernel is slower than its baseline by more than --threshold.
+
+Usage:
+    python benchmarks/bench_kernels.py                  # run and compare with the baseline
+    python benchmarks/bench_kernels.py --save-baseline  # run and store the baseline
+    python benchmarks/bench_kernels.py --sizes 10 1000 --kernels market_stats
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.fixtures import make_markets, make_positions
+from markets.kernels import (
+    compute_market_recommendations,
+    compute_market_scores,
+    compute_market_stats,
+    compute_position_health,
+    update_apy_volatility,
+)
+from markets.rates import RATE_MODEL_FIELDS, compute_rates, default_rate_model
+from positions.revaluation import revalue
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "kernels.json"
+HISTORY_PATH = Path(__file__).parent / "results" / "kernels.jsonl"
+
+def _market_inputs(size: int) -> tuple:
+    return (make_markets(size),)
+
+def _scored_market_inputs(size: int) -> tuple:
+    markets = make_markets(size)
+    for market in markets:
+        state = update_apy_volatility(None, market["supply_apy"], market["borrow_apy"], 0.2)
+        market["scores"] = compute_market_scores(market, state)
+    return (markets,)
+
+def _recommendation_inputs(size: int) -> tuple:
+    return (*_scored_market_inputs(size), 5, 2)
+
+def _position_inputs(size: int) -> tuple:
+    markets = make_markets(min(size, 100))
+    collateral_factors = {market["asset_id"]: market["collateral_factor"] for market in markets}
+    return make_positions(size, markets), collateral_factors
+
+def _revaluation_inputs(size: int) -> tuple:
+    markets = make_markets(min(size, 100))
+    prices = {market["asset_id"]: market["price_usd"] * 1.05 for market in markets}
+    collateral_factors = {market["asset_id"]: market["collateral_factor"] for market in markets}
+    return make_positions(size, markets), prices, collateral_factors
+
+def _rate_inputs(size: int) -> tuple:
+    markets = make_markets(size)
+    model = default_rate_model()
+    return (
+        np.array([float(market["total_supply"]) for market in markets]),
+        np.array([float(market["total_borrow"]) for market in markets]),
+        np.array([market["reserve_factor"] for market in markets]),
+        *(np.full(size, model[name]) for name in RATE_MODEL_FIELDS),
+    )
+
+# name -> (kernel, input builder)
+KERNELS: Dict[str, tuple] = {
+    "market_stats": (compute_market_stats, _market_inputs),
+    "market_recommendations": (compute_market_recommendations, _recommendation_inputs),
+    "position_health": (compute_position_health, _position_inputs),
+    "rate_model": (compute_rates, _rate_inputs),
+    "position_revaluation": (revalue, _revaluation_inputs),
+}
+
+def measure(kernel: Callable, inputs: tuple, rounds: int, min_time: float) -> float:
+    """Best per-call time in seconds over rounds, each round lasting at least min_time"""
+    kernel(*inputs)  # warm up
+
+    # Calibrate the number of calls per round
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            kernel(*inputs)
+        if time.perf_counter() - start >= min_time:
+            break
+        calls *= 2
+
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            kernel(*inputs)
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """List kernels slower than the baseline by more than threshold"""
+    regressions = []
+    for name, sizes in results.items():
+        for size, seconds in sizes.items():
+            base = baseline.get(name, {}).get(size)
+            if base and seconds > base * (1 + threshold):
+                regressions.append(f"{name} @ {size}: {base * 1e6:.1f} -> {seconds * 1e6:.1f} us ({seconds / base - 1:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--kernels", nargs="+", choices=sorted(KERNELS), default=sorted(KERNELS))
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per round")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'kernel':<24} {'size':>8} {'per call':>12} {'per item':>12}")
+    for name in args.kernels:
+        kernel, build_inputs = KERNELS[name]
+        results[name] = {}
+        for size in args.sizes:
+            seconds = measure(kernel, build_inputs(size), args.rounds, args.min_time)
+            results[name][str(size)] = seconds
+            print(f"{name:<24} {size:>8} {seconds * 1e6:>10.1f}us {seconds / size * 1e9:>10.1f}ns")
+
+    run: Dict[str, Any] = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with HISTORY_PATH.open("a") as history:
+        history.write(json.dumps(run) + "\n")
+
+    if args.save_baseline:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(run, indent=2))
+        print(f"\nBaseline saved to {BASELINE_PATH}")
+        return
+
+    if not BASELINE_PATH.exists():
+        print("\nNo baseline yet; run with --save-baseline to create one")
+        return
+
+    regressions = compare(results, json.loads(BASELINE_PATH.read_text())["results"], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} kernel(s) slower than the baseline by more than {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo kernel slower than the baseline by more than {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compare the validated Pydantic response path with the FastJSONResponse path
+
+Usage: python benchmarks/bench_serialization.py [--markets 8 100 1000] [--repeat 200]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from api.models import Market
+from api.responses import FastJSONResponse
+from benchmarks.fixtures import make_markets
+
+_markets_adapter = TypeAdapter(List[Market])
+
+def pydantic_path(documents):
+    """What get_markets did before: build models, re-validate as the response model, encode with json"""
+    models = [Market(**document) for document in documents]
+    validated = _markets_adapter.validate_python(models)
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+def fast_path(documents):
+    """Trusted documents straight to orjson"""
+    return FastJSONResponse(documents).body
+
+def measure(fn, documents, repeat: int) -> float:
+    """Return requests per second for fn over documents"""
+    fn(documents)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(documents)
+    return repeat / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--markets", type=int, nargs="+", default=[8, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'markets':>8} {'pydantic req/s':>16} {'orjson req/s':>14} {'speedup':>8}")
+    for count in args.markets:
+        documents = make_markets(count)
+        slow = measure(pydantic_path, documents, args.repeat)
+        fast = measure(fast_path, documents, args.repeat)
+        print(f"{count:>8} {slow:>16.1f} {fast:>14.1f} {fast / slow:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
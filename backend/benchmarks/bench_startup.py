@@ -0,0 +1,167 @@
+"""Cold start benchmark: import time of server.py and time to the first response
+
+Import time is measured in fresh interpreters (median of --repeat runs),
+together with the slowest top-level imports from -X importtime and a check
+that the lazily loaded integrations (Blockfrost, Motor) stay out of the
+import. First-request latency is the time from spawning `python server.py`
+to the first successful response on --path, plus that request's own latency.
+
+Results are compared with benchmarks/baselines/startup.json when one has
+been saved, and the script exits with status 1 when cold start is slower by
+more than --threshold, when import time exceeds --import-budget-ms (default
+IMPORT_BUDGET_MS), or when a lazy module is imported. tests/test_startup.py
+runs the import checks as part of the test suite.
+
+Usage:
+    python benchmarks/bench_startup.py                  # measure and compare with the baseline
+    python benchmarks/bench_startup.py --save-baseline  # measure and store the baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).parent.parent
+BASELINE_PATH = Path(__file__).parent / "baselines" / "startup.json"
+
+# Integrations and heavy libraries that must load on first use, not when server.py is imported
+LAZY_MODULES = ["blockfrost", "motor", "pymongo", "numpy", "pandas", "boto3"]
+
+# Ceiling for the median import time of server.py, about twice what it takes
+# on a development machine (FastAPI alone is most of it). Override with
+# STARTUP_IMPORT_BUDGET_MS on slower hosts.
+IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", "1000"))
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import server
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "lazy_loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+def _env(extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.update(extra or {})
+    return env
+
+def measure_import(repeat: int) -> Tuple[float, List[str]]:
+    """Median seconds to import server in a fresh interpreter, and lazy modules it loaded"""
+    samples, lazy_loaded = [], set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE], cwd=BACKEND_DIR, env=_env(),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        samples.append(result["seconds"])
+        lazy_loaded.update(result["lazy_loaded"])
+    return statistics.median(samples), sorted(lazy_loaded)
+
+def slowest_imports(limit: int) -> List[Tuple[str, float]]:
+    """Top-level packages by cumulative import time, from -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"], cwd=BACKEND_DIR, env=_env(),
+        capture_output=True, text=True, check=True,
+    ).stderr
+
+    totals: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level entries (one leading space) so nested imports are not counted twice
+        if name.startswith(" ") and not name.startswith("  "):
+            totals[name.strip().split(".")[0]] += int(cumulative) / 1_000_000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+def measure_first_request(port: int, path: str, timeout: float) -> Tuple[float, float]:
+    """Seconds from spawning the server to its first response, and that request's latency"""
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=BACKEND_DIR,
+        env=_env({"SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port), "SERVER_WORKERS": "1"}),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            request_start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    response.read()
+                    if response.status == 200:
+                        end = time.perf_counter()
+                        return end - start, end - request_start
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"No response from {url} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8097)
+    parser.add_argument("--path", default="/api/", help="route for the first request")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS, help="absolute ceiling for import time")
+    parser.add_argument("--skip-server", action="store_true", help="only measure import time")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    import_seconds, lazy_loaded = measure_import(args.repeat)
+    print(f"import server: {import_seconds * 1000:.1f} ms (median of {args.repeat})")
+    print("slowest top-level imports:")
+    for name, seconds in slowest_imports(args.top):
+        print(f"  {name:<32} {seconds * 1000:>8.1f} ms")
+
+    result = {"created_at": datetime.utcnow().isoformat(), "import_ms": import_seconds * 1000}
+    if not args.skip_server:
+        samples = [measure_first_request(args.port, args.path, args.timeout) for _ in range(args.repeat)]
+        result["first_response_ms"] = statistics.median(ready for ready, _ in samples) * 1000
+        result["first_request_ms"] = statistics.median(latency for _, latency in samples) * 1000
+        print(f"spawn to first response: {result['first_response_ms']:.1f} ms")
+        print(f"first request latency: {result['first_request_ms']:.1f} ms")
+
+    failures = []
+    if lazy_loaded:
+        failures.append(f"lazily loaded modules imported at startup: {', '.join(lazy_loaded)}")
+    if args.import_budget_ms and result["import_ms"] > args.import_budget_ms:
+        failures.append(f"import time {result['import_ms']:.1f} ms exceeds the {args.import_budget_ms:.0f} ms budget")
+
+    if args.save_baseline:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(result, indent=2))
+        print(f"\nBaseline saved to {BASELINE_PATH}")
+    elif BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text())
+        for key in ("import_ms", "first_response_ms", "first_request_ms"):
+            if key in result and key in baseline and result[key] > baseline[key] * (1 + args.threshold):
+                failures.append(f"{key}: {baseline[key]:.1f} -> {result[key]:.1f} ms")
+    else:
+        print("\nNo baseline yet; run with --save-baseline to create one")
+
+    if failures:
+        print("\nCold start regressed:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    if BASELINE_PATH.exists():
+        print(f"\nCold start within {args.threshold:.0%} of the baseline")
+    else:
+        print(f"\nCold start within the {args.import_budget_ms:.0f} ms import budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""A local stand-in for the Blockfrost API used by the load tests
+
+Serves deterministic responses for every endpoint CardanoService calls, with
+an optional artificial latency (FAKE_BLOCKFROST_LATENCY_MS) to mimic the
+real upstream. Routes are served both with and without the /v0 prefix so the
+app can point BLOCKFROST_BASE_URL at it whichever way the client builds URLs.
+
+Usage: uvicorn benchmarks.fake_blockfrost:app --port 8099
+"""
+import asyncio
+import hashlib
+import os
+
+from fastapi import APIRouter, FastAPI
+
+LATENCY = float(os.environ.get("FAKE_BLOCKFROST_LATENCY_MS", "20")) / 1000
+TIP_HEIGHT = 2_500_000
+POLICY_ID = "d894897411707efa755a76deb66d26dfd50593f2e70863e1661e98a0"
+LIST_LENGTH = 250  # items behind every paginated asset listing
+
+router = APIRouter()
+
+def _hash(*parts) -> str:
+    return hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+
+def _page(items_total: int, count: int, page: int, make):
+    start = (page - 1) * count
+    return [make(i) for i in range(start, min(start + count, items_total))]
+
+@router.get("/health")
+async def health():
+    return {"is_healthy": True}
+
+@router.get("/epochs/latest")
+async def epoch_latest():
+    await asyncio.sleep(LATENCY)
+    return {"epoch": 150, "start_time": 1700000000, "end_time": 1700432000, "block_count": 21000, "tx_count": 90000}
+
+@router.get("/epochs/{epoch}/parameters")
+async def epoch_parameters(epoch: int):
+    await asyncio.sleep(LATENCY)
+    return {
+        "epoch": epoch, "min_fee_a": 44, "min_fee_b": 155381, "max_block_size": 90112, "max_tx_size": 16384,
+        "max_tx_ex_steps": "10000000000", "max_tx_ex_mem": "14000000", "key_deposit": "2000000",
+        "pool_deposit": "500000000", "min_pool_cost": "170000000", "price_mem": 0.0577, "price_step": 0.0000721,
+        "max_val_size": "5000", "collateral_percent": 150, "max_collateral_inputs": 3,
+        "coins_per_utxo_word": "4310", "protocol_major_ver": 8, "protocol_minor_ver": 0,
+    }
+
+def _block(height: int) -> dict:
+    return {
+        "hash": f"block{height}", "height": height, "time": 1700000000 + height * 20, "slot": height * 20,
+        "epoch": 150, "epoch_slot": height % 432000, "size": 4096, "tx_count": 12,
+        "previous_block": f"block{height - 1}" if height > 0 else None,
+        "confirmations": TIP_HEIGHT - height,
+    }
+
+@router.get("/blocks/latest")
+async def block_latest():
+    await asyncio.sleep(LATENCY)
+    return _block(TIP_HEIGHT)
+
+@router.get("/blocks/{hash_or_number}")
+async def block(hash_or_number: str):
+    await asyncio.sleep(LATENCY)
+    height = int(hash_or_number[5:]) if hash_or_number.startswith("block") else int(hash_or_number)
+    return _block(height)
+
+def _amounts(address: str) -> list:
+    return [
+        {"unit": "lovelace", "quantity": str(int(_hash(address)[:8], 16))},
+        {"unit": POLICY_ID + "746f6b656e6e616d65", "quantity": "1000000"},
+    ]
+
+@router.get("/addresses/{address}")
+async def address(address: str):
+    await asyncio.sleep(LATENCY)
+    return {"address": address, "amount": _amounts(address), "stake_address": "stake_test1" + _hash(address)[:40], "type": "shelley", "script": False}
+
+@router.get("/addresses/{address}/utxos")
+async def address_utxos(address: str, count: int = 100, page: int = 1):
+    await asyncio.sleep(LATENCY)
+    return _page(3, count, page, lambda i: {
+        "address": address, "tx_hash": _hash(address, i), "output_index": i, "amount": _amounts(address),
+        "block": f"block{TIP_HEIGHT - i}", "data_hash": None,
+    })
+
+@router.get("/addresses/{address}/transactions")
+async def address_transactions(address: str, count: int = 100, page: int = 1):
+    await asyncio.sleep(LATENCY)
+    return _page(40, count, page, lambda i: {"tx_hash": _hash(address, "tx", i), "tx_index": i, "block_height": TIP_HEIGHT - i, "block_time": 1700000000})
+
+@router.get("/txs/{tx_hash}")
+async def transaction(tx_hash: str):
+    await asyncio.sleep(LATENCY)
+    height = TIP_HEIGHT - int(tx_hash[:4], 16) if all(c in "0123456789abcdef" for c in tx_hash[:4]) else TIP_HEIGHT - 10
+    return {
+        "hash": tx_hash, "block": f"block{height}", "block_height": height, "block_time": 1700000000, "slot": height * 20,
+        "index": 0, "output_amount": [{"unit": "lovelace", "quantity": "5000000"}], "fees": "170000", "deposit": "0",
+        "size": 300, "invalid_before": None, "invalid_hereafter": None, "utxo_count": 3, "withdrawal_count": 0,
+        "mir_cert_count": 0, "delegation_count": 0, "stake_cert_count": 0, "pool_update_count": 0,
+        "pool_retire_count": 0, "asset_mint_or_burn_count": 0, "redeemer_count": 0, "valid_contract": True,
+    }
+
+@router.get("/txs/{tx_hash}/utxos")
+async def transaction_utxos(tx_hash: str):
+    await asyncio.sleep(LATENCY)
+    utxo = lambda i: {"address": "addr_test1" + _hash(tx_hash, i)[:50], "amount": [{"unit": "lovelace", "quantity": "2500000"}], "output_index": i}
+    return {"hash": tx_hash, "inputs": [utxo(0)], "outputs": [utxo(1), utxo(2)]}
+
+def _asset_unit(index: int) -> str:
+    return POLICY_ID + f"token{index}".encode().hex()
+
+@router.get("/assets")
+async def assets(count: int = 100, page: int = 1, order: str = "asc"):
+    await asyncio.sleep(LATENCY)
+    return _page(LIST_LENGTH, count, page, lambda i: {"asset": _asset_unit(i), "quantity": "1000000000"})
+
+@router.get("/assets/{asset}")
+async def asset(asset: str):
+    await asyncio.sleep(LATENCY)
+    name = bytes.fromhex(asset[56:]).decode(errors="replace") if len(asset) > 56 else ""
+    return {
+        "asset": asset, "policy_id": asset[:56], "asset_name": asset[56:] or None,
+        "fingerprint": "asset1" + _hash(asset)[:38], "quantity": "1000000000",
+        "initial_mint_tx_hash": _hash(asset, "mint"), "mint_or_burn_count": 1, "onchain_metadata": None,
+        "metadata": {"name": name.upper(), "description": "Load test token", "ticker": name[:5].upper(), "url": None, "logo": None, "decimals": 6},
+    }
+
+@router.get("/assets/{asset}/history")
+async def asset_history(asset: str, count: int = 100, page: int = 1, order: str = "asc"):
+    await asyncio.sleep(LATENCY)
+    return _page(3, count, page, lambda i: {"tx_hash": _hash(asset, "history", i), "action": "minted", "amount": "1000000"})
+
+@router.get("/assets/{asset}/transactions")
+async def asset_transactions(asset: str, count: int = 100, page: int = 1, order: str = "asc"):
+    await asyncio.sleep(LATENCY)
+    return _page(LIST_LENGTH, count, page, lambda i: {"tx_hash": _hash(asset, "tx", i), "tx_index": i, "block_height": TIP_HEIGHT - i, "block_time": 1700000000})
+
+@router.get("/assets/{asset}/addresses")
+async def asset_addresses(asset: str, count: int = 100, page: int = 1, order: str = "asc"):
+    await asyncio.sleep(LATENCY)
+    return _page(LIST_LENGTH, count, page, lambda i: {"address": "addr_test1" + _hash(asset, i)[:50], "quantity": "1000"})
+
+@router.get("/pools")
+async def pools(count: int = 100, page: int = 1, order: str = "asc"):
+    await asyncio.sleep(LATENCY)
+    return _page(500, count, page, lambda i: "pool1" + _hash("pool", i)[:51])
+
+@router.get("/pools/{pool_id}")
+async def pool(pool_id: str):
+    await asyncio.sleep(LATENCY)
+    return {
+        "pool_id": pool_id, "hex": _hash(pool_id)[:56], "vrf_key": _hash(pool_id, "vrf"), "blocks_minted": 1200,
+        "blocks_epoch": 4, "live_stake": "6900000000000", "live_size": 0.001, "live_saturation": 0.09,
+        "live_saturated": 0.09, "live_delegators": 120, "active_stake": "6800000000000", "active_size": 0.001,
+        "declared_pledge": "100000000000", "live_pledge": "100000000000", "margin_cost": 0.02,
+        "fixed_cost": "340000000", "pledge": "100000000000", "reward_account": "stake_test1" + _hash(pool_id)[:40],
+        "owners": [], "registration": [], "retirement": [],
+    }
+
+@router.get("/pools/{pool_id}/metadata")
+async def pool_metadata(pool_id: str):
+    await asyncio.sleep(LATENCY)
+    return {"pool_id": pool_id, "hex": _hash(pool_id)[:56], "url": None, "hash": None, "ticker": pool_id[5:10].upper(), "name": f"Pool {pool_id[5:10]}", "description": "Load test pool", "homepage": "https://example.com"}
+
+app = FastAPI()
+app.include_router(router)
+app.include_router(router, prefix="/v0")
@@ -0,0 +1,88 @@
+import random
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List
+
+SYMBOLS = ["ADA", "DJED", "SHEN", "iUSD", "HOSKY", "MILK", "WBTC", "WETH"]
+
+def make_market(index: int, rng: random.Random) -> Dict[str, Any]:
+    """Build a market document shaped like the ones in the markets collection"""
+    symbol = f"{rng.choice(SYMBOLS)}{index}"
+    total_supply = rng.randint(10**9, 10**15)
+    total_borrow = int(total_supply * rng.uniform(0.05, 0.9))
+    price = rng.uniform(0.0001, 50000)
+    now = datetime.utcnow()
+    return {
+        "id": symbol.lower(),
+        "asset_id": uuid.uuid4().hex * 2,
+        "name": f"{symbol} Token",
+        "symbol": symbol,
+        "decimals": 6,
+        "logo_url": None,
+        "supply_apy": round(rng.uniform(0.5, 12), 2),
+        "borrow_apy": round(rng.uniform(1, 15), 2),
+        "total_supply": str(total_supply),
+        "total_supply_usd": total_supply / 10**6 * price,
+        "total_borrow": str(total_borrow),
+        "total_borrow_usd": total_borrow / 10**6 * price,
+        "liquidity": str(total_supply - total_borrow),
+        "liquidity_usd": (total_supply - total_borrow) / 10**6 * price,
+        "utilization_rate": total_borrow / total_supply,
+        "collateral_factor": round(rng.uniform(0.3, 0.9), 2),
+        "liquidation_threshold": round(rng.uniform(0.35, 0.95), 2),
+        "liquidation_penalty": round(rng.uniform(0.03, 0.15), 2),
+        "reserve_factor": round(rng.uniform(0.05, 0.2), 2),
+        "is_active": rng.random() > 0.05,
+        "can_supply": True,
+        "can_borrow": rng.random() > 0.1,
+        "can_use_as_collateral": rng.random() > 0.2,
+        "price_usd": price,
+        "price_oracle": rng.choice(["chainlink", "dex"]),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def make_markets(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Build count synthetic market documents, reproducibly"""
+    rng = random.Random(seed)
+    return [make_market(i, rng) for i in range(count)]
+
+def make_position(address: str, markets: List[Dict[str, Any]], rng: random.Random) -> Dict[str, Any]:
+    """Build a user_positions document with a few supplies and borrows over markets"""
+    supplies = []
+    for market in rng.sample(markets, min(3, len(markets))):
+        amount = rng.uniform(1, 10**4)
+        supplies.append({
+            "asset_id": market["asset_id"],
+            "amount": str(amount),
+            "amount_usd": amount * market["price_usd"],
+            "apy": market["supply_apy"],
+            "used_as_collateral": market["can_use_as_collateral"],
+        })
+    borrows = []
+    for market in rng.sample(markets, min(rng.randint(0, 2), len(markets))):
+        amount = rng.uniform(1, 10**3)
+        borrows.append({
+            "asset_id": market["asset_id"],
+            "amount": str(amount),
+            "amount_usd": amount * market["price_usd"],
+            "apy": market["borrow_apy"],
+        })
+    now = datetime.utcnow()
+    return {
+        "id": address,
+        "user_address": address,
+        "supplies": supplies,
+        "borrows": borrows,
+        "total_supplied_usd": sum(supply["amount_usd"] for supply in supplies),
+        "total_borrowed_usd": sum(borrow["amount_usd"] for borrow in borrows),
+        "borrow_limit_usd": 0.0,
+        "health_factor": 0.0,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def make_positions(count: int, markets: List[Dict[str, Any]], seed: int = 42) -> List[Dict[str, Any]]:
+    """Build count synthetic user positions over markets, reproducibly"""
+    rng = random.Random(seed)
+    return [make_position(f"addr_test1bench{i:08d}", markets, rng) for i in range(count)]
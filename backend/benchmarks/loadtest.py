@@ -0,0 +1,320 @@
+"""End-to-end load test for the /api routes
+
+Starts the fake Blockfrost server and the API (python server.py) against a
+local MongoDB, seeds a dedicated database, then drives a weighted mix of
+every /api route at each concurrency level. Reports p50/p95/p99 latency and
+requests per second per route, writes the run to benchmarks/results/, and
+compares it with the saved baseline: the script exits with status 1 when a
+route's p95 or throughput regresses by more than --tolerance.
+
+Usage:
+    python benchmarks/loadtest.py                      # run and compare with the baseline
+    python benchmarks/loadtest.py --save-baseline      # run and store the baseline
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8001 --no-servers
+
+Requires MongoDB at MONGO_URL (default mongodb://localhost:27017) and httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from pymongo import MongoClient
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from benchmarks.fixtures import make_markets
+from benchmarks.fake_blockfrost import POLICY_ID
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "loadtest.json"
+RESULTS_DIR = Path(__file__).parent / "results"
+DB_NAME = "aaveada_loadtest"
+
+# (weight, route template, method, path builder, body builder); weights mimic dashboard traffic
+Request = Tuple[int, str, str, Callable[[random.Random, Dict[str, Any]], str], Optional[Callable[[random.Random, Dict[str, Any]], Any]]]
+
+MIX: List[Request] = [
+    (20, "GET /api/markets/bootstrap", "GET", lambda r, d: "/api/markets/bootstrap", None),
+    (15, "GET /api/markets/bootstrap (If-None-Match)", "GET", lambda r, d: "/api/markets/bootstrap", None),
+    (10, "GET /api/markets/", "GET", lambda r, d: "/api/markets/", None),
+    (8, "GET /api/markets/ (If-None-Match)", "GET", lambda r, d: "/api/markets/", None),
+    (8, "GET /api/markets/stats/overview", "GET", lambda r, d: "/api/markets/stats/overview", None),
+    (8, "GET /api/markets/recommendations", "GET", lambda r, d: "/api/markets/recommendations", None),
+    (10, "GET /api/markets/{market_id}", "GET", lambda r, d: f"/api/markets/{r.choice(d['market_ids'])}", None),
+    (6, "GET /api/markets/{market_id} (If-None-Match)", "GET", lambda r, d: f"/api/markets/{r.choice(d['market_ids'])}", None),
+    (3, "GET /api/markets/{market_id}/history", "GET",
+        lambda r, d: f"/api/markets/{r.choice(d['market_ids'])}/history" + r.choice(["", "?resolution=1h", "?resolution=1d"]), None),
+    (3, "GET /api/markets/exposure", "GET",
+        lambda r, d: r.choice(["/api/markets/exposure", f"/api/markets/exposure?asset_id={r.choice(d['market_assets'])}"]), None),
+    (3, "POST /api/markets/batch-get", "POST", lambda r, d: "/api/markets/batch-get",
+        lambda r, d: {"ids": r.sample(d["market_ids"], min(5, len(d["market_ids"])))}),
+    (2, "PUT /api/markets/{market_id}", "PUT", lambda r, d: f"/api/markets/{r.choice(d['market_ids'])}",
+        lambda r, d: {"collateral_factor": round(r.uniform(0.5, 0.85), 2)}),
+    (1, "PUT /api/markets/bulk", "PUT", lambda r, d: "/api/markets/bulk",
+        lambda r, d: [{"id": market_id, "update": {"reserve_factor": round(r.uniform(0.05, 0.25), 2)}}
+                      for market_id in r.sample(d["market_ids"], min(5, len(d["market_ids"])))]),
+    (8, "GET /api/users/{address}", "GET", lambda r, d: f"/api/users/{r.choice(d['addresses'])}", None),
+    (3, "GET /api/", "GET", lambda r, d: "/api/", None),
+    (2, "GET /api/health", "GET", lambda r, d: "/api/health", None),
+    (1, "GET /api/ready", "GET", lambda r, d: "/api/ready", None),
+    (1, "GET /api/status", "GET", lambda r, d: "/api/status", None),
+    (1, "POST /api/status", "POST", lambda r, d: "/api/status", lambda r, d: {"client_name": "loadtest"}),
+    (3, "GET /api/cardano/info", "GET", lambda r, d: "/api/cardano/info", None),
+    (2, "GET /api/cardano/parameters", "GET", lambda r, d: "/api/cardano/parameters", None),
+    (2, "GET /api/cardano/address/{address}", "GET", lambda r, d: f"/api/cardano/address/{r.choice(d['addresses'])}", None),
+    (2, "GET /api/cardano/transaction/{tx_hash}", "GET", lambda r, d: f"/api/cardano/transaction/{r.choice(d['tx_hashes'])}", None),
+    (2, "GET /api/cardano/asset/{asset}", "GET", lambda r, d: f"/api/cardano/asset/{r.choice(d['assets'])}", None),
+    (2, "GET /api/cardano/asset/{asset}/stats", "GET", lambda r, d: f"/api/cardano/asset/{r.choice(d['assets'])}/stats", None),
+    (1, "GET /api/cardano/asset/{asset}/history", "GET", lambda r, d: f"/api/cardano/asset/{r.choice(d['assets'])}/history", None),
+    (1, "GET /api/cardano/asset/{asset}/transactions", "GET", lambda r, d: f"/api/cardano/asset/{r.choice(d['assets'])}/transactions?page=2", None),
+    (1, "GET /api/cardano/asset/{asset}/addresses", "GET", lambda r, d: f"/api/cardano/asset/{r.choice(d['assets'])}/addresses", None),
+    (2, "GET /api/cardano/tokens", "GET", lambda r, d: f"/api/cardano/tokens?limit=20&page={r.randint(1, 5)}", None),
+    (1, "GET /api/cardano/pools", "GET", lambda r, d: "/api/cardano/pools?limit=5", None),
+    (2, "GET /api/cardano/latest-blocks", "GET", lambda r, d: "/api/cardano/latest-blocks?limit=5", None),
+]
+
+# Request headers per route, for the routes that need them
+HEADERS: Dict[str, Callable[[random.Random, Dict[str, Any]], Dict[str, str]]] = {
+    # Market updates require If-Match; * applies them to whatever version is current
+    "PUT /api/markets/{market_id}": lambda r, d: {"If-Match": "*"},
+}
+
+# Routes sent with If-None-Match set to the last ETag seen for the same URL, as
+# a polling dashboard would; they measure the 304 path while markets change
+CONDITIONAL = {
+    "GET /api/markets/bootstrap (If-None-Match)",
+    "GET /api/markets/ (If-None-Match)",
+    "GET /api/markets/{market_id} (If-None-Match)",
+}
+
+def seed(mongo_url: str, market_count: int, user_count: int) -> Dict[str, Any]:
+    """Reset the load test database and return the IDs requests pick from"""
+    client = MongoClient(mongo_url)
+    client.drop_database(DB_NAME)
+    db = client[DB_NAME]
+
+    markets = make_markets(market_count)
+    for market in markets:
+        market["version"] = 1
+    db.markets.insert_many([dict(market) for market in markets])
+    db.markets.create_index("id", unique=True)
+    db.markets.create_index("asset_id", unique=True)
+
+    rng = random.Random(7)
+    addresses = [f"addr_test1loadtest{i:06d}" for i in range(user_count)]
+    positions = []
+    for address in addresses:
+        supplies = [{"asset_id": m["asset_id"], "amount": "1000", "amount_usd": 1000 * m["price_usd"], "apy": m["supply_apy"], "used_as_collateral": True}
+                    for m in rng.sample(markets, min(3, len(markets)))]
+        borrows = [{"asset_id": m["asset_id"], "amount": "10", "amount_usd": 10 * m["price_usd"], "apy": m["borrow_apy"]}
+                   for m in rng.sample(markets, min(1, len(markets)))]
+        positions.append({
+            "id": address, "user_address": address, "supplies": supplies, "borrows": borrows,
+            "total_supplied_usd": sum(s["amount_usd"] for s in supplies),
+            "total_borrowed_usd": sum(b["amount_usd"] for b in borrows),
+            "borrow_limit_usd": 0.0, "health_factor": 1.5,
+            "created_at": datetime.utcnow(), "updated_at": datetime.utcnow(),
+        })
+    db.user_positions.insert_many(positions)
+    db.user_positions.create_index("user_address", unique=True)
+    client.close()
+
+    return {
+        "market_ids": [market["id"] for market in markets],
+        "market_assets": [market["asset_id"] for market in markets],
+        "addresses": addresses,
+        "assets": [POLICY_ID + f"token{i}".encode().hex() for i in range(20)],
+        "tx_hashes": [f"{i:04x}" + "ab" * 30 for i in range(0, 4000, 40)],
+    }
+
+def start_servers(args, workdir: str) -> List[subprocess.Popen]:
+    """Start the fake Blockfrost server and the API as child processes"""
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_blockfrost:app", "--port", str(args.blockfrost_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "FAKE_BLOCKFROST_LATENCY_MS": str(args.blockfrost_latency_ms)},
+    )
+    api = subprocess.Popen(
+        [sys.executable, "server.py"],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "MONGO_URL": args.mongo_url,
+            "DB_NAME": DB_NAME,
+            "SERVER_HOST": "127.0.0.1",
+            "SERVER_PORT": str(args.port),
+            "SERVER_WORKERS": str(args.workers),
+            "BLOCKFROST_API_KEY": "loadtest",
+            "BLOCKFROST_BASE_URL": f"http://127.0.0.1:{args.blockfrost_port}",
+            "CHAIN_CACHE_DIR": workdir,
+            "PROMETHEUS_MULTIPROC_DIR": workdir,
+        },
+    )
+    return [fake, api]
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"API not ready after {timeout}s")
+
+async def run_level(client: httpx.AsyncClient, data: Dict[str, Any], concurrency: int, duration: float) -> Dict[str, Dict[str, float]]:
+    """Run the request mix with concurrency workers for duration seconds"""
+    weights = [request[0] for request in MIX]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    not_modified: Dict[str, int] = defaultdict(int)
+    etags: Dict[str, str] = {}  # last ETag returned per URL, shared by all workers
+    deadline = time.monotonic() + duration
+
+    async def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.monotonic() < deadline:
+            _, name, method, path, body = rng.choices(MIX, weights)[0]
+            url = path(rng, data)
+            headers = HEADERS[name](rng, data) if name in HEADERS else {}
+            if name in CONDITIONAL and url in etags:
+                headers["If-None-Match"] = etags[url]
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body(rng, data) if body else None, headers=headers)
+                failed = response.status_code >= 500
+            except httpx.HTTPError:
+                response, failed = None, True
+            latencies[name].append(time.perf_counter() - start)
+            if failed:
+                errors[name] += 1
+            elif response.status_code == 304:
+                not_modified[name] += 1
+            elif method == "GET" and "etag" in response.headers:
+                etags[url] = response.headers["etag"]
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.monotonic() - started
+
+    return {name: summarize(samples, errors[name], not_modified[name], elapsed) for name, samples in latencies.items()}
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def summarize(samples: List[float], errors: int, not_modified: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "not_modified": not_modified,
+        "rps": len(ordered) / elapsed,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+    }
+
+def print_level(concurrency: int, results: Dict[str, Dict[str, float]]) -> None:
+    print(f"\nconcurrency {concurrency}")
+    print(f"{'route':<52} {'reqs':>7} {'err':>5} {'304':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name in sorted(results):
+        r = results[name]
+        print(f"{name:<52} {r['requests']:>7} {r['errors']:>5} {r['not_modified']:>6} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+def compare(run: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_requests: int = 20) -> List[str]:
+    """List routes whose p95 rose or throughput fell by more than tolerance"""
+    regressions = []
+    for level, routes in run["levels"].items():
+        for name, current in routes.items():
+            base = baseline["levels"].get(level, {}).get(name)
+            if base is None or min(base["requests"], current["requests"]) < min_requests:
+                continue
+            if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"c={level} {name}: p95 {base['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+            if current["rps"] < base["rps"] * (1 - tolerance):
+                regressions.append(f"c={level} {name}: rps {base['rps']:.1f} -> {current['rps']:.1f}")
+    return regressions
+
+async def main_async(args) -> int:
+    data = seed(args.mongo_url, args.markets, args.users)
+
+    processes = []
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    if not args.no_servers:
+        processes = start_servers(args, workdir)
+    base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+            await wait_ready(client)
+
+            run = {"created_at": datetime.utcnow().isoformat(), "config": vars(args), "levels": {}}
+            for concurrency in args.concurrency:
+                results = await run_level(client, data, concurrency, args.duration)
+                run["levels"][str(concurrency)] = results
+                print_level(concurrency, results)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    result_path = RESULTS_DIR / f"loadtest-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    result_path.write_text(json.dumps(run, indent=2))
+    print(f"\nResults written to {result_path}")
+
+    if args.save_baseline:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(run, indent=2))
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return 0
+
+    if not BASELINE_PATH.exists():
+        print("No baseline yet; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(run, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%} against the baseline")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test for the /api routes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--markets", type=int, default=50)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--blockfrost-port", type=int, default=8099)
+    parser.add_argument("--blockfrost-latency-ms", type=float, default=20)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--base-url", help="target an already running API instead of starting one")
+    parser.add_argument("--no-servers", action="store_true", help="do not start the API or fake Blockfrost")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/rps regression before failing")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+if __name__ == "__main__":
+    main()
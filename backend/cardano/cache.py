@@ -0,0 +1,112 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from settings import METRICS_ENABLED
+
+class TTLCache:
+    """A small thread-safe LRU cache whose entries expire after a TTL
+
+    When a backing DiskCache is given, misses fall through to it and writes go
+    to both tiers, so entries outlive the process.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, backing=None, namespace: str = "", name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backing = backing
+        self.namespace = namespace
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters are bound once so recording a lookup is a single increment
+        self._hit = self._disk_hit = self._miss = None
+        if METRICS_ENABLED:
+            from metrics import CACHE_REQUESTS
+            cache_name = name or namespace or "default"
+            self._hit = CACHE_REQUESTS.labels(cache_name, "hit")
+            self._disk_hit = CACHE_REQUESTS.labels(cache_name, "disk_hit")
+            self._miss = CACHE_REQUESTS.labels(cache_name, "miss")
+
+    @staticmethod
+    def _record(counter) -> None:
+        if counter is not None:
+            counter.inc()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._record(self._hit)
+                    return value
+                del self._data[key]
+
+        stored = None if self.backing is None else self.backing.get(self.namespace, key)
+        if stored is None:
+            self._record(self._miss)
+            return default
+        self._record(self._disk_hit)
+
+        # Promote to memory for whatever is left of the stored TTL
+        value, expires_at = stored
+        remaining = float("inf") if expires_at is None else expires_at - time.time()
+        self._store(key, value, remaining)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        ttl = self.ttl if ttl is None else ttl
+        self._store(key, value, ttl)
+        if self.backing is not None:
+            self.backing.set(self.namespace, key, value, ttl)
+
+    def _store(self, key: Hashable, value: Any, ttl: float) -> None:
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+        if self.backing is not None:
+            self.backing.delete(self.namespace, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class ChainCache:
+    """Two-tier cache for chain objects
+
+    Objects buried deep enough to be final never change, so they live in a
+    tier without expiry (bounded only by LRU size). Objects that could still
+    be rolled back go to a short-TTL tier.
+    """
+
+    def __init__(self, maxsize: int = 4096, pending_ttl: float = 20.0, backing=None):
+        self.final = TTLCache(maxsize=maxsize, ttl=float("inf"), backing=backing, namespace="final", name="chain_final")
+        self.pending = TTLCache(maxsize=maxsize, ttl=pending_ttl, backing=backing, namespace="pending", name="chain_pending")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.final.get(key)
+        if value is None:
+            value = self.pending.get(key)
+        return default if value is None else value
+
+    def set(self, key: Hashable, value: Any, final: bool) -> None:
+        if final:
+            self.pending.delete(key)
+            self.final.set(key, value)
+        else:
+            self.pending.set(key, value)
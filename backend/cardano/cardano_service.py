@@ -1,12 +1,66 @@
-from blockfrost import BlockFrostApi, ApiError
+import asyncio
 import os
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 import logging
 
-from settings import BLOCKFROST_API_KEY, BLOCKFROST_NETWORK
+from settings import (
+    BLOCKFROST_API_KEY,
+    BLOCKFROST_NETWORK,
+    BLOCKFROST_BASE_URL,
+    ASSET_STATS_TTL,
+    ASSET_STATS_PAGE_SIZE,
+    ASSET_STATS_MAX_PAGES,
+    CHAIN_FINALITY_DEPTH,
+    CHAIN_PENDING_TTL,
+    CHAIN_CACHE_SIZE,
+    CHAIN_CACHE_DIR,
+    CHAIN_CACHE_MAX_BYTES,
+    CHAIN_CACHE_VERSION,
+    METRICS_ENABLED,
+)
+from cardano.cache import TTLCache, ChainCache
+from cardano.disk_cache import DiskCache
 
 logger = logging.getLogger(__name__)
 
+# The Blockfrost client pulls in requests and friends; it is imported by the
+# first CardanoService so that importing this module stays cheap at startup
+BlockFrostApi = None
+ApiError = None
+
+def _load_blockfrost() -> None:
+    global BlockFrostApi, ApiError
+    if BlockFrostApi is None:
+        from blockfrost import BlockFrostApi as api_class, ApiError as error_class
+        BlockFrostApi, ApiError = api_class, error_class
+
+def _open_disk_cache() -> Optional[DiskCache]:
+    """Open the shared on-disk cache tier, or run memory-only if it is disabled or unusable"""
+    if not CHAIN_CACHE_DIR:
+        return None
+    try:
+        return DiskCache(Path(CHAIN_CACHE_DIR) / "chain_cache.sqlite3", CHAIN_CACHE_MAX_BYTES, version=CHAIN_CACHE_VERSION)
+    except Exception as e:
+        logger.warning(f"Disk cache unavailable, using memory only: {e}")
+        return None
+
+_disk_cache = _open_disk_cache()
+
+# Asset counts are shared across service instances (one is created per request)
+_asset_stats_cache = TTLCache(maxsize=2048, ttl=ASSET_STATS_TTL, backing=_disk_cache, namespace="asset_stats")
+
+# Transactions, blocks and assets; final objects are kept until evicted
+_chain_cache = ChainCache(maxsize=CHAIN_CACHE_SIZE, pending_ttl=CHAIN_PENDING_TTL, backing=_disk_cache)
+
+def _to_plain(value: Any) -> Any:
+    """Convert BlockFrost response objects into plain dicts and lists"""
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    if hasattr(value, "__dict__"):
+        return {key: _to_plain(item) for key, item in vars(value).items()}
+    return value
+
 class CardanoService:
     def __init__(self):
         # Get API key and network from environment variables
@@ -17,7 +71,10 @@ class CardanoService:
             raise ValueError("BLOCKFROST_API_KEY environment variable is not set")
         
         # Initialize BlockFrost API
-        if network == "mainnet":
+        _load_blockfrost()
+        if BLOCKFROST_BASE_URL:
+            self.api = BlockFrostApi(project_id=api_key, base_url=BLOCKFROST_BASE_URL)
+        elif network == "mainnet":
             self.api = BlockFrostApi(project_id=api_key)
         elif network == "preprod":
             self.api = BlockFrostApi(project_id=api_key, base_url="https://cardano-preprod.blockfrost.io/api/v0")
@@ -26,9 +83,51 @@ class CardanoService:
         else:
             raise ValueError(f"Unsupported network: {network}")
         
+        # Record latency and errors per Blockfrost endpoint
+        if METRICS_ENABLED:
+            from metrics import InstrumentedClient
+            self.api = InstrumentedClient(self.api)
+        
         self.network = network
         logger.info(f"CardanoService initialized with network: {network}")
 
+    def _tip_height(self) -> int:
+        """Get the current chain tip height, refreshed at most once per pending TTL"""
+        height = _chain_cache.get("tip_height")
+        if height is None:
+            height = self.api.block_latest().height
+            _chain_cache.set("tip_height", height, final=False)
+        return height
+
+    def _is_final(self, block_height: Optional[int]) -> bool:
+        """Whether an object in the block at block_height can no longer be rolled back"""
+        if block_height is None:
+            return False
+        return self._tip_height() - block_height + 1 >= CHAIN_FINALITY_DEPTH
+
+    def _get_block(self, hash_or_number: str) -> Dict[str, Any]:
+        """Get a block, served from the chain cache when possible"""
+        key = ("block", hash_or_number)
+        block = _chain_cache.get(key)
+        if block is None:
+            block = _to_plain(self.api.block(hash_or_number))
+            final = (block.get("confirmations") or 0) >= CHAIN_FINALITY_DEPTH
+            _chain_cache.set(key, block, final=final)
+        return block
+
+    def _get_asset(self, asset: str) -> Dict[str, Any]:
+        """Get asset details; these change with later mints or burns so they are never final"""
+        key = ("asset", asset)
+        asset_info = _chain_cache.get(key)
+        if asset_info is None:
+            asset_info = _to_plain(self.api.asset(asset))
+            _chain_cache.set(key, asset_info, final=False)
+        return asset_info
+
+    async def warm_cache(self) -> None:
+        """Prime the chain cache so the first requests after startup skip the tip lookup"""
+        await asyncio.to_thread(self._tip_height)
+
     async def get_network_info(self) -> Dict[str, Any]:
         """Get general information about the Cardano network"""
         try:
@@ -99,6 +198,11 @@ class CardanoService:
 
     async def get_transaction_info(self, tx_hash: str) -> Dict[str, Any]:
         """Get information about a transaction"""
+        key = ("transaction", tx_hash)
+        cached = _chain_cache.get(key)
+        if cached is not None:
+            return cached
+        
         try:
             # Get transaction info
             tx = self.api.transaction(tx_hash)
@@ -106,14 +210,13 @@ class CardanoService:
             # Get transaction UTXOs
             tx_utxos = self.api.transaction_utxos(tx_hash)
             
-            # Return transaction info
-            return {
+            result = {
                 "hash": tx.hash,
                 "block": tx.block,
                 "block_height": tx.block_height,
                 "slot": tx.slot,
                 "index": tx.index,
-                "output_amount": tx_utxos.outputs,
+                "output_amount": _to_plain(tx_utxos.outputs),
                 "fees": tx.fees,
                 "deposit": tx.deposit,
                 "size": tx.size,
@@ -125,6 +228,10 @@ class CardanoService:
                 "stake_cert_count": tx.stake_cert_count,
                 "asset_mint_or_burn_count": tx.asset_mint_or_burn_count,
             }
+            
+            # Cache permanently once the transaction is deep enough in the chain
+            _chain_cache.set(key, result, final=self._is_final(tx.block_height))
+            return result
         except ApiError as e:
             logger.error(f"BlockFrost API error: {e}")
             raise
@@ -133,34 +240,101 @@ class CardanoService:
         """Get information about a native token/asset"""
         try:
             # Get asset info
-            asset_info = self.api.asset(asset)
-            
-            # Get asset history
-            asset_history = self.api.asset_history(asset)
-            
-            # Get asset transactions
-            asset_txs = self.api.asset_transactions(asset)
+            asset_info = self._get_asset(asset)
             
-            # Get asset addresses
-            asset_addresses = self.api.asset_addresses(asset)
+            # Get counts without downloading the full history, transactions and addresses
+            stats = await self.get_asset_stats(asset)
             
             # Return asset info
             return {
                 "asset": asset,
-                "policy_id": asset_info.policy_id,
-                "asset_name": asset_info.asset_name,
-                "fingerprint": asset_info.fingerprint,
-                "quantity": asset_info.quantity,
-                "initial_mint_tx_hash": asset_info.initial_mint_tx_hash,
-                "mint_or_burn_count": len(asset_history),
-                "transaction_count": len(asset_txs),
-                "address_count": len(asset_addresses),
-                "metadata": asset_info.metadata
+                "policy_id": asset_info["policy_id"],
+                "asset_name": asset_info["asset_name"],
+                "fingerprint": asset_info["fingerprint"],
+                "quantity": asset_info["quantity"],
+                "initial_mint_tx_hash": asset_info["initial_mint_tx_hash"],
+                "mint_or_burn_count": stats["mint_or_burn_count"],
+                "transaction_count": stats["transaction_count"],
+                "address_count": stats["address_count"],
+                "counts_exact": stats["exact"],
+                "metadata": asset_info["metadata"]
             }
         except ApiError as e:
             logger.error(f"BlockFrost API error: {e}")
             raise
 
+    def _count_items(self, fetch, asset: str, max_pages: Optional[int]) -> Dict[str, Any]:
+        """Count the items of a paginated asset endpoint one page at a time
+
+        Pages are discarded as soon as they are counted. When max_pages is reached
+        before the last page, the count is a lower bound and exact is False.
+        """
+        count = 0
+        page = 1
+        while max_pages is None or page <= max_pages:
+            items = fetch(asset, count=ASSET_STATS_PAGE_SIZE, page=page)
+            count += len(items)
+            if len(items) < ASSET_STATS_PAGE_SIZE:
+                return {"count": count, "exact": True}
+            page += 1
+        return {"count": count, "exact": False}
+
+    async def get_asset_stats(self, asset: str, exact: bool = False) -> Dict[str, Any]:
+        """Get mint/burn, transaction and address counts for an asset
+
+        Unless exact is set, counting stops after ASSET_STATS_MAX_PAGES pages and
+        the affected counts are reported as lower bounds.
+        """
+        # An exact result also answers a non-exact request
+        cached = _asset_stats_cache.get((asset, True))
+        if cached is None and not exact:
+            cached = _asset_stats_cache.get((asset, False))
+        if cached is not None:
+            return cached
+        
+        try:
+            max_pages = None if exact else ASSET_STATS_MAX_PAGES
+            counts = {
+                "mint_or_burn_count": self._count_items(self.api.asset_history, asset, max_pages),
+                "transaction_count": self._count_items(self.api.asset_transactions, asset, max_pages),
+                "address_count": self._count_items(self.api.asset_addresses, asset, max_pages),
+            }
+        except ApiError as e:
+            logger.error(f"BlockFrost API error: {e}")
+            raise
+        
+        stats = {"asset": asset}
+        stats.update({name: result["count"] for name, result in counts.items()})
+        stats["exact"] = {name: result["exact"] for name, result in counts.items()}
+        
+        all_exact = all(stats["exact"].values())
+        _asset_stats_cache.set((asset, all_exact), stats)
+        return stats
+
+    async def get_asset_history(self, asset: str, page: int = 1, count: int = 100, order: str = "asc") -> List[Dict[str, Any]]:
+        """Get one page of an asset's mint and burn history"""
+        try:
+            return _to_plain(self.api.asset_history(asset, count=count, page=page, order=order))
+        except ApiError as e:
+            logger.error(f"BlockFrost API error: {e}")
+            raise
+
+    async def get_asset_transactions(self, asset: str, page: int = 1, count: int = 100, order: str = "asc") -> List[Dict[str, Any]]:
+        """Get one page of the transactions involving an asset"""
+        try:
+            return _to_plain(self.api.asset_transactions(asset, count=count, page=page, order=order))
+        except ApiError as e:
+            logger.error(f"BlockFrost API error: {e}")
+            raise
+
+    async def get_asset_addresses(self, asset: str, page: int = 1, count: int = 100, order: str = "asc") -> List[Dict[str, Any]]:
+        """Get one page of the addresses holding an asset"""
+        try:
+            return _to_plain(self.api.asset_addresses(asset, count=count, page=page, order=order))
+        except ApiError as e:
+            logger.error(f"BlockFrost API error: {e}")
+            raise
+
     async def get_latest_protocol_parameters(self) -> Dict[str, Any]:
         """Get the latest protocol parameters"""
         try:
@@ -235,32 +409,6 @@ class CardanoService:
             logger.error(f"BlockFrost API error: {e}")
             raise
 
-    async def get_token_registry(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get a list of registered tokens"""
-        try:
-            # Get all assets
-            assets = self.api.assets(count=limit, order="desc")
-            
-            result = []
-            for asset in assets:
-                # Get asset details
-                asset_info = self.api.asset(asset)
-                
-                result.append({
-                    "asset": asset,
-                    "policy_id": asset_info.policy_id,
-                    "asset_name": asset_info.asset_name,
-                    "fingerprint": asset_info.fingerprint,
-                    "quantity": asset_info.quantity,
-                    "initial_mint_tx_hash": asset_info.initial_mint_tx_hash,
-                    "metadata": asset_info.metadata
-                })
-            
-            return result
-        except ApiError as e:
-            logger.error(f"BlockFrost API error: {e}")
-            raise
-            
     async def get_stake_pools(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get a list of stake pools"""
         try:
@@ -334,13 +482,8 @@ class CardanoService:
                         asset_name_hex = unit[56:]
                         
                         # Get asset info
-                        asset_info = self.api.asset(unit)
-                        
-                        # Try to get metadata
-                        try:
-                            metadata = asset_info.metadata
-                        except:
-                            metadata = None
+                        asset_info = self._get_asset(unit)
+                        metadata = asset_info.get("metadata")
                         
                         token_details[unit] = {
                             "policy_id": policy_id,
@@ -375,25 +518,25 @@ class CardanoService:
             # Fetch the latest blocks up to the limit
             for _ in range(limit):
                 # Get block info
-                block = self.api.block(current_hash)
+                block = self._get_block(current_hash)
                 
                 block_info = {
-                    "hash": block.hash,
-                    "height": block.height,
-                    "time": block.time,
-                    "slot": block.slot,
-                    "epoch": block.epoch,
-                    "epoch_slot": block.epoch_slot,
-                    "size": block.size,
-                    "tx_count": block.tx_count,
-                    "previous_block": block.previous_block,
+                    "hash": block["hash"],
+                    "height": block["height"],
+                    "time": block["time"],
+                    "slot": block["slot"],
+                    "epoch": block["epoch"],
+                    "epoch_slot": block["epoch_slot"],
+                    "size": block["size"],
+                    "tx_count": block["tx_count"],
+                    "previous_block": block["previous_block"],
                 }
                 
                 result.append(block_info)
                 
                 # Move to the previous block
-                if block.previous_block:
-                    current_hash = block.previous_block
+                if block["previous_block"]:
+                    current_hash = block["previous_block"]
                 else:
                     break
             
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    expires_at REAL,
+    stored_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at);
+"""
+
+class DiskCache:
+    """Persistent cache tier stored in a local SQLite database
+
+    Values are stored as JSON together with an absolute expiry time and the
+    cache format version, so entries survive restarts and are ignored once the
+    version changes. The database runs in WAL mode with a busy timeout, which
+    lets several worker processes share one file. Every compact_every writes,
+    expired entries are removed and the oldest entries are evicted until the
+    file is back under max_bytes.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, version: int = 1, compact_every: int = 256):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.compact_every = compact_every
+        self._local = threading.local()
+        self._writes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection; sqlite3 connections are not shared across threads"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(namespace: str, key: Hashable) -> str:
+        return namespace + ":" + json.dumps(key, separators=(",", ":"))
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Tuple[Any, Optional[float]]]:
+        """Return (value, expires_at) for a live entry, or None"""
+        try:
+            row = self._connection().execute(
+                "SELECT value, version, expires_at FROM entries WHERE key = ?",
+                (self._key(namespace, key),),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache read failed: {e}")
+            return None
+
+        if row is None:
+            return None
+        value, version, expires_at = row
+        if version != self.version or (expires_at is not None and expires_at <= time.time()):
+            return None
+        return json.loads(value), expires_at
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; a ttl of None or infinity never expires"""
+        now = time.time()
+        expires_at = None if ttl is None or ttl == float("inf") else now + ttl
+        try:
+            payload = json.dumps(value, separators=(",", ":"), default=str)
+            self._connection().execute(
+                "INSERT OR REPLACE INTO entries (key, value, version, expires_at, stored_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(namespace, key), payload, self.version, expires_at, now, len(payload)),
+            )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Disk cache write failed: {e}")
+            return
+
+        self._writes += 1
+        if self._writes % self.compact_every == 0:
+            self.compact()
+
+    def delete(self, namespace: str, key: Hashable) -> None:
+        try:
+            self._connection().execute("DELETE FROM entries WHERE key = ?", (self._key(namespace, key),))
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache delete failed: {e}")
+
+    def compact(self) -> None:
+        """Drop expired and stale-version entries, then evict the oldest until under max_bytes"""
+        try:
+            conn = self._connection()
+            conn.execute(
+                "DELETE FROM entries WHERE (expires_at IS NOT NULL AND expires_at <= ?) OR version != ?",
+                (time.time(), self.version),
+            )
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            # Evict oldest entries in batches until we are 10% under the limit
+            target = int(self.max_bytes * 0.9)
+            while total > target:
+                rows = conn.execute(
+                    "SELECT key, size FROM entries ORDER BY stored_at LIMIT 500"
+                ).fetchall()
+                if not rows:
+                    break
+                evicted = []
+                for key, size in rows:
+                    if total <= target:
+                        break
+                    evicted.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache compaction failed: {e}")
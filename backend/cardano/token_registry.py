@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from settings import TOKEN_REGISTRY_SYNC_INTERVAL, TOKEN_REGISTRY_SYNC_LEASE, TOKEN_REGISTRY_SYNC_MAX_PAGES
+
+logger = logging.getLogger(__name__)
+
+DESCENDING = -1  # pymongo.DESCENDING; pymongo is imported where it is used, to keep it out of import time
+
+PAGE_SIZE = 100  # Blockfrost maximum page size
+STATE_ID = "token_registry"
+MAX_HEAD_PAGES = 200  # listing pages walked looking for the high-water asset before starting over from the newest
+
+_FINGERPRINT_RE = re.compile(r"^asset1[0-9a-z]{38}$")
+_POLICY_ID_RE = re.compile(r"^[0-9a-f]{56}$")
+
+async def ensure_indexes(db) -> None:
+    """Create the indexes the token registry is queried by
+
+    Search reads the lowercased ticker_lc and name_lc fields with anchored
+    prefix regexes, which use their indexes; entries stored before those
+    fields existed are filled in here.
+    """
+    await db.token_registry.create_index("asset", unique=True)
+    await db.token_registry.create_index("policy_id")
+    await db.token_registry.create_index("fingerprint")
+    await db.token_registry.create_index("ticker_lc")
+    await db.token_registry.create_index("name_lc")
+    await db.token_registry.create_index([("registry_index", DESCENDING)])
+    await db.token_registry.update_many(
+        {"ticker_lc": {"$exists": False}},
+        [{"$set": {
+            "ticker_lc": {"$cond": [{"$eq": [{"$type": "$ticker"}, "string"]}, {"$toLower": "$ticker"}, None]},
+            "name_lc": {"$cond": [{"$eq": [{"$type": "$name"}, "string"]}, {"$toLower": "$name"}, None]},
+        }}],
+    )
+
+def _lower(value: Any) -> Optional[str]:
+    return value.lower() if isinstance(value, str) else None
+
+def _token_document(asset_info: Any, registry_index: int) -> Dict[str, Any]:
+    """Build the stored registry entry for a BlockFrost asset response"""
+    metadata = asset_info.metadata
+    metadata_dict = vars(metadata) if metadata is not None and hasattr(metadata, "__dict__") else metadata
+    ticker = metadata_dict.get("ticker") if isinstance(metadata_dict, dict) else None
+    name = metadata_dict.get("name") if isinstance(metadata_dict, dict) else None
+
+    return {
+        "asset": asset_info.asset,
+        "policy_id": asset_info.policy_id,
+        "asset_name": asset_info.asset_name,
+        "fingerprint": asset_info.fingerprint,
+        "quantity": asset_info.quantity,
+        "initial_mint_tx_hash": asset_info.initial_mint_tx_hash,
+        "metadata": metadata_dict,
+        "ticker": ticker,
+        "name": name,
+        "ticker_lc": _lower(ticker),
+        "name_lc": _lower(name),
+        "registry_index": registry_index,
+        "synced_at": datetime.utcnow(),
+    }
+
+def _pending_document(unit: str, registry_index: int) -> Dict[str, Any]:
+    """Registry entry built from the listing alone, until its details are fetched"""
+    return {
+        "asset": unit,
+        "policy_id": unit[:56],
+        "asset_name": unit[56:] or None,
+        "registry_index": registry_index,
+        "details_pending": True,
+        "synced_at": datetime.utcnow(),
+    }
+
+class _LeaseLost(Exception):
+    """Another worker took the sync lease while this run was still going"""
+
+class _Lease:
+    """The sync lease held by one run, tagged with an owner token
+
+    A run makes up to a few hundred Blockfrost calls, far longer than one
+    lease, so it calls renew() after each of them; the lease is extended
+    once half of it has passed. Renewing, and saving the run's state, only
+    succeed while the owner token is still the one stored, so a run whose
+    lease expired and was taken over stops instead of moving the high-water
+    mark under the new holder.
+    """
+
+    def __init__(self, db, owner: str, duration: float):
+        self.db = db
+        self.owner = owner
+        self.duration = duration
+        self._renewed_at = time.monotonic()
+
+    async def renew(self) -> None:
+        if time.monotonic() - self._renewed_at < self.duration / 2:
+            return
+        result = await self.db.sync_state.update_one(
+            {"_id": STATE_ID, "lease_owner": self.owner},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=self.duration)}},
+        )
+        if result.matched_count == 0:
+            raise _LeaseLost("Token registry sync lease was taken over by another worker")
+        self._renewed_at = time.monotonic()
+
+async def _acquire_lease(db, duration: float) -> Optional[Tuple[Dict[str, Any], _Lease]]:
+    """Take the sync lease so only one worker syncs at a time; returns the sync state and the lease"""
+    from pymongo import ReturnDocument
+    now = datetime.utcnow()
+    owner = uuid.uuid4().hex
+    try:
+        state = await db.sync_state.find_one_and_update(
+            {"_id": STATE_ID, "$or": [{"lease_until": {"$lt": now}}, {"lease_until": {"$exists": False}}]},
+            {"$set": {"lease_until": now + timedelta(seconds=duration), "lease_owner": owner}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except Exception as e:
+        # A duplicate key error here means another worker holds the lease
+        logger.debug(f"Token registry lease not acquired: {e}")
+        return None
+    return state, _Lease(db, owner, duration)
+
+async def _list_page(api, lease: _Lease, page: int) -> List[str]:
+    """Asset units on one page of the Blockfrost listing, newest first"""
+    listing = await asyncio.to_thread(api.assets, count=PAGE_SIZE, page=page, order="desc")
+    await lease.renew()
+    return [item.asset for item in listing]
+
+async def _fetch_token(api, lease: _Lease, unit: str, registry_index: int) -> Dict[str, Any]:
+    document = _token_document(await asyncio.to_thread(api.asset, unit), registry_index)
+    await lease.renew()
+    return document
+
+async def _store_tokens(db, api, lease: _Lease, entries: List[Tuple[str, int]], detail_budget: int) -> Tuple[int, int]:
+    """Upsert (unit, registry_index) entries that are not stored yet
+
+    Details are fetched for at most detail_budget assets; the rest are stored
+    from the listing alone and completed by later runs. Returns the number of
+    tokens stored and of detail requests made.
+    """
+    from pymongo import UpdateOne
+    units = [unit for unit, _ in entries]
+    known = {doc["asset"] async for doc in db.token_registry.find({"asset": {"$in": units}}, {"asset": 1, "_id": 0})}
+
+    operations, fetched = [], 0
+    for unit, registry_index in entries:
+        if unit in known:
+            continue
+        if fetched < detail_budget:
+            document = await _fetch_token(api, lease, unit, registry_index)
+            fetched += 1
+        else:
+            document = _pending_document(unit, registry_index)
+        operations.append(UpdateOne({"asset": unit}, {"$set": document}, upsert=True))
+
+    if operations:
+        await db.token_registry.bulk_write(operations, ordered=False)
+    return len(operations), fetched
+
+async def _complete_pending(db, api, lease: _Lease, detail_budget: int) -> int:
+    """Fetch details for tokens stored from the listing alone, newest first"""
+    from pymongo import UpdateOne
+    cursor = (
+        db.token_registry.find({"details_pending": True}, {"asset": 1, "registry_index": 1, "_id": 0})
+        .sort("registry_index", DESCENDING)
+        .limit(detail_budget)
+    )
+    operations = []
+    async for doc in cursor:
+        document = await _fetch_token(api, lease, doc["asset"], doc["registry_index"])
+        operations.append(UpdateOne({"asset": doc["asset"]}, {"$set": document, "$unset": {"details_pending": ""}}))
+    if operations:
+        await db.token_registry.bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def sync_token_registry(db, api, max_pages: int = TOKEN_REGISTRY_SYNC_MAX_PAGES, lease_duration: float = TOKEN_REGISTRY_SYNC_LEASE) -> int:
+    """Pull new tokens, then older ones, into the token_registry collection
+
+    Each run first lists Blockfrost assets newest first down to the newest
+    asset stored by the previous run (the high-water mark), so recent tokens
+    show up within one sync interval. Listing pages are cheap, so this walk
+    may go past max_pages (up to MAX_HEAD_PAGES); detail requests are capped
+    at max_pages pages' worth of assets per run, and tokens over that budget
+    are stored from the listing and completed by later runs. The remaining page budget backfills older
+    assets from an offset below the high-water mark that moves down with
+    every run and is shifted as new assets arrive.
+
+    registry_index orders tokens newest first: the asset at offset o from the
+    newest one gets head_index - o. Returns the number of tokens stored.
+
+    The run holds a lease, renewed between Blockfrost calls. If another
+    worker takes it over anyway, the run stops and its progress is not
+    saved; tokens already stored are kept and found again by the next run.
+    """
+    acquired = await _acquire_lease(db, lease_duration)
+    if acquired is None:
+        return 0
+    state, lease = acquired
+
+    head_asset = state.get("head_asset")
+    head_index = state.get("head_index")
+    tail_offset = state.get("tail_offset", 0)
+    tail_done = state.get("tail_done", False)
+    detail_budget = max_pages * PAGE_SIZE
+    synced = 0
+    try:
+        if head_index is None:
+            # First run: place the listing above anything stored by earlier versions of the sync
+            newest = await db.token_registry.find_one({}, {"registry_index": 1}, sort=[("registry_index", DESCENDING)])
+            head_index = (newest or {}).get("registry_index", 0)
+
+        # Newest first, down to the high-water mark
+        new_units: List[str] = []
+        page, found = 1, False
+        while True:
+            units = await _list_page(api, lease, page)
+            if head_asset in units:
+                new_units += units[:units.index(head_asset)]
+                found = True
+                break
+            new_units += units
+            if len(units) < PAGE_SIZE or page >= (max_pages if head_asset is None else MAX_HEAD_PAGES):
+                break
+            page += 1
+        if head_asset is not None and not found:
+            logger.warning(f"Token registry high-water asset {head_asset} not found; restarting from the newest asset")
+            tail_done = False
+
+        if new_units:
+            new_head_index = head_index + len(new_units)
+            stored, fetched = await _store_tokens(
+                db, api, lease, [(unit, new_head_index - offset) for offset, unit in enumerate(new_units)], detail_budget,
+            )
+            synced += stored
+            detail_budget -= fetched
+            # Everything below the old head moved down by the number of new assets
+            head_asset, head_index = new_units[0], new_head_index
+            tail_offset = tail_offset + len(new_units) if found else len(new_units)
+
+        if detail_budget > 0:
+            detail_budget -= await _complete_pending(db, api, lease, detail_budget)
+
+        # Backfill older assets with the remaining page budget
+        for _ in range(max(0, max_pages - page) if not tail_done else 0):
+            skip = tail_offset % PAGE_SIZE
+            units = (await _list_page(api, lease, tail_offset // PAGE_SIZE + 1))[skip:]
+            stored, fetched = await _store_tokens(
+                db, api, lease, [(unit, head_index - tail_offset - i) for i, unit in enumerate(units)], detail_budget,
+            )
+            synced += stored
+            detail_budget -= fetched
+            tail_offset += len(units)
+            if len(units) < PAGE_SIZE - skip:
+                tail_done = True
+                break
+    except _LeaseLost:
+        # Stop here; the state update below finds the lease gone and logs it
+        return synced
+    finally:
+        # Saved only while this run still owns the lease; the $unset releases it
+        saved = await db.sync_state.update_one(
+            {"_id": STATE_ID, "lease_owner": lease.owner},
+            {
+                "$set": {
+                    "head_asset": head_asset,
+                    "head_index": head_index,
+                    "tail_offset": tail_offset,
+                    "tail_done": tail_done,
+                    "last_synced_at": datetime.utcnow(),
+                },
+                "$unset": {"lease_until": "", "lease_owner": "", "next_page": ""},
+            },
+        )
+        if saved.matched_count == 0:
+            logger.warning("Token registry sync lease was taken over by another worker; progress of this run not saved")
+
+    logger.info(f"Token registry sync stored {synced} new tokens (head {head_asset}, backfilled to offset {tail_offset})")
+    return synced
+
+async def run_token_registry_sync(db, api_factory, interval: float = TOKEN_REGISTRY_SYNC_INTERVAL) -> None:
+    """Background loop that keeps the token registry collection up to date"""
+    await ensure_indexes(db)
+    while True:
+        try:
+            await sync_token_registry(db, api_factory())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Token registry sync failed: {e}")
+        await asyncio.sleep(interval)
+
+def _search_filter(search: Optional[str]) -> Dict[str, Any]:
+    """Translate a search string into an indexed registry query"""
+    if not search:
+        return {}
+    term = search.strip()
+    if _FINGERPRINT_RE.match(term):
+        return {"fingerprint": term}
+    if _POLICY_ID_RE.match(term):
+        return {"policy_id": term}
+    if len(term) > 56 and _POLICY_ID_RE.match(term[:56]):
+        return {"asset": term}
+
+    # Case-sensitive anchored prefixes on the lowercased fields are index range scans
+    prefix = "^" + re.escape(term.lower())
+    return {"$or": [
+        {"ticker_lc": {"$regex": prefix}},
+        {"name_lc": {"$regex": prefix}},
+    ]}
+
+async def find_tokens(db, limit: int = 10, page: int = 1, search: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read a page of registered tokens, newest first"""
+    cursor = (
+        db.token_registry.find(_search_filter(search), {"_id": 0, "registry_index": 0, "synced_at": 0, "details_pending": 0, "ticker_lc": 0, "name_lc": 0})
+        .sort("registry_index", DESCENDING)
+        .skip((page - 1) * limit)
+        .limit(limit)
+    )
+    return await cursor.to_list(limit)
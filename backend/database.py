@@ -0,0 +1,32 @@
+from typing import TYPE_CHECKING
+
+from settings import MONGO_URL, DB_NAME, METRICS_ENABLED
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+# One client per process; Motor pools connections internally
+_client = None
+
+def get_client() -> "AsyncIOMotorClient":
+    """Get the shared MongoDB client, importing Motor and creating it on first use"""
+    global _client
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        event_listeners = []
+        if METRICS_ENABLED:
+            from mongo_metrics import MongoCommandListener
+            event_listeners.append(MongoCommandListener())
+        _client = AsyncIOMotorClient(MONGO_URL, event_listeners=event_listeners)
+    return _client
+
+def get_database():
+    """Get the application database from the shared client"""
+    return get_client()[DB_NAME]
+
+def close_client() -> None:
+    """Close the shared MongoDB client if it was created"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1 @@
+# Markets module
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from api.responses import dumps, public_market
+from markets.kernels import compute_market_stats
+from markets.recommendations import recommend
+from markets.rolling import rolling_analytics
+from markets.version import markets_version, VERSION_ID
+from settings import (
+    MARKET_STREAM_MAX_BACKOFF,
+    MARKET_STREAM_MAX_FAILURES,
+    MARKET_STREAM_POLL_INTERVAL,
+    MARKET_STREAM_QUEUE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Error code Mongo returns when change streams are unavailable (standalone server)
+_CHANGE_STREAMS_UNSUPPORTED = 40573
+
+_RELOAD_OPERATIONS = {"drop", "dropDatabase", "rename", "invalidate"}
+
+class MarketBroadcaster:
+    """Pushes market changes to every connected stream client
+
+    One watcher per worker follows the markets collection (a change stream on
+    replica sets, otherwise a poll of the markets version) and keeps an
+    in-memory snapshot. Bursts of changes are coalesced, stats and
+    recommendations are recomputed once, and each event is serialized once
+    and queued to every subscriber. Markets are sent as GET /markets returns
+    them: public fields only, with their rolling analytics.
+    Subscribers that fall behind are dropped; EventSource reconnects them and
+    they start again from a fresh snapshot.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = MARKET_STREAM_QUEUE_SIZE,
+        poll_interval: float = MARKET_STREAM_POLL_INTERVAL,
+        max_failures: int = MARKET_STREAM_MAX_FAILURES,
+        max_backoff: float = MARKET_STREAM_MAX_BACKOFF,
+    ):
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.max_failures = max_failures
+        self.max_backoff = max_backoff
+        self._failures = 0  # consecutive watcher failures, reset by every successful load
+        self.ready = False
+        self.version: Optional[int] = None  # markets version the snapshot includes at least
+        self._markets: Dict[str, Dict[str, Any]] = {}  # keyed by str(_id)
+        self._stats: Dict[str, Any] = compute_market_stats([])
+        self._recommendations: Dict[str, Any] = recommend([])
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._listeners: List[Callable[[List[Dict[str, Any]], List[str]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._loaded: Optional[asyncio.Event] = None
+
+    async def start(self, db) -> None:
+        """Start the watcher and wait until the first snapshot is loaded"""
+        if self._task is None:
+            self._loaded = asyncio.Event()
+            self._task = asyncio.create_task(self._run(db))
+        await self._loaded.wait()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def markets(self) -> List[Dict[str, Any]]:
+        """Current market documents (without _id)"""
+        return list(self._markets.values())
+
+    def market(self, market_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """A copy of one market from the snapshot if the snapshot holds it at exactly version, otherwise None"""
+        for doc in self._markets.values():
+            if doc["id"] == market_id:
+                return dict(doc) if doc.get("version", 1) == version else None
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return self._stats
+
+    def markets_at(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """The snapshot if it already includes the given markets version, otherwise None"""
+        if not self.ready or self.version is None or self.version < version:
+            return None
+        return self.markets()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a client; the queue receives pre-encoded SSE messages, or None when dropped"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]], List[str]], None]) -> None:
+        """Call listener(changed, removed) in-process for every published batch of changes"""
+        self._listeners.append(listener)
+
+    def snapshot_message(self) -> bytes:
+        """SSE message with the full market list, sent to each new subscriber"""
+        return self._encode("snapshot", {
+            "version": markets_version.version,
+            "markets": [self._public(doc) for doc in self._markets.values()],
+            "stats": self._stats,
+            "recommendations": self._recommendations,
+        })
+
+    @staticmethod
+    def _public(market: Dict[str, Any]) -> Dict[str, Any]:
+        return rolling_analytics.with_metrics(public_market(market))
+
+    def _summarize(self) -> None:
+        """Recompute the stats and recommendations sent with every event"""
+        markets = self.markets()
+        self._stats = compute_market_stats(markets)
+        self._recommendations = recommend(markets)
+
+    @staticmethod
+    def _encode(event: str, payload: Any) -> bytes:
+        return b"event: " + event.encode() + b"\ndata: " + dumps(payload) + b"\n\n"
+
+    def _broadcast(self, event: str, payload: Any) -> None:
+        message = self._encode(event, payload)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop queued events and tell the client to go away
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def _publish(self, changed: List[Dict[str, Any]], removed: List[str]) -> None:
+        if not changed and not removed:
+            return
+        for listener in self._listeners:
+            try:
+                listener(changed, removed)
+            except Exception as e:
+                logger.error(f"Market listener failed: {e}")
+        self._summarize()
+        self._broadcast("markets", {
+            "version": markets_version.version,
+            "changed": [self._public(doc) for doc in changed],
+            "removed": removed,
+            "stats": self._stats,
+            "recommendations": self._recommendations,
+        })
+
+    async def _load(self, db) -> Dict[str, Dict[str, Any]]:
+        """Reload the snapshot, returning the previous one"""
+        previous = self._markets
+        # Read before loading, so the snapshot holds at least this version
+        version, _ = await markets_version.current(db)
+        markets = {}
+        async for doc in db.markets.find({}):
+            markets[str(doc.pop("_id"))] = doc
+        self._markets = markets
+        self._summarize()
+        self.version = version
+        self.ready = True
+        self._failures = 0
+        self._loaded.set()
+        return previous
+
+    def _publish_reload(self, previous: Dict[str, Dict[str, Any]]) -> None:
+        changed = [doc for key, doc in self._markets.items() if previous.get(key) != doc]
+        removed = [doc["id"] for key, doc in previous.items() if key not in self._markets]
+        self._publish(changed, removed)
+
+    async def _run(self, db) -> None:
+        """Keep the snapshot current until cancelled
+
+        Failures never end the watcher: it logs, backs off and retries, and
+        after max_failures consecutive failures (or straight away on a
+        server without change streams) it polls the markets version instead.
+        """
+        from pymongo.errors import OperationFailure
+        polling = False
+        while True:
+            try:
+                if polling:
+                    await self._poll(db)
+                else:
+                    await self._watch(db)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == _CHANGE_STREAMS_UNSUPPORTED and not polling:
+                    logger.info("Change streams unavailable, polling the markets version instead")
+                    polling = True
+                    continue
+                self._failures += 1
+                logger.error(f"Market watcher failed ({e.code}), restarting: {e}")
+            except Exception as e:
+                self._failures += 1
+                logger.error(f"Market watcher failed, restarting: {e}")
+
+            if not polling and self._failures >= self.max_failures:
+                logger.warning(f"Change stream failed {self._failures} times in a row, polling the markets version instead")
+                polling = True
+            await asyncio.sleep(min(self.poll_interval * 2 ** (self._failures - 1), self.max_backoff))
+
+    async def _watch(self, db) -> None:
+        """Follow markets (and the markets version) through a change stream"""
+        pipeline = [{"$match": {"ns.coll": {"$in": ["markets", "collection_versions"]}}}]
+        async with db.watch(pipeline, full_document="updateLookup", max_await_time_ms=50) as stream:
+            # Open the stream before loading so no change falls between the two
+            previous = await self._load(db)
+            self._publish_reload(previous)
+
+            while True:
+                changes = [await stream.next()]
+
+                # Coalesce whatever else is already queued (bulk writes, price batches)
+                while len(changes) < 1000:
+                    change = await stream.try_next()
+                    if change is None:
+                        break
+                    changes.append(change)
+
+                if any(change["operationType"] in _RELOAD_OPERATIONS for change in changes):
+                    previous = await self._load(db)
+                    self._publish_reload(previous)
+                    continue
+
+                self._apply(changes)
+
+    def _apply(self, changes: List[Dict[str, Any]]) -> None:
+        changed: Dict[str, Dict[str, Any]] = {}
+        removed: List[str] = []
+        version = self.version
+        for change in changes:
+            if change["ns"]["coll"] == "collection_versions":
+                doc = change.get("fullDocument")
+                if doc and doc["_id"] == VERSION_ID:
+                    markets_version.observe(doc["version"], doc["updated_at"])
+                    # Writers bump the version after writing, so earlier market changes are applied
+                    version = max(version or 0, doc["version"])
+                continue
+
+            key = str(change["documentKey"]["_id"])
+            if change["operationType"] == "delete":
+                old = self._markets.pop(key, None)
+                changed.pop(key, None)
+                if old is not None:
+                    removed.append(old["id"])
+                continue
+
+            doc = change.get("fullDocument")
+            if doc is None:
+                # Deleted again before the lookup; the delete event follows
+                continue
+            doc.pop("_id", None)
+            self._markets[key] = doc
+            changed[key] = doc
+
+        self.version = version
+        self._publish(list(changed.values()), removed)
+
+    async def _poll(self, db) -> None:
+        """Fallback for standalone Mongo: reload the snapshot when the markets version moves"""
+        previous = await self._load(db)
+        self._publish_reload(previous)
+        last_version, _ = await markets_version.current(db)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            version, _ = await markets_version.current(db)
+            if version == last_version:
+                continue
+            last_version = version
+            previous = await self._load(db)
+            self._publish_reload(previous)
+
+# One broadcaster per worker, shared by all stream clients
+market_broadcaster = MarketBroadcaster()
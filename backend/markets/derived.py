@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Dict, List
+
+from markets.rates import rate_fields
+from markets.scoring import score_fields
+from markets.version import markets_version, version_filter, versioned_update
+from settings import RATE_MODEL_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# Market fields computed by the rate model when it is enabled
+RATE_DERIVED_FIELDS = ("supply_apy", "borrow_apy", "utilization_rate")
+
+def derive_fields(markets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Compute the derived fields of each market document, updating the documents in place
+
+    Rates come first (one vectorized pass over all the markets) because the
+    scores depend on the resulting APYs and utilization. Returns the fields
+    set on each market, in order.
+    """
+    rates = rate_fields(markets) if RATE_MODEL_ENABLED else [{} for _ in markets]
+    derived = []
+    for market, fields in zip(markets, rates):
+        market.update(fields)
+        fields = {**fields, **score_fields(market)}
+        market.update(fields)
+        derived.append(fields)
+    return derived
+
+def rate_derived_updates(update_data: Dict[str, Any]) -> List[str]:
+    """Fields of an update that the rate model would overwrite"""
+    if not RATE_MODEL_ENABLED:
+        return []
+    return [name for name in RATE_DERIVED_FIELDS if name in update_data]
+
+def derive_updates(markets: List[Dict[str, Any]], updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The full field set to write for each update: the update plus the rates and scores it leads to
+
+    markets are the documents as read; the result is meant for a single
+    version-pinned write, so readers never see an update without its
+    derived fields.
+    """
+    documents = [{**market, **update} for market, update in zip(markets, updates)]
+    return [{**update, **fields} for update, fields in zip(updates, derive_fields(documents))]
+
+async def refresh_derived_fields(db, markets: List[Dict[str, Any]]) -> int:
+    """Recompute rates and scores for stored markets with one bulk write (backfills)
+
+    Each update is pinned to the version it was computed from, so a
+    concurrent writer's newer document is never overwritten with stale
+    values. Like any other write it moves the market version and, when
+    anything changed, the markets collection version, so validators built
+    from them stop matching. The documents are updated in place. Returns
+    how many markets were modified.
+    """
+    from pymongo import UpdateOne
+    operations = [
+        UpdateOne(version_filter(market["id"], market.get("version", 1)), versioned_update(fields))
+        for market, fields in zip(markets, derive_fields(markets))
+    ]
+    if not operations:
+        return 0
+    modified = (await db.markets.bulk_write(operations, ordered=False)).modified_count
+    if modified:
+        await markets_version.bump(db)
+    return modified
+
+async def backfill_derived_fields(db) -> None:
+    """Refresh markets stored before scores or rate models existed"""
+    query = {"scores": {"$exists": False}}
+    if RATE_MODEL_ENABLED:
+        query = {"$or": [query, {"rate_model": {"$exists": False}}]}
+    markets = await db.markets.find(query, {"_id": 0}).to_list(None)
+    if markets:
+        modified = await refresh_derived_fields(db, markets)
+        logger.info(f"Refreshed rates and scores for {modified} of {len(markets)} markets")
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Published once per applied oracle price batch
+PRICES_UPDATED = "prices_updated"
+
+class EventBus:
+    """In-process publish/subscribe for market events
+
+    Handlers run as background tasks so the publishing request is not held
+    up by follow-up work. Events stay in the worker that published them, so
+    each batch is handled once, by the worker that applied it.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def subscribe(self, event: str, handler: Handler) -> None:
+        self._handlers[event].append(handler)
+
+    def publish(self, event: str, payload: Dict[str, Any]) -> None:
+        for handler in self._handlers.get(event, []):
+            task = asyncio.create_task(self._run(event, handler, payload))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _run(event: str, handler: Handler, payload: Dict[str, Any]) -> None:
+        try:
+            await handler(payload)
+        except Exception as e:
+            logger.error(f"Handler for {event} failed: {e}")
+
+    async def drain(self) -> None:
+        """Wait for running handlers, e.g. before shutdown"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+market_events = EventBus()
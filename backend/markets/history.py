@@ -0,0 +1,173 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from settings import (
+    MARKET_HISTORY_RAW_TTL,
+    MARKET_HISTORY_1M_TTL,
+    MARKET_HISTORY_1H_TTL,
+    MARKET_HISTORY_SAMPLE_INTERVAL,
+    MARKET_HISTORY_MAX_POINTS,
+)
+
+logger = logging.getLogger(__name__)
+
+ASCENDING = 1  # pymongo.ASCENDING; pymongo is imported where it is used, to keep it out of import time
+
+# Market fields recorded in the history
+METRICS = ["supply_apy", "borrow_apy", "utilization_rate", "price_usd"]
+
+RAW_COLLECTION = "market_snapshots"
+STATE_ID = "market_history"
+
+# Rollup name -> (bucket width, collection, retention in seconds; 0 keeps forever)
+ROLLUPS = {
+    "1m": (timedelta(minutes=1), "market_history_1m", MARKET_HISTORY_1M_TTL),
+    "1h": (timedelta(hours=1), "market_history_1h", MARKET_HISTORY_1H_TTL),
+    "1d": (timedelta(days=1), "market_history_1d", 0),
+}
+
+async def ensure_collections(db) -> None:
+    """Create the raw time-series collection and the rollup indexes
+
+    Raw snapshots go to a Mongo time-series collection that expires after
+    MARKET_HISTORY_RAW_TTL; servers without time-series support get a plain
+    collection with a TTL index instead. Rollups have one document per market
+    and bucket, and the finer ones expire on their own.
+    """
+    from pymongo.errors import CollectionInvalid, OperationFailure
+    try:
+        await db.create_collection(
+            RAW_COLLECTION,
+            timeseries={"timeField": "ts", "metaField": "market_id", "granularity": "seconds"},
+            expireAfterSeconds=MARKET_HISTORY_RAW_TTL,
+        )
+    except CollectionInvalid:
+        pass  # already exists
+    except OperationFailure as e:
+        logger.info(f"Time-series collections unavailable, using a plain collection: {e}")
+        await db[RAW_COLLECTION].create_index([("market_id", ASCENDING), ("ts", ASCENDING)])
+        await db[RAW_COLLECTION].create_index("ts", expireAfterSeconds=MARKET_HISTORY_RAW_TTL)
+
+    for _, collection, ttl in ROLLUPS.values():
+        await db[collection].create_index([("market_id", ASCENDING), ("bucket", ASCENDING)], unique=True)
+        if ttl:
+            await db[collection].create_index("bucket", expireAfterSeconds=ttl)
+
+def _bucket(ts: datetime, width: timedelta) -> datetime:
+    """Start of the bucket of the given width that contains ts"""
+    seconds = max(1, int(width.total_seconds()))
+    epoch = int((ts - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % seconds)
+
+def _rollup_update(values: Dict[str, float]) -> Dict[str, Any]:
+    """Fold one sample into a rollup bucket: count, sum, min, max and last value per metric"""
+    return {
+        "$inc": {"count": 1, **{f"sum.{name}": value for name, value in values.items()}},
+        "$min": {f"min.{name}": value for name, value in values.items()},
+        "$max": {f"max.{name}": value for name, value in values.items()},
+        "$set": {f"last.{name}": value for name, value in values.items()},
+    }
+
+async def record_snapshots(db, markets: List[Dict[str, Any]], ts: Optional[datetime] = None) -> None:
+    """Append a snapshot of each market to the raw history and every rollup
+
+    History is secondary to the write that triggered it, so failures are
+    logged rather than raised.
+    """
+    from pymongo import UpdateOne
+    if not markets:
+        return
+    ts = ts or datetime.utcnow()
+    samples = [
+        (market["id"], {name: float(market[name]) for name in METRICS if market.get(name) is not None})
+        for market in markets
+    ]
+    try:
+        await db[RAW_COLLECTION].insert_many(
+            [{"market_id": market_id, "ts": ts, **values} for market_id, values in samples],
+            ordered=False,
+        )
+        for width, collection, _ in ROLLUPS.values():
+            bucket = _bucket(ts, width)
+            await db[collection].bulk_write(
+                [UpdateOne({"market_id": market_id, "bucket": bucket}, _rollup_update(values), upsert=True)
+                 for market_id, values in samples],
+                ordered=False,
+            )
+    except Exception as e:
+        logger.warning(f"Could not record market history: {e}")
+
+def pick_resolution(start: datetime, end: datetime, max_points: int = MARKET_HISTORY_MAX_POINTS) -> str:
+    """Finest rollup that covers the range in at most max_points buckets"""
+    span = end - start
+    for name, (width, _, ttl) in ROLLUPS.items():
+        retained = not ttl or start >= datetime.utcnow() - timedelta(seconds=ttl)
+        if retained and span / width <= max_points:
+            return name
+    return "1d"
+
+async def get_history(
+    db,
+    market_id: str,
+    start: datetime,
+    end: datetime,
+    resolution: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Read a market's history from the rollup matching the range
+
+    Each point carries the average, minimum, maximum and last value of every
+    metric within its bucket.
+    """
+    resolution = resolution or pick_resolution(start, end)
+    width, collection, _ = ROLLUPS[resolution]
+    cursor = db[collection].find(
+        {"market_id": market_id, "bucket": {"$gte": _bucket(start, width), "$lte": end}},
+        {"_id": 0, "market_id": 0},
+    ).sort("bucket", ASCENDING)
+
+    points = []
+    async for doc in cursor:
+        count = doc["count"]
+        points.append({
+            "t": doc["bucket"],
+            "count": count,
+            "avg": {name: total / count for name, total in doc["sum"].items()},
+            "min": doc["min"],
+            "max": doc["max"],
+            "last": doc["last"],
+        })
+    return {"market_id": market_id, "resolution": resolution, "from": start, "to": end, "points": points}
+
+async def _claim_sample(db, slot: datetime) -> bool:
+    """Claim a sampling slot so only one worker snapshots the markets per interval"""
+    from pymongo.errors import DuplicateKeyError
+    try:
+        await db.sync_state.update_one(
+            {"_id": STATE_ID, "$or": [{"slot": {"$lt": slot}}, {"slot": {"$exists": False}}]},
+            {"$set": {"slot": slot}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        # Another worker already took this slot
+        return False
+
+async def run_history_sampler(db, interval: float = MARKET_HISTORY_SAMPLE_INTERVAL) -> None:
+    """Background loop that snapshots every market once per interval
+
+    Updates are recorded as they happen; the schedule fills in markets that
+    did not change so charts have evenly spaced points.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            slot = _bucket(datetime.utcnow(), timedelta(seconds=interval))
+            if await _claim_sample(db, slot):
+                markets = await db.markets.find({}, {"_id": 0, "id": 1, **{name: 1 for name in METRICS}}).to_list(None)
+                await record_snapshots(db, markets, slot)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Market history sampling failed: {e}")
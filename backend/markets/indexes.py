@@ -0,0 +1,16 @@
+from pymongo import ASCENDING, DESCENDING
+
+# Compound indexes behind the top-k recommendation queries: equality on the
+# eligibility flags, then the stored score, so a query reads only k entries
+RECOMMENDATION_INDEXES = [
+    [("is_active", ASCENDING), ("can_supply", ASCENDING), ("scores.supply", DESCENDING)],
+    [("is_active", ASCENDING), ("can_borrow", ASCENDING), ("scores.borrow", DESCENDING)],
+    [("is_active", ASCENDING), ("can_supply", ASCENDING), ("scores.safety", DESCENDING)],
+]
+
+async def ensure_indexes(db) -> None:
+    """Create the indexes the markets collection is queried by"""
+    await db.markets.create_index("id", unique=True)
+    await db.markets.create_index("asset_id", unique=True)
+    for keys in RECOMMENDATION_INDEXES:
+        await db.markets.create_index(keys)
@@ -0,0 +1,230 @@
+import heapq
+import math
+from typing import Any, Dict, List, Optional
+
+def compute_market_stats(markets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate statistics over a list of market documents"""
+    if not markets:
+        return {
+            "total_supply": 0,
+            "total_borrow": 0,
+            "markets_count": 0,
+            "avg_supply_rate": 0,
+            "avg_borrow_rate": 0,
+            "top_markets": []
+        }
+
+    # Calculate aggregate statistics
+    total_supply = sum(float(market["total_supply"]) for market in markets)
+    total_borrow = sum(float(market["total_borrow"]) for market in markets)
+
+    markets_with_supply = [m for m in markets if float(m["total_supply"]) > 0]
+    markets_with_borrow = [m for m in markets if float(m["total_borrow"]) > 0]
+
+    avg_supply_rate = sum(m["supply_apy"] for m in markets_with_supply) / len(markets_with_supply) if markets_with_supply else 0
+    avg_borrow_rate = sum(m["borrow_apy"] for m in markets_with_borrow) / len(markets_with_borrow) if markets_with_borrow else 0
+
+    # Sort markets by total supply for top markets (amounts are stored as strings)
+    sorted_markets = sorted(markets, key=lambda x: float(x["total_supply"]), reverse=True)
+    top_markets = [{"id": m["id"], "asset_id": m["asset_id"], "name": m["name"], "total_supply": m["total_supply"]}
+                   for m in sorted_markets[:5]]
+
+    return {
+        "total_supply": total_supply,
+        "total_borrow": total_borrow,
+        "markets_count": len(markets),
+        "avg_supply_rate": avg_supply_rate,
+        "avg_borrow_rate": avg_borrow_rate,
+        "top_markets": top_markets
+    }
+
+def recommendation_filter(flag: str, min_liquidity_usd: float = 0, collateral_only: bool = False) -> Dict[str, Any]:
+    """Mongo filter for markets eligible for a recommendation list; flag is can_supply or can_borrow"""
+    query: Dict[str, Any] = {"is_active": True, flag: True}
+    if min_liquidity_usd > 0:
+        query["liquidity_usd"] = {"$gte": min_liquidity_usd}
+    if collateral_only:
+        query["can_use_as_collateral"] = True
+    return query
+
+def _eligible(market: Dict[str, Any], flag: str, min_liquidity_usd: float, collateral_only: bool) -> bool:
+    """In-memory equivalent of recommendation_filter"""
+    return (
+        market["is_active"]
+        and market[flag]
+        and (min_liquidity_usd <= 0 or market.get("liquidity_usd", 0) >= min_liquidity_usd)
+        and (not collateral_only or market["can_use_as_collateral"])
+    )
+
+def _scored(market: Dict[str, Any]) -> bool:
+    """Markets are only ranked once scores are stored for them"""
+    return bool(market.get("scores"))
+
+def overall_recommendation(market_supply_score: Optional[float], high_score: float, low_score: float) -> Optional[str]:
+    """Overall text from the mean supply score of all suppliable markets (APY points)
+
+    None when no market is scored yet.
+    """
+    if market_supply_score is None:
+        return None
+    if market_supply_score > high_score:
+        return "Market supply rates are high - good time to supply assets"
+    if market_supply_score < low_score:
+        return "Market supply rates are low - might be better to look for other opportunities"
+    return "Market conditions are balanced - consider both supply and borrow options"
+
+def format_recommendations(
+    supply_opportunities: List[Dict[str, Any]],
+    borrow_opportunities: List[Dict[str, Any]],
+    safest_markets: List[Dict[str, Any]],
+    overall: Optional[str],
+) -> Dict[str, Any]:
+    """Shape already ranked, scored markets into the recommendations response"""
+    return {
+        "best_supply_opportunities": [
+            {
+                "id": m["id"],
+                "name": m["name"],
+                "supply_apy": m["supply_apy"],
+                "score": m["scores"]["supply"],
+                "total_supply": m["total_supply"],
+                "liquidity": m["liquidity"]
+            } for m in supply_opportunities
+        ],
+        "best_borrow_opportunities": [
+            {
+                "id": m["id"],
+                "name": m["name"],
+                "borrow_apy": m["borrow_apy"],
+                "score": m["scores"]["borrow"],
+                "total_borrow": m["total_borrow"],
+                "liquidity": m["liquidity"]
+            } for m in borrow_opportunities
+        ],
+        "safest_supply_markets": [
+            {
+                "id": m["id"],
+                "name": m["name"],
+                "collateral_factor": m["collateral_factor"],
+                "score": m["scores"]["safety"],
+                "supply_apy": m["supply_apy"],
+                "liquidity": m["liquidity"]
+            } for m in safest_markets
+        ],
+        "overall_recommendation": overall
+    }
+
+def compute_market_recommendations(
+    markets: List[Dict[str, Any]],
+    high_score: float,
+    low_score: float,
+    k: int = 3,
+    min_liquidity_usd: float = 0,
+    collateral_only: bool = False,
+) -> Dict[str, Any]:
+    """Rank markets into supply, borrow and safety recommendations
+
+    Markets are ranked by their precomputed risk-adjusted scores (see
+    compute_market_scores), each list picked by heap selection of the top k
+    (O(n log k)) rather than a full sort. Markets without scores are left
+    out. The overall text does not depend on k or the filters: it comes from
+    the mean supply score of every active, suppliable market.
+    """
+    scored = [m for m in markets if _scored(m)]
+    all_suppliable = [m["scores"]["supply"] for m in scored if _eligible(m, "can_supply", 0, False)]
+    market_supply_score = sum(all_suppliable) / len(all_suppliable) if all_suppliable else None
+
+    suppliable = [m for m in scored if _eligible(m, "can_supply", min_liquidity_usd, collateral_only)]
+    borrowable = (m for m in scored if _eligible(m, "can_borrow", min_liquidity_usd, collateral_only))
+
+    supply_opportunities = heapq.nlargest(k, suppliable, key=lambda m: m["scores"]["supply"])
+    borrow_opportunities = heapq.nlargest(k, borrowable, key=lambda m: m["scores"]["borrow"])
+    safest_markets = heapq.nlargest(k, suppliable, key=lambda m: m["scores"]["safety"])
+
+    return format_recommendations(
+        supply_opportunities, borrow_opportunities, safest_markets,
+        overall_recommendation(market_supply_score, high_score, low_score),
+    )
+
+def update_apy_volatility(state: Optional[Dict[str, float]], supply_apy: float, borrow_apy: float, alpha: float) -> Dict[str, float]:
+    """Fold the latest APYs into an EWMA of squared APY changes
+
+    state holds the last observed APYs and the running variances; the first
+    observation starts both variances at zero.
+    """
+    if not state:
+        return {"supply_apy": supply_apy, "supply_var": 0.0, "borrow_apy": borrow_apy, "borrow_var": 0.0}
+    supply_change = supply_apy - state["supply_apy"]
+    borrow_change = borrow_apy - state["borrow_apy"]
+    return {
+        "supply_apy": supply_apy,
+        "supply_var": (1 - alpha) * state["supply_var"] + alpha * supply_change * supply_change,
+        "borrow_apy": borrow_apy,
+        "borrow_var": (1 - alpha) * state["borrow_var"] + alpha * borrow_change * borrow_change,
+    }
+
+def compute_market_scores(
+    market: Dict[str, Any],
+    volatility: Dict[str, float],
+    volatility_penalty: float = 1.0,
+    illiquidity_penalty: float = 5.0,
+    liquidity_reference_usd: float = 1e7,
+    utilization_kink: float = 0.8,
+) -> Dict[str, float]:
+    """Risk-adjusted supply, borrow and safety scores for one market (higher is better)
+
+    Supply and borrow scores are in APY points: the raw APY (negated for
+    borrowing, where lower is better) minus a penalty per point of APY
+    volatility and a penalty scaled by how little of the market is usable.
+    Usable depth is log-scaled liquidity relative to liquidity_reference_usd,
+    reduced linearly once utilization passes utilization_kink. The safety
+    score is the collateral factor weighted the same way.
+    """
+    liquidity_usd = max(market.get("liquidity_usd", 0), 0)
+    depth = min(1.0, math.log10(1 + liquidity_usd) / math.log10(1 + liquidity_reference_usd))
+
+    utilization = market.get("utilization_rate", 0)
+    availability = 1.0 if utilization <= utilization_kink else max(0.0, (1 - utilization) / (1 - utilization_kink))
+    usable = depth * availability
+
+    supply_volatility = math.sqrt(volatility["supply_var"])
+    borrow_volatility = math.sqrt(volatility["borrow_var"])
+    illiquidity = illiquidity_penalty * (1 - usable)
+
+    return {
+        "supply": market["supply_apy"] - volatility_penalty * supply_volatility - illiquidity,
+        "borrow": -(market["borrow_apy"] + volatility_penalty * borrow_volatility) - illiquidity,
+        "safety": market["collateral_factor"] * usable / (1 + supply_volatility),
+        "supply_volatility": supply_volatility,
+        "borrow_volatility": borrow_volatility,
+        "usable_depth": usable,
+    }
+
+def compute_borrow_limit(supplies: List[Dict[str, Any]], collateral_factors: Dict[str, float]) -> float:
+    """Borrow limit in USD from the collateral supplies of a position
+
+    collateral_factors maps asset_id to the market's collateral factor;
+    supplies whose market is unknown contribute nothing.
+    """
+    return sum(
+        supply["amount_usd"] * collateral_factors[supply["asset_id"]]
+        for supply in supplies
+        if supply["used_as_collateral"] and supply["asset_id"] in collateral_factors
+    )
+
+def compute_health_factor(borrow_limit_usd: float, total_borrowed_usd: float) -> float:
+    """Borrow limit over borrowed value; infinite when nothing is borrowed"""
+    if total_borrowed_usd > 0:
+        return borrow_limit_usd / total_borrowed_usd
+    return float('inf')
+
+def compute_position_health(positions: List[Dict[str, Any]], collateral_factors: Dict[str, float]) -> List[Dict[str, float]]:
+    """Borrow limit and health factor for each position, in input order"""
+    results = []
+    for position in positions:
+        borrow_limit_usd = compute_borrow_limit(position["supplies"], collateral_factors)
+        results.append({
+            "borrow_limit_usd": borrow_limit_usd,
+            "health_factor": compute_health_factor(borrow_limit_usd, position["total_borrowed_usd"]),
+        })
+    return results
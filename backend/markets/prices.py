@@ -0,0 +1,122 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from markets.derived import derive_fields
+from markets.events import market_events, PRICES_UPDATED
+from markets.history import record_snapshots
+from markets.version import markets_version, new_write_id, version_filter, versioned_update
+from settings import PRICE_MIN_CHANGE, PRICE_HEARTBEAT
+
+logger = logging.getLogger(__name__)
+
+# Fields written by a price update, besides the derived rates and scores
+PRICE_FIELDS = ("price_usd", "price_oracle", "price_updated_at", "updated_at", "total_supply_usd", "total_borrow_usd", "liquidity_usd", "write_id")
+
+def price_changed(current: Optional[float], new: float, min_change: float = PRICE_MIN_CHANGE) -> bool:
+    """Whether a price moved from the current one by at least min_change (relative)"""
+    if not current:
+        return True
+    return abs(new - current) / abs(current) >= min_change
+
+def usd_values(market: Dict[str, Any], price: float) -> Dict[str, float]:
+    """Supply, borrow and liquidity of a market in USD at the given price"""
+    scale = price / 10 ** market.get("decimals", 0)
+    return {
+        "total_supply_usd": float(market["total_supply"]) * scale,
+        "total_borrow_usd": float(market["total_borrow"]) * scale,
+        "liquidity_usd": float(market["liquidity"]) * scale,
+    }
+
+async def ingest_prices(db, prices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Apply a batch of oracle prices with one bulk write
+
+    prices are {"asset_id", "price_usd", "price_oracle"} dicts. A price that
+    moved less than PRICE_MIN_CHANGE is skipped, unless its oracle changed
+    or the stored price is older than PRICE_HEARTBEAT. Each applied price
+    sets the USD values and the derived rates and scores in the same write,
+    pinned to the market version that was read. The markets version is then
+    bumped once and PRICES_UPDATED published once for the whole batch.
+
+    Returns one {"id", "status", "error"} result per price, in order, with
+    status "updated", "skipped", "not_found" or "conflict".
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+    asset_ids = list({price["asset_id"] for price in prices})
+    markets = {doc["asset_id"]: doc async for doc in db.markets.find({"asset_id": {"$in": asset_ids}}, {"_id": 0})}
+
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=PRICE_HEARTBEAT)
+    results: List[Dict[str, Any]] = []
+    changed: Dict[str, Dict[str, Any]] = {}  # market ID -> market with its new price
+    for price in prices:
+        market = markets.get(price["asset_id"])
+        if market is None:
+            results.append({"id": None, "status": "not_found", "error": f"No market for asset {price['asset_id']}"})
+            continue
+
+        oracle = price.get("price_oracle") or market["price_oracle"]
+        priced_at = market.get("price_updated_at")
+        if (
+            market["id"] not in changed
+            and not price_changed(market["price_usd"], price["price_usd"])
+            and oracle == market["price_oracle"]
+            and priced_at is not None and priced_at >= stale_before
+        ):
+            results.append({"id": market["id"], "status": "skipped", "error": None})
+            continue
+
+        # A later price for the same asset in the batch replaces an earlier one
+        market.update(price_usd=price["price_usd"], price_oracle=oracle, price_updated_at=now, updated_at=now)
+        market.update(usd_values(market, price["price_usd"]))
+        changed[market["id"]] = market
+        results.append({"id": market["id"], "status": "updated", "error": None})
+
+    if not changed:
+        return results
+
+    applied = list(changed.values())
+    write_id = new_write_id()
+    for market in applied:
+        market["write_id"] = write_id
+    expected = {market["id"]: market.get("version", 1) for market in applied}
+    operations = [
+        UpdateOne(
+            version_filter(market["id"], expected[market["id"]]),
+            versioned_update({**{name: market[name] for name in PRICE_FIELDS}, **fields}),
+        )
+        for market, fields in zip(applied, derive_fields(applied))
+    ]
+
+    try:
+        matched = (await db.markets.bulk_write(operations, ordered=False)).matched_count
+    except BulkWriteError as e:
+        matched = e.details.get("nMatched", 0)
+
+    failed = set()
+    if matched < len(operations):
+        # bulk_write only reports totals; the markets carrying this batch's write ID are the ones updated
+        written = {
+            doc["id"]
+            async for doc in db.markets.find({"id": {"$in": list(expected)}, "write_id": write_id}, {"_id": 0, "id": 1})
+        }
+        failed = set(expected) - written
+    for result in results:
+        if result["status"] == "updated" and result["id"] in failed:
+            result["status"] = "conflict"
+            result["error"] = f"Market {result['id']} was modified while the price was applied"
+
+    applied = [market for market in applied if market["id"] not in failed]
+    if applied:
+        for market in applied:
+            market["version"] = expected[market["id"]] + 1
+        await record_snapshots(db, applied, now)
+        version, _ = await markets_version.bump(db)
+        market_events.publish(PRICES_UPDATED, {
+            "version": version,
+            "prices": {market["asset_id"]: market["price_usd"] for market in applied},
+            "market_ids": [market["id"] for market in applied],
+        })
+        logger.info(f"Applied {len(applied)} of {len(prices)} oracle prices")
+    return results
@@ -0,0 +1,70 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from settings import RATE_BASE, RATE_SLOPE1, RATE_SLOPE2, RATE_OPTIMAL_UTILIZATION
+
+# numpy is imported where it is used, so it stays out of the server's import time
+if TYPE_CHECKING:
+    import numpy as np
+
+# Per-market rate model parameters; rates are annual percentages
+RATE_MODEL_FIELDS = ("base_rate", "slope1", "slope2", "optimal_utilization")
+
+def default_rate_model() -> Dict[str, float]:
+    return {
+        "base_rate": RATE_BASE,
+        "slope1": RATE_SLOPE1,
+        "slope2": RATE_SLOPE2,
+        "optimal_utilization": RATE_OPTIMAL_UTILIZATION,
+    }
+
+def compute_rates(
+    total_supply: "np.ndarray",
+    total_borrow: "np.ndarray",
+    reserve_factor: "np.ndarray",
+    base_rate: "np.ndarray",
+    slope1: "np.ndarray",
+    slope2: "np.ndarray",
+    optimal_utilization: "np.ndarray",
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Kinked interest-rate model over arrays of markets: (utilization, supply APY, borrow APY)
+
+    The borrow rate rises from base_rate by slope1 up to the optimal
+    utilization, then by slope2 over the remaining range. Suppliers earn the
+    borrow rate on the borrowed share, less the reserve factor. Rates are
+    compounded continuously into APYs; everything is in percent.
+    """
+    import numpy as np
+    utilization = np.divide(total_borrow, total_supply, out=np.zeros_like(total_supply), where=total_supply > 0)
+    utilization = np.clip(utilization, 0.0, 1.0)
+
+    optimal = np.clip(optimal_utilization, 1e-9, 1 - 1e-9)
+    below = base_rate + slope1 * utilization / optimal
+    above = base_rate + slope1 + slope2 * (utilization - optimal) / (1 - optimal)
+    borrow_rate = np.where(utilization <= optimal, below, above)
+    supply_rate = borrow_rate * utilization * (1 - reserve_factor)
+
+    borrow_apy = np.expm1(borrow_rate / 100) * 100
+    supply_apy = np.expm1(supply_rate / 100) * 100
+    return utilization, supply_apy, borrow_apy
+
+def rate_fields(markets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Utilization and APYs for each market from its rate model, in one vectorized pass
+
+    Markets without a rate_model get the configured default, which is
+    returned with the fields so the model is stored explicitly.
+    """
+    import numpy as np
+    if not markets:
+        return []
+    models = [market.get("rate_model") or default_rate_model() for market in markets]
+    utilization, supply_apy, borrow_apy = compute_rates(
+        np.array([float(market["total_supply"]) for market in markets]),
+        np.array([float(market["total_borrow"]) for market in markets]),
+        np.array([market.get("reserve_factor", 0.0) for market in markets]),
+        *(np.array([model[name] for model in models]) for name in RATE_MODEL_FIELDS),
+    )
+    utilization, supply_apy, borrow_apy = (np.round(values, 6).tolist() for values in (utilization, supply_apy, borrow_apy))
+    return [
+        {"rate_model": model, "utilization_rate": u, "supply_apy": s, "borrow_apy": b}
+        for model, u, s, b in zip(models, utilization, supply_apy, borrow_apy)
+    ]
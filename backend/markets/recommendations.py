@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from markets.kernels import compute_market_recommendations, format_recommendations, overall_recommendation, recommendation_filter
+from settings import RECOMMENDATION_HIGH_SCORE, RECOMMENDATION_LOW_SCORE
+
+DESCENDING = -1  # pymongo.DESCENDING; pymongo is imported where it is used, to keep it out of import time
+
+_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "supply_apy": 1, "borrow_apy": 1, "collateral_factor": 1,
+    "total_supply": 1, "total_borrow": 1, "liquidity": 1, "scores": 1,
+}
+
+def recommend(markets: List[Dict[str, Any]], k: int = 3, min_liquidity_usd: float = 0, collateral_only: bool = False) -> Dict[str, Any]:
+    """Recommendations from market documents already in memory, with the configured thresholds"""
+    return compute_market_recommendations(
+        markets, RECOMMENDATION_HIGH_SCORE, RECOMMENDATION_LOW_SCORE,
+        k=k, min_liquidity_usd=min_liquidity_usd, collateral_only=collateral_only,
+    )
+
+async def _market_supply_score(db) -> Optional[float]:
+    """Mean supply score of every active, suppliable, scored market, read from the supply score index"""
+    query = {**recommendation_filter("can_supply"), "scores.supply": {"$type": "number"}}
+    result = await db.markets.aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "score": {"$avg": "$scores.supply"}}},
+    ]).to_list(1)
+    return result[0]["score"] if result else None
+
+async def find_recommendations(db, k: int = 3, min_liquidity_usd: float = 0, collateral_only: bool = False) -> Dict[str, Any]:
+    """Recommendations from top-k queries on the score indexes in markets/indexes.py
+
+    Used when the in-memory market snapshot is not available. Scores are
+    stored when markets are written, so each list is a pure index read of k
+    entries; markets without scores are left out.
+    """
+    supply_filter = recommendation_filter("can_supply", min_liquidity_usd, collateral_only)
+    borrow_filter = recommendation_filter("can_borrow", min_liquidity_usd, collateral_only)
+
+    def top(query: Dict[str, Any], score: str):
+        query = {**query, f"scores.{score}": {"$type": "number"}}
+        return db.markets.find(query, _PROJECTION).sort(f"scores.{score}", DESCENDING).limit(k).to_list(k)
+
+    supply, borrow, safest, market_supply_score = await asyncio.gather(
+        top(supply_filter, "supply"),
+        top(borrow_filter, "borrow"),
+        top(supply_filter, "safety"),
+        _market_supply_score(db),
+    )
+    overall = overall_recommendation(market_supply_score, RECOMMENDATION_HIGH_SCORE, RECOMMENDATION_LOW_SCORE)
+    return format_recommendations(supply, borrow, safest, overall)
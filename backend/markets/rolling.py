@@ -0,0 +1,224 @@
+import asyncio
+import calendar
+import logging
+import math
+import time
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from settings import ROLLING_WINDOW, ROLLING_EMA_SPAN, ROLLING_CHECKPOINT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Market fields tracked by the rolling analytics
+SERIES = ("price_usd", "supply_apy", "borrow_apy")
+
+STATE_COLLECTION = "market_analytics_state"
+
+class RollingSeries:
+    """Fixed-size rolling window over one series, updated in O(1) per sample
+
+    Each sample after the first closes the interval of the previous one, so
+    the ring buffers hold, per interval, its duration, its value times its
+    duration (for the TWAP) and the simple return into the new value (for
+    the volatility). Running sums are adjusted as slots are overwritten and
+    recomputed from the buffers once per lap to keep float error bounded.
+    """
+
+    __slots__ = (
+        "window", "alpha", "durations", "weighted", "returns", "head", "size",
+        "sum_duration", "sum_weighted", "sum_returns", "sum_squares",
+        "ema", "last_value", "last_ts",
+    )
+
+    def __init__(self, window: int, alpha: float):
+        self.window = window
+        self.alpha = alpha
+        self.durations = array("d", bytes(8 * window))
+        self.weighted = array("d", bytes(8 * window))
+        self.returns = array("d", bytes(8 * window))
+        self.head = 0
+        self.size = 0
+        self.sum_duration = 0.0
+        self.sum_weighted = 0.0
+        self.sum_returns = 0.0
+        self.sum_squares = 0.0
+        self.ema: Optional[float] = None
+        self.last_value: Optional[float] = None
+        self.last_ts: Optional[float] = None
+
+    def add(self, ts: float, value: float) -> None:
+        """Record a new value observed at ts (seconds since the epoch)"""
+        if self.last_value is None:
+            self.ema = value
+            self.last_value, self.last_ts = value, ts
+            return
+
+        duration = max(0.0, ts - self.last_ts)
+        weighted = self.last_value * duration
+        ret = value / self.last_value - 1 if self.last_value else 0.0
+
+        slot = self.head
+        if self.size == self.window:
+            # Evict the oldest interval, which lives in the slot being reused
+            self.sum_duration -= self.durations[slot]
+            self.sum_weighted -= self.weighted[slot]
+            self.sum_returns -= self.returns[slot]
+            self.sum_squares -= self.returns[slot] * self.returns[slot]
+        else:
+            self.size += 1
+
+        self.durations[slot] = duration
+        self.weighted[slot] = weighted
+        self.returns[slot] = ret
+        self.sum_duration += duration
+        self.sum_weighted += weighted
+        self.sum_returns += ret
+        self.sum_squares += ret * ret
+
+        self.head = (slot + 1) % self.window
+        if self.head == 0:
+            self._resum()
+
+        self.ema = self.alpha * value + (1 - self.alpha) * self.ema
+        self.last_value, self.last_ts = value, ts
+
+    def _resum(self) -> None:
+        n = self.size
+        self.sum_duration = math.fsum(self.durations[:n])
+        self.sum_weighted = math.fsum(self.weighted[:n])
+        self.sum_returns = math.fsum(self.returns[:n])
+        self.sum_squares = math.fsum(r * r for r in self.returns[:n])
+
+    def metrics(self) -> Dict[str, Optional[float]]:
+        """TWAP and volatility over the window, plus the EMA and the latest value"""
+        n = self.size
+        twap = self.sum_weighted / self.sum_duration if self.sum_duration > 0 else self.last_value
+        variance = (self.sum_squares - self.sum_returns * self.sum_returns / n) / (n - 1) if n > 1 else 0.0
+        return {
+            "last": self.last_value,
+            "twap": twap,
+            "ema": self.ema,
+            "volatility": math.sqrt(max(variance, 0.0)),
+            "samples": n,
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """Checkpoint document; buffers are stored as raw bytes"""
+        return {
+            "durations": self.durations.tobytes(),
+            "weighted": self.weighted.tobytes(),
+            "returns": self.returns.tobytes(),
+            "head": self.head,
+            "size": self.size,
+            "ema": self.ema,
+            "last_value": self.last_value,
+            "last_ts": self.last_ts,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], window: int, alpha: float) -> "RollingSeries":
+        series = cls(window, alpha)
+        durations, weighted, returns = (array("d", bytes(state[name])) for name in ("durations", "weighted", "returns"))
+        if len(durations) == window:
+            series.durations, series.weighted, series.returns = durations, weighted, returns
+            series.head, series.size = state["head"], state["size"]
+            series._resum()
+        # A different window size keeps only the latest value and EMA
+        series.ema, series.last_value, series.last_ts = state["ema"], state["last_value"], state["last_ts"]
+        return series
+
+def _timestamp(market: Dict[str, Any]) -> float:
+    """When the market values took effect: its updated_at (naive UTC) or now"""
+    updated_at = market.get("updated_at")
+    if isinstance(updated_at, datetime):
+        return calendar.timegm(updated_at.utctimetuple()) + updated_at.microsecond / 1e6
+    return time.time()
+
+class RollingAnalytics:
+    """Per-market rolling TWAP, EMA and volatility for the SERIES fields
+
+    Fed with market documents as they change (see MarketBroadcaster), so
+    no request ever rescans history. Values that did not change are not new
+    samples. State is checkpointed to Mongo and restored at startup.
+    """
+
+    def __init__(self, window: int = ROLLING_WINDOW, ema_span: int = ROLLING_EMA_SPAN):
+        self.window = window
+        self.alpha = 2 / (ema_span + 1)
+        self._series: Dict[Tuple[str, str], RollingSeries] = {}
+
+    def observe(self, markets: Iterable[Dict[str, Any]]) -> None:
+        for market in markets:
+            ts = _timestamp(market)
+            for name in SERIES:
+                value = market.get(name)
+                if value is None:
+                    continue
+                key = (market["id"], name)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = RollingSeries(self.window, self.alpha)
+                if series.last_value != value:
+                    series.add(ts, float(value))
+
+    def forget(self, market_ids: Iterable[str]) -> None:
+        for market_id in market_ids:
+            for name in SERIES:
+                self._series.pop((market_id, name), None)
+
+    def on_markets_changed(self, changed: List[Dict[str, Any]], removed: List[str]) -> None:
+        """Broadcaster listener"""
+        self.observe(changed)
+        self.forget(removed)
+
+    def metrics(self, market_id: str) -> Dict[str, Dict[str, Optional[float]]]:
+        """Derived metrics per series for one market; empty if nothing was observed"""
+        return {
+            name: series.metrics()
+            for name in SERIES
+            if (series := self._series.get((market_id, name))) is not None
+        }
+
+    async def checkpoint(self, db) -> None:
+        """Store every market's state with one bulk write"""
+        from pymongo import ReplaceOne
+        states: Dict[str, Dict[str, Any]] = {}
+        for (market_id, name), series in self._series.items():
+            states.setdefault(market_id, {})[name] = series.to_state()
+        if not states:
+            return
+        now = datetime.utcnow()
+        await db[STATE_COLLECTION].bulk_write(
+            [ReplaceOne({"_id": market_id}, {"window": self.window, "series": series, "updated_at": now}, upsert=True)
+             for market_id, series in states.items()],
+            ordered=False,
+        )
+
+    async def restore(self, db) -> None:
+        """Load the last checkpoint so a restart does not start from empty windows"""
+        restored = 0
+        async for doc in db[STATE_COLLECTION].find({}):
+            for name, state in doc["series"].items():
+                self._series[(doc["_id"], name)] = RollingSeries.from_state(state, self.window, self.alpha)
+            restored += 1
+        logger.info(f"Restored rolling analytics for {restored} markets")
+
+    def with_metrics(self, market: Dict[str, Any]) -> Dict[str, Any]:
+        """A copy of a market document with its derived metrics under "analytics" """
+        return {**market, "analytics": self.metrics(market["id"])}
+
+async def run_checkpoints(engine: RollingAnalytics, db, interval: float = ROLLING_CHECKPOINT_INTERVAL) -> None:
+    """Background loop that checkpoints the analytics state"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await engine.checkpoint(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Rolling analytics checkpoint failed: {e}")
+
+# One engine per worker, fed by that worker's market broadcaster
+rolling_analytics = RollingAnalytics()
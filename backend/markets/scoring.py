@@ -0,0 +1,23 @@
+from typing import Any, Dict
+
+from markets.kernels import compute_market_scores, update_apy_volatility
+from settings import (
+    SCORE_VOLATILITY_ALPHA,
+    SCORE_VOLATILITY_PENALTY,
+    SCORE_ILLIQUIDITY_PENALTY,
+    SCORE_LIQUIDITY_REFERENCE_USD,
+    SCORE_UTILIZATION_KINK,
+)
+
+def score_fields(market: Dict[str, Any]) -> Dict[str, Any]:
+    """The scores and volatility state to store for a market document as just written"""
+    state = update_apy_volatility(market.get("score_state"), market["supply_apy"], market["borrow_apy"], SCORE_VOLATILITY_ALPHA)
+    scores = compute_market_scores(
+        market,
+        state,
+        volatility_penalty=SCORE_VOLATILITY_PENALTY,
+        illiquidity_penalty=SCORE_ILLIQUIDITY_PENALTY,
+        liquidity_reference_usd=SCORE_LIQUIDITY_REFERENCE_USD,
+        utilization_kink=SCORE_UTILIZATION_KINK,
+    )
+    return {"scores": scores, "score_state": state}
@@ -0,0 +1,90 @@
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from settings import MARKETS_VERSION_TTL
+
+VERSION_ID = "markets"
+
+class MarketsVersion:
+    """In-process view of the markets collection version
+
+    Every write to markets increments a counter in collection_versions. Reads
+    only need the counter to build ETag/Last-Modified validators, so it is
+    cached here and re-read from Mongo at most once per ttl seconds; writes
+    made by this worker update the cached value immediately.
+    """
+
+    def __init__(self, ttl: float = MARKETS_VERSION_TTL):
+        self.ttl = ttl
+        self.version: Optional[int] = None
+        self.updated_at: Optional[datetime] = None
+        self._checked_at = 0.0
+
+    def observe(self, version: int, updated_at: datetime) -> None:
+        """Record a version seen elsewhere, never moving backwards"""
+        if self.version is None or version >= self.version:
+            self.version = version
+            self.updated_at = updated_at
+        self._checked_at = time.monotonic()
+
+    async def current(self, db) -> Tuple[int, datetime]:
+        """Get (version, updated_at), hitting Mongo only when the cached value is older than ttl"""
+        if self.version is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self.version, self.updated_at
+
+        doc = await db.collection_versions.find_one({"_id": VERSION_ID})
+        if doc is None:
+            doc = await self._initialize(db)
+        self.observe(doc["version"], doc["updated_at"])
+        return self.version, self.updated_at
+
+    async def bump(self, db) -> Tuple[int, datetime]:
+        """Increment the version after a write to markets"""
+        from pymongo import ReturnDocument
+        doc = await db.collection_versions.find_one_and_update(
+            {"_id": VERSION_ID},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.observe(doc["version"], doc["updated_at"])
+        return self.version, self.updated_at
+
+    async def _initialize(self, db) -> dict:
+        """Start the counter at 1 with the newest updated_at among existing markets"""
+        from pymongo import ReturnDocument
+        newest = await db.markets.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        updated_at = (newest or {}).get("updated_at") or datetime.utcnow()
+        return await db.collection_versions.find_one_and_update(
+            {"_id": VERSION_ID},
+            {"$setOnInsert": {"version": 1, "updated_at": updated_at}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+# Shared by all market routes in this worker
+markets_version = MarketsVersion()
+
+def version_filter(market_id: str, expected_version: Optional[int]) -> Dict[str, Any]:
+    """Filter for a market, pinned to a version when one is expected"""
+    query = {"id": market_id}
+    if expected_version is not None:
+        # Markets written before versioning have no field and count as version 1
+        query["version"] = {"$in": [expected_version, None]} if expected_version == 1 else expected_version
+    return query
+
+def versioned_update(update_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Update pipeline that sets fields and increments the market version atomically"""
+    fields = {k: {"$literal": v} for k, v in update_data.items()}
+    fields["version"] = {"$add": [{"$ifNull": ["$version", 1]}, 1]}
+    return [{"$set": fields}]
+
+def new_write_id() -> str:
+    """Token stored with a write as write_id, so the documents it changed can be read back
+
+    bulk_write only reports totals, and a version alone cannot tell this
+    write from a concurrent one that also moved the version on by one.
+    """
+    return uuid.uuid4().hex
@@ -0,0 +1,15 @@
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import Receive, Scope, Send
+
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip middleware that leaves Server-Sent Event streams alone
+
+    Compressing a stream would hold events back in the compressor's buffer,
+    so paths ending in /stream are passed through untouched.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
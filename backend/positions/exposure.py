@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from settings import EXPOSURE_REBUILD_LEASE
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "asset_exposure"
+STATE_ID = "asset_exposure"
+
+# Set once this worker has seen the counters built; they stay built from then on
+_built = False
+
+# Health factor buckets as (upper bound, label); labels are in percent
+# because field names cannot contain dots. Debt-free positions are "no_debt".
+HEALTH_BUCKETS = [
+    (1.0, "<100"),
+    (1.1, "100-110"),
+    (1.25, "110-125"),
+    (1.5, "125-150"),
+    (2.0, "150-200"),
+    (math.inf, "200+"),
+]
+
+def health_bucket(health_factor: Optional[float]) -> str:
+    """Histogram bucket of a position's health factor"""
+    if health_factor is None or math.isinf(health_factor):
+        return "no_debt"
+    for upper, label in HEALTH_BUCKETS:
+        if health_factor < upper:
+            return label
+    return HEALTH_BUCKETS[-1][1]
+
+def contributions(position: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """What a position adds to each asset's exposure counters
+
+    A position counts once as a supplier or borrower of an asset however
+    many legs it holds in it, and once in the asset's health histogram.
+    """
+    result: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    if not position:
+        return result
+    for side, holders, amount_field in (("supplies", "suppliers", "supplied"), ("borrows", "borrowers", "borrowed")):
+        for leg in position.get(side, []):
+            counters = result[leg["asset_id"]]
+            counters[holders] = 1
+            counters[amount_field] += float(leg["amount"])
+            counters[f"{amount_field}_usd"] += leg.get("amount_usd", 0.0)
+    bucket = f"health.{health_bucket(position.get('health_factor'))}"
+    for counters in result.values():
+        counters[bucket] = 1
+    return result
+
+def exposure_delta(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Counter increments per asset for a position going from before to after (None if absent)"""
+    old, new = contributions(before), contributions(after)
+    delta: Dict[str, Dict[str, float]] = {}
+    for asset_id in old.keys() | new.keys():
+        counters = {
+            name: new[asset_id].get(name, 0) - old[asset_id].get(name, 0)
+            for name in old[asset_id].keys() | new[asset_id].keys()
+        }
+        counters = {name: value for name, value in counters.items() if value}
+        if counters:
+            delta[asset_id] = counters
+    return delta
+
+async def apply_position_changes(db, changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+    """Fold (before, after) position changes into the exposure counters with one bulk write
+
+    Writers of user_positions call wait_for_exposure before writing, then
+    this with the document as it was and as written (None for an insert's
+    before or a delete's after). The increments commute, so concurrent
+    writers need no coordination as long as each before is what the write
+    replaced. Failures are logged rather than raised.
+    """
+    from pymongo import UpdateOne
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for before, after in changes:
+        for asset_id, counters in exposure_delta(before, after).items():
+            for name, value in counters.items():
+                totals[asset_id][name] += value
+    if not totals:
+        return
+    now = datetime.utcnow()
+    try:
+        await db[COLLECTION].bulk_write(
+            [UpdateOne({"_id": asset_id}, {"$inc": dict(counters), "$set": {"updated_at": now}}, upsert=True)
+             for asset_id, counters in totals.items()],
+            ordered=False,
+        )
+    except Exception as e:
+        logger.warning(f"Could not update asset exposure: {e}")
+
+async def rebuild_exposure(db) -> int:
+    """Recompute every asset's counters with one scan of user_positions; returns the asset count
+
+    Replaces the counters wholesale, so it must not overlap incremental
+    updates: it runs from ensure_exposure under the rebuild lease, while
+    position writers wait in wait_for_exposure.
+    """
+    from pymongo import ReplaceOne
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    cursor = db.user_positions.find({}, {"_id": 0, "supplies": 1, "borrows": 1, "health_factor": 1})
+    async for position in cursor:
+        for asset_id, counters in contributions(position).items():
+            for name, value in counters.items():
+                totals[asset_id][name] += value
+
+    now = datetime.utcnow()
+    documents = {}
+    for asset_id, counters in totals.items():
+        document: Dict[str, Any] = {"health": {}, "updated_at": now}
+        for name, value in counters.items():
+            if name.startswith("health."):
+                document["health"][name[len("health."):]] = value
+            else:
+                document[name] = value
+        documents[asset_id] = document
+    if documents:
+        await db[COLLECTION].bulk_write(
+            [ReplaceOne({"_id": asset_id}, document, upsert=True) for asset_id, document in documents.items()],
+            ordered=False,
+        )
+    await db[COLLECTION].delete_many({"_id": {"$nin": list(documents)}})
+    return len(documents)
+
+async def _claim_rebuild(db) -> bool:
+    """Take the rebuild lease so only one process builds the counters"""
+    from pymongo.errors import DuplicateKeyError
+    now = datetime.utcnow()
+    try:
+        await db.sync_state.update_one(
+            {
+                "_id": STATE_ID,
+                "built": {"$ne": True},
+                "$or": [{"lease_until": {"$lt": now}}, {"lease_until": {"$exists": False}}],
+            },
+            {"$set": {"lease_until": now + timedelta(seconds=EXPOSURE_REBUILD_LEASE)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        # Built already, or another worker holds the lease
+        return False
+
+async def exposure_built(db) -> bool:
+    """Whether the counters have been built, so incremental updates may be applied"""
+    global _built
+    if not _built:
+        state = await db.sync_state.find_one({"_id": STATE_ID}, {"built": 1})
+        _built = bool(state and state.get("built"))
+    return _built
+
+async def ensure_exposure(db) -> None:
+    """Build the counters once, in whichever process takes the lease; afterwards they are maintained incrementally"""
+    if await exposure_built(db) or not await _claim_rebuild(db):
+        return
+    try:
+        assets = await rebuild_exposure(db)
+    except Exception:
+        await db.sync_state.update_one({"_id": STATE_ID}, {"$unset": {"lease_until": ""}})
+        raise
+    await db.sync_state.update_one(
+        {"_id": STATE_ID},
+        {"$set": {"built": True, "built_at": datetime.utcnow()}, "$unset": {"lease_until": ""}},
+    )
+    logger.info(f"Built exposure counters for {assets} assets")
+
+async def wait_for_exposure(db, poll: float = 1.0) -> None:
+    """Hold a position writer until the counters are built
+
+    Takes over the build if the process holding the lease stopped before
+    finishing.
+    """
+    while not await exposure_built(db):
+        await ensure_exposure(db)
+        if not await exposure_built(db):
+            await asyncio.sleep(poll)
+
+async def get_exposure(db, asset_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Exposure counters per asset, one small document each"""
+    query = {"_id": {"$in": asset_ids}} if asset_ids else {}
+    exposure = []
+    async for doc in db[COLLECTION].find(query).sort("_id", 1):
+        health = doc.get("health", {})
+        exposure.append({
+            "asset_id": doc["_id"],
+            "suppliers": int(doc.get("suppliers", 0)),
+            "borrowers": int(doc.get("borrowers", 0)),
+            "supplied": doc.get("supplied", 0.0),
+            "supplied_usd": doc.get("supplied_usd", 0.0),
+            "borrowed": doc.get("borrowed", 0.0),
+            "borrowed_usd": doc.get("borrowed_usd", 0.0),
+            "health": {label: int(health.get(label, 0)) for _, label in HEALTH_BUCKETS + [(None, "no_debt")]},
+            "updated_at": doc.get("updated_at"),
+        })
+    return exposure
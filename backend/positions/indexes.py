@@ -0,0 +1,14 @@
+from pymongo import ASCENDING
+
+# Multikey indexes over the assets of each leg, so jobs that follow an asset
+# (revaluation after a price change) read only the positions holding it
+HOLDING_INDEXES = [
+    [("supplies.asset_id", ASCENDING)],
+    [("borrows.asset_id", ASCENDING)],
+]
+
+async def ensure_indexes(db) -> None:
+    """Create the indexes the user_positions collection is queried by"""
+    await db.user_positions.create_index("user_address", unique=True)
+    for keys in HOLDING_INDEXES:
+        await db.user_positions.create_index(keys)
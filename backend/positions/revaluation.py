@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from positions.exposure import apply_position_changes, wait_for_exposure
+from settings import REVALUATION_BATCH_SIZE, REVALUATION_MAX_RATE
+
+logger = logging.getLogger(__name__)
+
+# One revaluation at a time per worker, so a run using older prices never finishes after a newer one
+_revaluation_lock = asyncio.Lock()
+
+def revalue(positions: List[Dict[str, Any]], prices: Dict[str, float], collateral_factors: Dict[str, float]) -> List[Dict[str, float]]:
+    """Reprice every supply and borrow of the positions and recompute their totals
+
+    All legs of the batch are priced in one vectorized pass and summed per
+    position with bincount. Each leg's amount_usd is updated in place; legs
+    whose market has no price keep their stored value. Returns the totals,
+    borrow limit and health factor of each position, in input order.
+    """
+    import numpy as np
+    owners, amounts, stored, leg_prices, weights, is_borrow, legs = [], [], [], [], [], [], []
+    for i, position in enumerate(positions):
+        for kind, entries in ((0, position["supplies"]), (1, position["borrows"])):
+            for leg in entries:
+                owners.append(i)
+                amounts.append(float(leg["amount"]))
+                stored.append(leg.get("amount_usd", 0.0))
+                leg_prices.append(prices.get(leg["asset_id"], np.nan))
+                weights.append(collateral_factors.get(leg["asset_id"], 0.0) if kind == 0 and leg.get("used_as_collateral") else 0.0)
+                is_borrow.append(kind)
+                legs.append(leg)
+
+    n = len(positions)
+    owners = np.array(owners, dtype=np.intp)
+    leg_prices = np.array(leg_prices, dtype=float)
+    amount_usd = np.where(np.isnan(leg_prices), np.array(stored, dtype=float), np.array(amounts, dtype=float) * leg_prices)
+    is_borrow = np.array(is_borrow, dtype=bool)
+
+    supplied = np.bincount(owners[~is_borrow], amount_usd[~is_borrow], minlength=n)
+    borrowed = np.bincount(owners[is_borrow], amount_usd[is_borrow], minlength=n)
+    borrow_limit = np.bincount(owners, amount_usd * np.array(weights, dtype=float), minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        health = np.where(borrowed > 0, borrow_limit / borrowed, np.inf)
+
+    for leg, value in zip(legs, amount_usd.tolist()):
+        leg["amount_usd"] = value
+    return [
+        {"total_supplied_usd": s, "total_borrowed_usd": b, "borrow_limit_usd": limit, "health_factor": h}
+        for s, b, limit, h in zip(supplied.tolist(), borrowed.tolist(), borrow_limit.tolist(), health.tolist())
+    ]
+
+async def _write_batch(
+    db,
+    positions: List[Dict[str, Any]],
+    prices: Dict[str, float],
+    collateral_factors: Dict[str, float],
+    run_id: str,
+) -> int:
+    """Store one batch of revalued positions and their exposure changes; returns how many were written
+
+    Updates are pinned to the updated_at, revalued_at and revaluation_id
+    that were read. Every revaluation stamps its own run ID, so of two runs
+    that read the same position only one writes it, even within the same
+    millisecond, and a position changed by another writer keeps that
+    writer's (already current) values. Exposure deltas are applied only for
+    positions stamped with this run's ID.
+    """
+    from pymongo import UpdateOne
+    before = [
+        {"supplies": [dict(leg) for leg in position["supplies"]], "borrows": [dict(leg) for leg in position["borrows"]],
+         "health_factor": position.get("health_factor")}
+        for position in positions
+    ]
+    now = datetime.utcnow()
+    totals = revalue(positions, prices, collateral_factors)
+    operations = [
+        UpdateOne(
+            {
+                "user_address": position["user_address"],
+                "updated_at": position.get("updated_at"),
+                "revalued_at": position.get("revalued_at"),
+                "revaluation_id": position.get("revaluation_id"),
+            },
+            {"$set": {"supplies": position["supplies"], "borrows": position["borrows"], **fields, "revalued_at": now, "revaluation_id": run_id}},
+        )
+        for position, fields in zip(positions, totals)
+    ]
+    matched = (await db.user_positions.bulk_write(operations, ordered=False)).matched_count
+
+    written = [True] * len(positions)
+    if matched < len(positions):
+        # bulk_write only reports totals; the positions carrying this run's ID are the ones written
+        addresses = [position["user_address"] for position in positions]
+        query = {"user_address": {"$in": addresses}, "revaluation_id": run_id}
+        stamped = {doc["user_address"] async for doc in db.user_positions.find(query, {"_id": 0, "user_address": 1})}
+        written = [address in stamped for address in addresses]
+    await apply_position_changes(db, [
+        (old, {**position, **fields})
+        for old, position, fields, ok in zip(before, positions, totals, written)
+        if ok
+    ])
+    return matched
+
+async def revalue_positions(
+    db,
+    asset_ids: Optional[List[str]] = None,
+    batch_size: int = REVALUATION_BATCH_SIZE,
+    max_rate: float = REVALUATION_MAX_RATE,
+) -> Dict[str, Any]:
+    """Recompute the USD amounts, totals, borrow limit and health factor of stored positions
+
+    Only positions holding one of asset_ids are read (all of them when
+    asset_ids is None), batch_size at a time, each batch written with one
+    bulk write. The job sleeps between batches so it touches at most
+    max_rate positions per second (0 disables the throttle). Returns a
+    report with the positions read, updated and skipped, and the rate.
+    Waits for the exposure counters to be built before writing anything.
+    """
+    # Positions must not change while the exposure counters are being built from them
+    await wait_for_exposure(db)
+    run_id = uuid.uuid4().hex
+
+    prices, collateral_factors = {}, {}
+    async for market in db.markets.find({}, {"_id": 0, "asset_id": 1, "price_usd": 1, "collateral_factor": 1}):
+        prices[market["asset_id"]] = market["price_usd"]
+        collateral_factors[market["asset_id"]] = market["collateral_factor"]
+
+    query: Dict[str, Any] = {}
+    if asset_ids is not None:
+        query = {"$or": [{"supplies.asset_id": {"$in": asset_ids}}, {"borrows.asset_id": {"$in": asset_ids}}]}
+    cursor = db.user_positions.find(
+        query, {"_id": 0, "user_address": 1, "supplies": 1, "borrows": 1, "health_factor": 1, "updated_at": 1, "revalued_at": 1, "revaluation_id": 1},
+        batch_size=batch_size,
+    )
+
+    start = time.monotonic()
+    read = updated = batches = 0
+    batch: List[Dict[str, Any]] = []
+
+    async def flush() -> None:
+        nonlocal read, updated, batches
+        updated += await _write_batch(db, batch, prices, collateral_factors, run_id)
+        read += len(batch)
+        batches += 1
+        batch.clear()
+        if max_rate > 0:
+            # Stay under max_rate positions per second on average
+            delay = read / max_rate - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async for position in cursor:
+        batch.append(position)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    seconds = time.monotonic() - start
+    return {
+        "assets": asset_ids,
+        "positions": read,
+        "updated": updated,
+        "skipped": read - updated,  # changed while the job ran
+        "batches": batches,
+        "seconds": seconds,
+        "positions_per_second": read / seconds if seconds > 0 else 0.0,
+    }
+
+async def revalue_repriced(db, event: Dict[str, Any]) -> None:
+    """prices_updated handler: revalue the positions holding the repriced assets"""
+    async with _revaluation_lock:
+        report = await revalue_positions(db, list(event["prices"]))
+    logger.info(
+        f"Revalued {report['updated']} of {report['positions']} positions for markets version {event['version']} "
+        f"in {report['seconds']:.2f}s ({report['positions_per_second']:.0f} positions/s)"
+    )
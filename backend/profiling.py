@@ -0,0 +1,100 @@
+import asyncio
+import hmac
+import logging
+import random
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from settings import (
+    PROFILING_ADMIN_TOKEN,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_INTERVAL,
+    PROFILING_DIR,
+    PROFILING_MAX_FILES,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIX = ".speedscope.json"
+
+def is_admin(token: str) -> bool:
+    """Constant-time check of an admin token; always False when no token is configured"""
+    return bool(PROFILING_ADMIN_TOKEN) and hmac.compare_digest(token.encode(), PROFILING_ADMIN_TOKEN.encode())
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Saved profiles, newest first"""
+    directory = Path(PROFILING_DIR)
+    if not directory.exists():
+        return []
+    profiles = []
+    for path in directory.glob("*" + PROFILE_SUFFIX):
+        stat = path.stat()
+        profiles.append({
+            "name": path.name,
+            "size": stat.st_size,
+            "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat(),
+        })
+    return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+def _write_profile(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+    # Keep only the newest PROFILING_MAX_FILES profiles
+    saved = sorted(path.parent.glob("*" + PROFILE_SUFFIX), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in saved[PROFILING_MAX_FILES:]:
+        old.unlink(missing_ok=True)
+
+class ProfilingMiddleware:
+    """Profiles selected requests with pyinstrument and saves speedscope flame graphs
+
+    A request is profiled when it carries X-Profile with the admin token, or
+    at random with PROFILING_SAMPLE_RATE. The sampler follows the request's
+    task across awaits, so time spent waiting on Mongo or Blockfrost is
+    attributed to the awaiting code. Only one request is profiled at a time.
+    The middleware is only installed when PROFILING_ENABLED is set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._busy = False
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return is_admin(value.decode("latin-1"))
+        return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._busy or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        self._busy = True
+        profiler = Profiler(interval=PROFILING_INTERVAL, async_mode="enabled")
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            self._busy = False
+            elapsed_ms = int((time.perf_counter() - start) * 1000)
+
+            route = getattr(scope.get("route"), "path", scope["path"])
+            slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+            name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{scope['method']}-{slug}-{elapsed_ms}ms{PROFILE_SUFFIX}"
+            try:
+                content = profiler.output(renderer=SpeedscopeRenderer())
+                await asyncio.to_thread(_write_profile, Path(PROFILING_DIR) / name, content)
+                logger.info(f"Saved request profile {name}")
+            except Exception as e:
+                logger.warning(f"Could not save request profile: {e}")
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from settings import BLOCKFROST_API_KEY, READINESS_CACHE_TTL, SERVER_BOOT_ID, SERVER_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Cache warmers run once per worker at startup; readiness waits for all of them
+_warmers: List[Tuple[str, Callable[[], Awaitable[Any]]]] = []
+_warm_state: Dict[str, str] = {}
+
+# Each worker records its finished warm-up in sync_state, so any worker can tell
+# whether all SERVER_WORKERS of this server start are warm
+_WARMUP_PREFIX = "warmup:"
+_WARMUP_RECORD_RETENTION = timedelta(days=1)
+_warm_recorded = False
+_workers_warm = False  # latched: a worker restarted later does not make the server unready again
+
+_last_check: Dict[str, Any] = {}
+_last_check_at = 0.0
+
+def register_warmer(name: str, warmer: Callable[[], Awaitable[Any]]) -> None:
+    """Register a coroutine function that fills a cache before the worker reports ready"""
+    _warmers.append((name, warmer))
+    _warm_state[name] = "pending"
+
+async def warm_up(db) -> None:
+    """Run every registered warmer, recording which ones finished, then record this worker as warm"""
+    for name, warmer in _warmers:
+        try:
+            await warmer()
+            _warm_state[name] = "ready"
+        except Exception as e:
+            _warm_state[name] = "failed"
+            logger.warning(f"Cache warmer {name} failed: {e}")
+    try:
+        await _record_warm(db)
+    except Exception as e:
+        # Retried by the next readiness check
+        logger.warning(f"Recording worker warm-up failed: {e}")
+
+async def _record_warm(db) -> None:
+    """Store this worker's finished warm-up under the server's boot ID, dropping records of old starts"""
+    global _warm_recorded
+    now = datetime.utcnow()
+    await db.sync_state.update_one(
+        {"_id": f"{_WARMUP_PREFIX}{SERVER_BOOT_ID}:{os.getpid()}"},
+        {"$set": {"boot_id": SERVER_BOOT_ID, "pid": os.getpid(), "caches": dict(_warm_state), "warmed_at": now}},
+        upsert=True,
+    )
+    _warm_recorded = True
+    await db.sync_state.delete_many({
+        "_id": {"$regex": f"^{_WARMUP_PREFIX}"},
+        "boot_id": {"$ne": SERVER_BOOT_ID},
+        "warmed_at": {"$lt": now - _WARMUP_RECORD_RETENTION},
+    })
+
+async def _check_workers(db) -> Dict[str, int]:
+    """Count the workers of this server start that finished warming up"""
+    global _workers_warm
+    if _workers_warm:
+        return {"warm": SERVER_WORKERS, "expected": SERVER_WORKERS}
+    if not _warm_recorded and all(state != "pending" for state in _warm_state.values()):
+        await _record_warm(db)
+    warm = await db.sync_state.count_documents({"boot_id": SERVER_BOOT_ID, "warmed_at": {"$exists": True}})
+    _workers_warm = warm >= SERVER_WORKERS
+    return {"warm": warm, "expected": SERVER_WORKERS}
+
+async def _check_mongo(db) -> str:
+    await db.command("ping")
+    return "ok"
+
+async def _check_blockfrost() -> str:
+    if not BLOCKFROST_API_KEY:
+        return "disabled"
+    from cardano.cardano_service import CardanoService
+    health = await asyncio.to_thread(CardanoService().api.health)
+    return "ok" if getattr(health, "is_healthy", False) else "unhealthy"
+
+async def check_readiness(db) -> Dict[str, Any]:
+    """Check dependencies and warm caches, reusing the last result for READINESS_CACHE_TTL seconds
+
+    Caches are per worker, and a request reaches whichever worker accepts
+    it, so readiness waits for every worker of this server start to record
+    its warm-up, not just the one answering.
+    """
+    global _last_check, _last_check_at
+    if _last_check and time.monotonic() - _last_check_at < READINESS_CACHE_TTL:
+        return _last_check
+
+    checks = {}
+    for name, check in (("mongo", _check_mongo(db)), ("blockfrost", _check_blockfrost())):
+        try:
+            checks[name] = await asyncio.wait_for(check, timeout=3)
+        except Exception as e:
+            checks[name] = f"error: {e}"
+
+    # A failed warmer only means a cold cache, so it does not block readiness
+    caches_warm = all(state != "pending" for state in _warm_state.values())
+    try:
+        workers = await asyncio.wait_for(_check_workers(db), timeout=3)
+    except Exception as e:
+        workers = {"warm": 0, "expected": SERVER_WORKERS, "error": str(e)}
+    ready = (
+        all(status in ("ok", "disabled") for status in checks.values())
+        and caches_warm
+        and workers["warm"] >= workers["expected"]
+    )
+
+    _last_check = {"ready": ready, "checks": checks, "caches": dict(_warm_state), "workers": workers}
+    _last_check_at = time.monotonic()
+    return _last_check
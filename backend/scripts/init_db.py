@@ -9,6 +9,11 @@ import sys
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from markets.indexes import ensure_indexes as ensure_market_indexes
+from markets.history import ensure_collections as ensure_history_collections
+from positions.indexes import ensure_indexes as ensure_position_indexes
+from cardano.token_registry import ensure_indexes as ensure_token_registry_indexes
+
 # Load environment variables
 load_dotenv(Path(__file__).parent.parent / '.env')
 
@@ -20,18 +25,25 @@ db = client[os.environ['DB_NAME']]
 async def init_collections():
     # Create indexes for markets collection
     print("Creating indexes for markets collection...")
-    await db.markets.create_index("id", unique=True)
-    await db.markets.create_index("asset_id", unique=True)
+    await ensure_market_indexes(db)
+    
+    # Create the market history time-series collection and rollup indexes
+    print("Creating market history collections...")
+    await ensure_history_collections(db)
     
     # Create indexes for user_positions collection
     print("Creating indexes for user_positions collection...")
-    await db.user_positions.create_index("user_address", unique=True)
+    await ensure_position_indexes(db)
     
     # Create indexes for transactions collection
     print("Creating indexes for transactions collection...")
     await db.transactions.create_index("tx_hash")
     await db.transactions.create_index("user_address")
     
+    # Create indexes for token_registry collection
+    print("Creating indexes for token_registry collection...")
+    await ensure_token_registry_indexes(db)
+    
     print("Database initialization complete")
 
 if __name__ == "__main__":
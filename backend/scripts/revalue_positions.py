@@ -0,0 +1,43 @@
+"""Revalue stored user positions at the current market prices
+
+Usage:
+    python scripts/revalue_positions.py                     # every position
+    python scripts/revalue_positions.py --assets lovelace   # positions holding these assets
+    python scripts/revalue_positions.py --max-rate 0        # without throttling
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from positions.revaluation import revalue_positions
+from settings import REVALUATION_BATCH_SIZE, REVALUATION_MAX_RATE
+
+# Load environment variables
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ['DB_NAME']]
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--assets", nargs="+", help="only positions holding these asset IDs")
+    parser.add_argument("--batch-size", type=int, default=REVALUATION_BATCH_SIZE)
+    parser.add_argument("--max-rate", type=float, default=REVALUATION_MAX_RATE, help="positions per second; 0 is unthrottled")
+    args = parser.parse_args()
+
+    report = await revalue_positions(db, args.assets, args.batch_size, args.max_rate)
+    print(f"Read {report['positions']} positions in {report['batches']} batches")
+    print(f"Updated {report['updated']}, skipped {report['skipped']} changed during the run")
+    print(f"{report['seconds']:.2f}s, {report['positions_per_second']:.0f} positions/s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,6 +9,8 @@ from dotenv import load_dotenv
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from markets.derived import derive_fields
+
 # Load environment variables
 load_dotenv(Path(__file__).parent.parent / '.env')
 
@@ -241,12 +243,22 @@ async def seed_markets():
     # First, clear existing markets
     await db.markets.delete_many({})
     
-    # Insert markets
+    # Insert markets with their rates and scores
     for market in markets:
+        market["version"] = 1
         market["created_at"] = datetime.utcnow()
         market["updated_at"] = datetime.utcnow()
+    derive_fields(markets)
+    for market in markets:
         await db.markets.insert_one(market)
     
+    # Bump the markets version so cached responses are revalidated
+    await db.collection_versions.update_one(
+        {"_id": "markets"},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    
     # Verify
     count = await db.markets.count_documents({})
     print(f"Successfully seeded {count} markets into the database")
@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 from pathlib import Path
 import logging
 import uuid
@@ -8,7 +9,6 @@ from typing import List
 
 from fastapi import FastAPI, APIRouter
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel, Field
 
 # Add the current directory to the Python path to make imports work
@@ -22,12 +22,21 @@ from settings import (
     API_PREFIX, 
     CORS_ORIGINS, 
     CORS_METHODS, 
-    CORS_HEADERS
+    CORS_HEADERS,
+    GZIP_MINIMUM_SIZE,
+    METRICS_ENABLED,
+    PROFILING_ENABLED,
+    BLOCKFROST_API_KEY,
+    TOKEN_REGISTRY_SYNC_ENABLED,
+    MARKET_HISTORY_SAMPLE_INTERVAL,
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    SERVER_BOOT_ID,
 )
-
-# MongoDB connection
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
+from database import get_database, close_client
+from readiness import register_warmer, warm_up
+from middleware import StreamAwareGZipMiddleware
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -53,12 +62,12 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    _ = await get_database().status_checks.insert_one(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+    status_checks = await get_database().status_checks.find().to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
 # Include all routers
@@ -66,11 +75,19 @@ async def get_status_checks():
 from api.cardano_router import router as cardano_router
 from api.market_router import router as market_router
 from api.user_router import router as user_router
+from api.health_router import router as health_router
+from markets.broadcaster import market_broadcaster
 
+api_router.include_router(health_router)
 api_router.include_router(cardano_router)
 api_router.include_router(market_router)
 api_router.include_router(user_router)
 
+# Profile listing is only exposed when profiling is enabled
+if PROFILING_ENABLED:
+    from api.admin_router import router as admin_router
+    api_router.include_router(admin_router)
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -83,6 +100,20 @@ app.add_middleware(
     allow_headers=CORS_HEADERS,
 )
 
+# Compress larger JSON responses
+app.add_middleware(StreamAwareGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+# Opt-in request profiling; not installed at all when disabled
+if PROFILING_ENABLED:
+    from profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware)
+
+# Prometheus metrics; added last so request timing covers the other middleware
+if METRICS_ENABLED:
+    from metrics import MetricsMiddleware, metrics_endpoint
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -90,6 +121,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Background jobs started with the app
+background_tasks = []
+
+@app.on_event("startup")
+async def start_background_jobs():
+    # The MongoDB client is created here rather than at import to keep cold start light
+    db = get_database()
+
+    if BLOCKFROST_API_KEY:
+        from cardano.cardano_service import CardanoService
+        register_warmer("chain_tip", lambda: CardanoService().warm_cache())
+
+        if TOKEN_REGISTRY_SYNC_ENABLED:
+            from cardano.token_registry import run_token_registry_sync
+            background_tasks.append(
+                asyncio.create_task(run_token_registry_sync(db, lambda: CardanoService().api))
+            )
+
+    # Indexes the market queries (top-k recommendations) rely on
+    from markets.indexes import ensure_indexes as ensure_market_indexes
+    register_warmer("market_indexes", lambda: ensure_market_indexes(db))
+
+    # Rates and scores for markets stored before the rate model and scores existed
+    from markets.derived import backfill_derived_fields
+    register_warmer("market_derived", lambda: backfill_derived_fields(db))
+
+    # Market history collections, and the scheduled snapshots that fill gaps between updates
+    from markets.history import ensure_collections as ensure_history_collections, run_history_sampler
+    register_warmer("market_history", lambda: ensure_history_collections(db))
+    if MARKET_HISTORY_SAMPLE_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(run_history_sampler(db)))
+
+    # Rolling analytics follow the market stream; restore the last checkpoint before it starts
+    from markets.rolling import rolling_analytics, run_checkpoints
+    register_warmer("market_analytics", lambda: rolling_analytics.restore(db))
+    market_broadcaster.add_listener(rolling_analytics.on_markets_changed)
+    background_tasks.append(asyncio.create_task(run_checkpoints(rolling_analytics, db)))
+
+    # Stored positions are revalued once per applied oracle price batch; the
+    # per-asset exposure counters are built once, then kept current by position writers
+    from positions.indexes import ensure_indexes as ensure_position_indexes
+    from positions.revaluation import revalue_repriced
+    from positions.exposure import ensure_exposure
+    from markets.events import market_events, PRICES_UPDATED
+    register_warmer("position_indexes", lambda: ensure_position_indexes(db))
+    register_warmer("position_exposure", lambda: ensure_exposure(db))
+    market_events.subscribe(PRICES_UPDATED, lambda event: revalue_repriced(db, event))
+
+    # Load the market snapshot that feeds /api/markets/stream
+    register_warmer("market_stream", lambda: market_broadcaster.start(db))
+
+    # Warm caches in the background; /api/ready reports when every worker is done
+    background_tasks.append(asyncio.create_task(warm_up(db)))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    market_broadcaster.stop()
+    for task in background_tasks:
+        task.cancel()
+    
+    # Let handlers of the last price batch finish
+    from markets.events import market_events
+    await market_events.drain()
+    
+    # Keep the rolling windows across restarts
+    from markets.rolling import rolling_analytics
+    try:
+        await rolling_analytics.checkpoint(get_database())
+    except Exception as e:
+        logger.warning(f"Final rolling analytics checkpoint failed: {e}")
+    close_client()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Workers are separate processes; each runs its own startup hooks and caches.
+    # They inherit the boot ID, which groups their warm-up records for /api/ready
+    os.environ["SERVER_BOOT_ID"] = SERVER_BOOT_ID
+    uvicorn.run("server:app", host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS)
@@ -1,4 +1,5 @@
 import os
+import uuid
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -15,10 +16,99 @@ DB_NAME = os.environ.get('DB_NAME', 'test_database')
 # Cardano settings
 BLOCKFROST_API_KEY = os.environ.get('BLOCKFROST_API_KEY', '')
 BLOCKFROST_NETWORK = os.environ.get('BLOCKFROST_NETWORK', 'preprod')
+BLOCKFROST_BASE_URL = os.environ.get('BLOCKFROST_BASE_URL', '')  # overrides the network URL, e.g. for a local fake
+
+# Asset statistics settings
+ASSET_STATS_TTL = int(os.environ.get('ASSET_STATS_TTL', '300'))  # seconds
+ASSET_STATS_PAGE_SIZE = 100  # Blockfrost maximum page size
+ASSET_STATS_MAX_PAGES = int(os.environ.get('ASSET_STATS_MAX_PAGES', '10'))  # pages counted before giving a lower bound
+
+# Chain cache settings
+CHAIN_FINALITY_DEPTH = int(os.environ.get('CHAIN_FINALITY_DEPTH', '2160'))  # confirmations before an object is final (Cardano security parameter k)
+CHAIN_PENDING_TTL = int(os.environ.get('CHAIN_PENDING_TTL', '20'))  # seconds to cache objects that are not final yet
+CHAIN_CACHE_SIZE = int(os.environ.get('CHAIN_CACHE_SIZE', '4096'))  # entries per tier
+CHAIN_CACHE_DIR = os.environ.get('CHAIN_CACHE_DIR', str(BASE_DIR / 'cache'))  # empty disables the disk tier
+CHAIN_CACHE_MAX_BYTES = int(os.environ.get('CHAIN_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+CHAIN_CACHE_VERSION = int(os.environ.get('CHAIN_CACHE_VERSION', '1'))  # bump to invalidate stored entries
+
+# Token registry sync settings
+TOKEN_REGISTRY_SYNC_ENABLED = os.environ.get('TOKEN_REGISTRY_SYNC_ENABLED', 'true').lower() == 'true'
+TOKEN_REGISTRY_SYNC_INTERVAL = int(os.environ.get('TOKEN_REGISTRY_SYNC_INTERVAL', '300'))  # seconds
+TOKEN_REGISTRY_SYNC_MAX_PAGES = int(os.environ.get('TOKEN_REGISTRY_SYNC_MAX_PAGES', '5'))  # asset pages per run
+TOKEN_REGISTRY_SYNC_LEASE = int(os.environ.get('TOKEN_REGISTRY_SYNC_LEASE', '120'))  # seconds; renewed during a run, so it only has to outlast one Blockfrost call
 
 # API settings
 API_PREFIX = '/api'
 
+# Bulk market API settings
+MARKETS_BULK_MAX_ITEMS = int(os.environ.get('MARKETS_BULK_MAX_ITEMS', '1000'))
+
+# Oracle price ingestion settings
+PRICE_MIN_CHANGE = float(os.environ.get('PRICE_MIN_CHANGE', '0.001'))  # relative price move below which an update is skipped
+PRICE_HEARTBEAT = int(os.environ.get('PRICE_HEARTBEAT', '3600'))  # seconds after which a price is rewritten even if unchanged
+
+# Position revaluation settings
+REVALUATION_BATCH_SIZE = int(os.environ.get('REVALUATION_BATCH_SIZE', '500'))  # positions per bulk write
+REVALUATION_MAX_RATE = float(os.environ.get('REVALUATION_MAX_RATE', '5000'))  # positions per second; 0 disables the throttle
+EXPOSURE_REBUILD_LEASE = int(os.environ.get('EXPOSURE_REBUILD_LEASE', '600'))  # seconds one worker may spend building the exposure counters before another takes over
+
+# HTTP caching settings for read-heavy market routes
+MARKETS_CACHE_MAX_AGE = int(os.environ.get('MARKETS_CACHE_MAX_AGE', '5'))  # seconds
+MARKETS_STALE_WHILE_REVALIDATE = int(os.environ.get('MARKETS_STALE_WHILE_REVALIDATE', '30'))  # seconds
+MARKETS_VERSION_TTL = float(os.environ.get('MARKETS_VERSION_TTL', '1'))  # seconds a worker trusts its cached markets version
+MARKET_STREAM_QUEUE_SIZE = int(os.environ.get('MARKET_STREAM_QUEUE_SIZE', '100'))  # events buffered per client before it is dropped
+MARKET_STREAM_POLL_INTERVAL = float(os.environ.get('MARKET_STREAM_POLL_INTERVAL', '2'))  # seconds, when change streams are unavailable
+MARKET_STREAM_HEARTBEAT = float(os.environ.get('MARKET_STREAM_HEARTBEAT', '15'))  # seconds between keep-alive comments
+MARKET_STREAM_MAX_FAILURES = int(os.environ.get('MARKET_STREAM_MAX_FAILURES', '3'))  # consecutive change stream failures before polling instead
+MARKET_STREAM_MAX_BACKOFF = float(os.environ.get('MARKET_STREAM_MAX_BACKOFF', '30'))  # seconds, cap on the retry delay after failures
+GZIP_MINIMUM_SIZE = 1000  # bytes; smaller responses are not worth compressing
+
+# Kinked interest-rate model defaults (annual percentages; markets may carry their own rate_model)
+RATE_MODEL_ENABLED = os.environ.get('RATE_MODEL_ENABLED', 'true').lower() == 'true'  # derive APYs and utilization from supply/borrow totals
+RATE_BASE = float(os.environ.get('RATE_BASE', '0'))  # borrow rate at zero utilization
+RATE_SLOPE1 = float(os.environ.get('RATE_SLOPE1', '4'))  # borrow rate added from zero to optimal utilization
+RATE_SLOPE2 = float(os.environ.get('RATE_SLOPE2', '75'))  # borrow rate added from optimal to full utilization
+RATE_OPTIMAL_UTILIZATION = float(os.environ.get('RATE_OPTIMAL_UTILIZATION', '0.8'))  # the kink
+
+# Risk-adjusted recommendation scores (stored on each market when it is written)
+SCORE_VOLATILITY_ALPHA = float(os.environ.get('SCORE_VOLATILITY_ALPHA', '0.2'))  # EWMA weight of the newest APY change
+SCORE_VOLATILITY_PENALTY = float(os.environ.get('SCORE_VOLATILITY_PENALTY', '1.0'))  # APY points deducted per point of APY volatility
+SCORE_ILLIQUIDITY_PENALTY = float(os.environ.get('SCORE_ILLIQUIDITY_PENALTY', '5.0'))  # APY points deducted for a market with no usable depth
+SCORE_LIQUIDITY_REFERENCE_USD = float(os.environ.get('SCORE_LIQUIDITY_REFERENCE_USD', '10000000'))  # liquidity that counts as full depth
+SCORE_UTILIZATION_KINK = float(os.environ.get('SCORE_UTILIZATION_KINK', '0.8'))  # utilization above which usable depth shrinks
+RECOMMENDATION_HIGH_SCORE = float(os.environ.get('RECOMMENDATION_HIGH_SCORE', '5'))  # mean supply score above which supply rates count as high
+RECOMMENDATION_LOW_SCORE = float(os.environ.get('RECOMMENDATION_LOW_SCORE', '2'))  # mean supply score below which supply rates count as low
+
+# Market history (raw snapshots plus 1m/1h/1d rollups)
+MARKET_HISTORY_SAMPLE_INTERVAL = float(os.environ.get('MARKET_HISTORY_SAMPLE_INTERVAL', '60'))  # seconds between scheduled snapshots; 0 disables
+MARKET_HISTORY_RAW_TTL = int(os.environ.get('MARKET_HISTORY_RAW_TTL', str(2 * 24 * 3600)))  # seconds raw snapshots are kept
+MARKET_HISTORY_1M_TTL = int(os.environ.get('MARKET_HISTORY_1M_TTL', str(7 * 24 * 3600)))  # seconds minute rollups are kept
+MARKET_HISTORY_1H_TTL = int(os.environ.get('MARKET_HISTORY_1H_TTL', str(365 * 24 * 3600)))  # seconds hourly rollups are kept; daily ones are kept forever
+MARKET_HISTORY_MAX_POINTS = int(os.environ.get('MARKET_HISTORY_MAX_POINTS', '500'))  # points per response before a coarser rollup is used
+
+# Rolling market analytics (TWAP, EMA and volatility of price and APYs)
+ROLLING_WINDOW = int(os.environ.get('ROLLING_WINDOW', '120'))  # samples per rolling window
+ROLLING_EMA_SPAN = int(os.environ.get('ROLLING_EMA_SPAN', '20'))  # samples; EMA weight is 2 / (span + 1)
+ROLLING_CHECKPOINT_INTERVAL = float(os.environ.get('ROLLING_CHECKPOINT_INTERVAL', '60'))  # seconds between state checkpoints
+
+# Observability settings
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+# On-demand request profiling (off unless enabled; requests opt in with X-Profile: <admin token>)
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILING_ADMIN_TOKEN = os.environ.get('PROFILING_ADMIN_TOKEN', '')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))  # fraction of requests profiled without the header
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', '0.001'))  # seconds between samples
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', '100'))
+
+# Server settings
+SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('SERVER_PORT', '8001'))
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', os.environ.get('WEB_CONCURRENCY', '1')))
+READINESS_CACHE_TTL = int(os.environ.get('READINESS_CACHE_TTL', '5'))  # seconds between dependency checks
+SERVER_BOOT_ID = os.environ.get('SERVER_BOOT_ID') or uuid.uuid4().hex  # one per server start; server.py passes it to its workers
+
 # CORS settings
 CORS_ORIGINS = ['*']
 CORS_METHODS = ['*']
@@ -13,15 +13,43 @@ export const marketApi = {
     return response.data;
   },
   
+  // Get APY, utilization and price history; the server picks the rollup for the range
+  getMarketHistory: async (marketId, { from, to, resolution } = {}) => {
+    const response = await apiClient.get(`/markets/${marketId}/history`, {
+      params: { from, to, resolution },
+    });
+    return response.data;
+  },
+  
   // Get market overview statistics
   getMarketStats: async () => {
     const response = await apiClient.get('/markets/stats/overview');
     return response.data;
   },
   
+  // Get per-asset holder counts, totals and health factor histograms
+  getAssetExposure: async () => {
+    const response = await apiClient.get('/markets/exposure');
+    return response.data;
+  },
+
+  // Get markets, stats and recommendations in one request
+  getBootstrap: async () => {
+    const response = await apiClient.get('/markets/bootstrap');
+    return response.data;
+  },
+
   // Get market recommendations
   getMarketRecommendations: async () => {
     const response = await apiClient.get('/markets/recommendations');
     return response.data;
   },
+
+  // Subscribe to live market updates (Server-Sent Events); returns an unsubscribe function
+  subscribeToMarkets: ({ onSnapshot, onUpdate }) => {
+    const source = new EventSource(`${apiClient.defaults.baseURL}/markets/stream`);
+    source.addEventListener('snapshot', (event) => onSnapshot(JSON.parse(event.data)));
+    source.addEventListener('markets', (event) => onUpdate(JSON.parse(event.data)));
+    return () => source.close();
+  },
 };
@@ -17,38 +17,27 @@ export const MarketProvider = ({ children }) => {
   const [statsError, setStatsError] = useState(null);
   const [recommendationsError, setRecommendationsError] = useState(null);
 
-  // Fetch markets from the API
+  // Fetch markets, statistics and recommendations in one request
   useEffect(() => {
-    const fetchMarkets = async () => {
+    const fetchBootstrap = async () => {
       try {
         setLoading(true);
-        const data = await marketApi.getAllMarkets();
-        setMarkets(data);
-        setError(null);
-      } catch (err) {
-        console.error('Error fetching markets:', err);
-        setError('Failed to fetch markets. Using mock data instead.');
-        setMarkets(mockMarkets); // Fallback to mock data
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchMarkets();
-  }, []);
-
-  // Fetch market statistics from the API
-  useEffect(() => {
-    const fetchMarketStats = async () => {
-      try {
         setStatsLoading(true);
-        const data = await marketApi.getMarketStats();
-        setMarketStats(data);
+        setRecommendationsLoading(true);
+        const data = await marketApi.getBootstrap();
+        setMarkets(data.markets);
+        setMarketStats(data.stats);
+        setMarketRecommendations(data.recommendations);
+        setError(null);
         setStatsError(null);
+        setRecommendationsError(null);
       } catch (err) {
-        console.error('Error fetching market stats:', err);
+        console.error('Error fetching market data:', err);
+        setError('Failed to fetch markets. Using mock data instead.');
         setStatsError('Failed to fetch market statistics.');
-        // No mock data fallback for stats
+        setRecommendationsError('Failed to fetch market recommendations.');
+        setMarkets(mockMarkets); // Fallback to mock data
+        // No mock data fallback for stats or recommendations
         setMarketStats({
           total_supply: 0,
           total_borrow: 0,
@@ -57,26 +46,6 @@ export const MarketProvider = ({ children }) => {
           avg_borrow_rate: 0,
           top_markets: []
         });
-      } finally {
-        setStatsLoading(false);
-      }
-    };
-
-    fetchMarketStats();
-  }, []);
-  
-  // Fetch market recommendations from the API
-  useEffect(() => {
-    const fetchMarketRecommendations = async () => {
-      try {
-        setRecommendationsLoading(true);
-        const data = await marketApi.getMarketRecommendations();
-        setMarketRecommendations(data);
-        setRecommendationsError(null);
-      } catch (err) {
-        console.error('Error fetching market recommendations:', err);
-        setRecommendationsError('Failed to fetch market recommendations.');
-        // No mock data fallback for recommendations
         setMarketRecommendations({
           best_supply_opportunities: [],
           best_borrow_opportunities: [],
@@ -84,11 +53,55 @@ export const MarketProvider = ({ children }) => {
           overall_recommendation: null
         });
       } finally {
+        setLoading(false);
+        setStatsLoading(false);
         setRecommendationsLoading(false);
       }
     };
 
-    fetchMarketRecommendations();
+    fetchBootstrap();
+  }, []);
+
+  // Keep markets, stats and recommendations current from the live stream instead of polling
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return undefined;
+
+    // Stream events carry whole public market documents; merge them over what
+    // is already loaded so no field from the bootstrap response is lost
+    const mergeMarkets = (current, changed, removed = []) => {
+      const previous = new Map(current.map((market) => [market.id, market]));
+      const updated = new Map(changed.map((market) => [market.id, { ...previous.get(market.id), ...market }]));
+      const gone = new Set(removed);
+      const merged = current
+        .filter((market) => !gone.has(market.id))
+        .map((market) => updated.get(market.id) || market);
+      const known = new Set(merged.map((market) => market.id));
+      return merged.concat([...updated.values()].filter((market) => !known.has(market.id)));
+    };
+
+    const applySummary = (event) => {
+      setMarketStats(event.stats);
+      if (event.recommendations) {
+        setMarketRecommendations(event.recommendations);
+        setRecommendationsError(null);
+      }
+    };
+
+    return marketApi.subscribeToMarkets({
+      onSnapshot: (snapshot) => {
+        // The snapshot is the full list: markets missing from it were removed
+        setMarkets((current) => {
+          const ids = new Set(snapshot.markets.map((market) => market.id));
+          const removed = current.filter((market) => !ids.has(market.id)).map((market) => market.id);
+          return mergeMarkets(current, snapshot.markets, removed);
+        });
+        applySummary(snapshot);
+      },
+      onUpdate: (update) => {
+        setMarkets((current) => mergeMarkets(current, update.changed, update.removed));
+        applySummary(update);
+      },
+    });
   }, []);
 
   // Get a single market by ID
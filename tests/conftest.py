@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level packages (from settings import ...)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+@pytest.fixture
+def with_db():
+    """Run an async scenario against a throwaway Mongo database
+
+    Skipped unless motor is installed and TEST_MONGO_URL points at a server.
+    Usage: with_db(lambda db: scenario(db)) returns the scenario's result.
+    """
+    motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+    url = os.environ.get("TEST_MONGO_URL")
+    if not url:
+        pytest.skip("TEST_MONGO_URL is not set")
+
+    def run(scenario):
+        async def main():
+            client = motor_asyncio.AsyncIOMotorClient(url)
+            name = f"test_{uuid.uuid4().hex[:12]}"
+            try:
+                return await scenario(client[name])
+            finally:
+                await client.drop_database(name)
+                client.close()
+
+        return asyncio.run(main())
+
+    return run
+
+@pytest.fixture
+def api_client():
+    """Factory for an httpx client that calls the API routers in-process
+
+    Routes get the given database (from with_db, or None for requests that
+    are rejected before touching Mongo). Use it as `async with
+    api_client(db) as client`.
+    """
+    httpx = pytest.importorskip("httpx")
+    pytest.importorskip("fastapi")
+    from fastapi import FastAPI
+
+    from api.market_router import get_db, router as market_router
+
+    def make(db):
+        app = FastAPI()
+        app.include_router(market_router, prefix="/api")
+        app.dependency_overrides[get_db] = lambda: db
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    return make
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pymongo")
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from benchmarks.fixtures import make_markets
+from markets.kernels import compute_market_stats
+from markets.recommendations import recommend
+from markets.scoring import score_fields
+from markets.version import markets_version
+
+@pytest.fixture(autouse=True)
+def fresh_version(monkeypatch):
+    # Re-read the counter on every call and remember nothing from other tests
+    monkeypatch.setattr(markets_version, "ttl", 0)
+    monkeypatch.setattr(markets_version, "version", None)
+
+async def _seed(db, count=5):
+    markets = [{**market, **score_fields(market), "write_id": "w1"} for market in make_markets(count, seed=21)]
+    await db.markets.insert_many([dict(market) for market in markets])
+    return markets
+
+def test_bootstrap_returns_markets_stats_and_recommendations(with_db, api_client):
+    async def scenario(db):
+        markets = await _seed(db)
+        async with api_client(db) as client:
+            return markets, await client.get("/api/markets/bootstrap")
+
+    markets, response = with_db(scenario)
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {"version", "markets", "stats", "recommendations"}
+    assert sorted(market["id"] for market in body["markets"]) == sorted(market["id"] for market in markets)
+    for market in body["markets"]:
+        assert "analytics" in market
+        assert "scores" in market
+        assert not {"_id", "write_id", "score_state"} & set(market)
+    assert body["stats"] == compute_market_stats(markets)
+    assert body["recommendations"] == recommend(markets)
+
+def test_bootstrap_version_matches_the_etag_and_follows_writes(with_db, api_client):
+    async def scenario(db):
+        await _seed(db)
+        async with api_client(db) as client:
+            first = await client.get("/api/markets/bootstrap")
+            unchanged = await client.get("/api/markets/bootstrap", headers={"If-None-Match": first.headers["etag"]})
+            await markets_version.bump(db)
+            changed = await client.get("/api/markets/bootstrap", headers={"If-None-Match": first.headers["etag"]})
+        return first, unchanged, changed
+
+    first, unchanged, changed = with_db(scenario)
+    version = first.json()["version"]
+    assert first.headers["etag"] == f'W/"markets-{version}"'
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert changed.json()["version"] == version + 1
+    assert changed.headers["etag"] == f'W/"markets-{version + 1}"'
+
+def test_bootstrap_of_no_markets_is_empty(with_db, api_client):
+    async def scenario(db):
+        async with api_client(db) as client:
+            return await client.get("/api/markets/bootstrap")
+
+    body = with_db(scenario).json()
+    assert body["markets"] == []
+    assert body["stats"]["markets_count"] == 0
+    assert body["recommendations"]["overall_recommendation"] is None
@@ -0,0 +1,270 @@
+import asyncio
+from datetime import datetime
+
+import orjson
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from pymongo.errors import OperationFailure
+
+from benchmarks.fixtures import make_markets
+from markets.broadcaster import MarketBroadcaster
+from markets.scoring import score_fields
+
+NOT_PRIMARY_NO_SECONDARY_OK = 13435
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return dict(self._docs.pop(0))
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, *args, **kwargs):
+        return FakeCursor(self.docs)
+
+    async def find_one(self, *args, **kwargs):
+        return self.docs[0] if self.docs else None
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return self.docs[0]
+
+class FakeStream:
+    """A change stream that stays open and never reports a change"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def next(self):
+        await asyncio.Event().wait()
+
+class FailingStream(FakeStream):
+    def __init__(self, error):
+        self.error = error
+
+    async def __aenter__(self):
+        raise self.error
+
+class FakeDB:
+    """Just enough of a Motor database for the broadcaster; watch() raises the queued errors first"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.watch_calls = 0
+        self.markets = FakeCollection([
+            {"_id": i, **market, **score_fields(market), "write_id": "w1"}
+            for i, market in enumerate(make_markets(2, seed=1))
+        ])
+        self.collection_versions = FakeCollection([{"_id": "markets", "version": 1, "updated_at": datetime.utcnow()}])
+
+    def watch(self, *args, **kwargs):
+        self.watch_calls += 1
+        if self.errors:
+            return FailingStream(self.errors.pop(0))
+        return FakeStream()
+
+def _broadcaster(**kwargs):
+    return MarketBroadcaster(poll_interval=0.001, max_backoff=0.005, **kwargs)
+
+def test_transient_operation_failure_keeps_the_watcher_alive():
+    async def scenario():
+        db = FakeDB([OperationFailure("not primary", code=NOT_PRIMARY_NO_SECONDARY_OK)])
+        broadcaster = _broadcaster(max_failures=3)
+        await asyncio.wait_for(broadcaster.start(db), timeout=2)
+        await asyncio.sleep(0.01)
+        alive = not broadcaster._task.done()
+        broadcaster.stop()
+        return db, broadcaster, alive
+
+    db, broadcaster, alive = asyncio.run(scenario())
+    assert alive
+    assert db.watch_calls == 2
+    assert broadcaster.ready
+    assert len(broadcaster.markets()) == 2
+
+def test_repeated_failures_fall_back_to_polling():
+    async def scenario():
+        errors = [OperationFailure("cursor killed", code=237) for _ in range(5)]
+        db = FakeDB(errors)
+        broadcaster = _broadcaster(max_failures=2)
+        await asyncio.wait_for(broadcaster.start(db), timeout=2)
+        await asyncio.sleep(0.01)
+        alive = not broadcaster._task.done()
+        broadcaster.stop()
+        return db, broadcaster, alive
+
+    db, broadcaster, alive = asyncio.run(scenario())
+    assert alive
+    assert db.watch_calls == 2
+    assert broadcaster.ready
+
+def test_unsupported_change_streams_poll_straight_away():
+    async def scenario():
+        db = FakeDB([OperationFailure("no replica set", code=CHANGE_STREAMS_UNSUPPORTED)])
+        broadcaster = _broadcaster()
+        await asyncio.wait_for(broadcaster.start(db), timeout=2)
+        alive = not broadcaster._task.done()
+        broadcaster.stop()
+        return db, alive
+
+    db, alive = asyncio.run(scenario())
+    assert alive
+    assert db.watch_calls == 1
+
+def _event(message):
+    event, data = message.decode().rstrip("\n").split("\n")
+    return event[len("event: "):], orjson.loads(data[len("data: "):])
+
+def test_stream_payloads_use_the_public_market_projection():
+    async def scenario():
+        db = FakeDB([])
+        broadcaster = _broadcaster()
+        await asyncio.wait_for(broadcaster.start(db), timeout=2)
+        snapshot = _event(broadcaster.snapshot_message())
+
+        queue = broadcaster.subscribe()
+        doc = {**db.markets.docs[0], "supply_apy": 99.0, "write_id": "w2"}
+        broadcaster._apply([{
+            "operationType": "update",
+            "ns": {"coll": "markets"},
+            "documentKey": {"_id": doc["_id"]},
+            "fullDocument": doc,
+        }])
+        update = _event(queue.get_nowait())
+        broadcaster.stop()
+        return snapshot, update
+
+    (snapshot_event, snapshot), (update_event, update) = asyncio.run(scenario())
+    assert snapshot_event == "snapshot"
+    assert update_event == "markets"
+    for market in snapshot["markets"] + update["changed"]:
+        assert "write_id" not in market
+        assert "score_state" not in market
+        assert "_id" not in market
+        assert "analytics" in market
+        assert "scores" in market
+    assert update["changed"][0]["supply_apy"] == 99.0
+
+    # Recommendations are recomputed with the stats for every event
+    for payload in (snapshot, update):
+        assert set(payload["recommendations"]) == {
+            "best_supply_opportunities", "best_borrow_opportunities",
+            "safest_supply_markets", "overall_recommendation",
+        }
+    assert snapshot["recommendations"]["best_supply_opportunities"]
+    assert update["stats"]["markets_count"] == 2
+
+@pytest.fixture
+def fresh_version(monkeypatch):
+    from markets.version import markets_version
+    monkeypatch.setattr(markets_version, "ttl", 0)
+    monkeypatch.setattr(markets_version, "version", None)
+    return markets_version
+
+def _change(operation, doc=None, key=None):
+    change = {"operationType": operation, "ns": {"coll": "markets"}, "documentKey": {"_id": doc["_id"] if doc else key}}
+    if doc is not None:
+        change["fullDocument"] = dict(doc)
+    return change
+
+def test_change_batches_are_coalesced_into_one_event(fresh_version):
+    async def scenario():
+        db = FakeDB([])
+        broadcaster = _broadcaster()
+        await asyncio.wait_for(broadcaster.start(db), timeout=2)
+        broadcaster.stop()
+
+        batches = []
+        broadcaster.add_listener(lambda changed, removed: batches.append(([m["id"] for m in changed], removed)))
+        queue = broadcaster.subscribe()
+        first, second = db.markets.docs
+        added = {**make_markets(3, seed=2)[2], "_id": 99}
+        broadcaster._apply([
+            _change("update", {**first, "supply_apy": 1.0}),
+            _change("update", {**first, "supply_apy": 2.0}),
+            _change("insert", added),
+            _change("delete", key=second["_id"]),
+            {"ns": {"coll": "collection_versions"}, "operationType": "update",
+             "fullDocument": {"_id": "markets", "version": 5, "updated_at": datetime.utcnow()}},
+        ])
+        return broadcaster, queue, batches, first, second, added
+
+    broadcaster, queue, batches, first, second, added = asyncio.run(scenario())
+    assert queue.qsize() == 1
+    event, update = _event(queue.get_nowait())
+    assert event == "markets"
+    assert [m["id"] for m in update["changed"]] == [first["id"], added["id"]]
+    assert update["changed"][0]["supply_apy"] == 2.0
+    assert update["removed"] == [second["id"]]
+    assert update["version"] == 5
+    assert update["stats"]["markets_count"] == 2
+    assert batches == [([first["id"], added["id"]], [second["id"]])]
+    assert broadcaster.version == 5
+    assert broadcaster.markets_at(5) is not None
+    assert broadcaster.markets_at(6) is None
+
+def test_snapshot_lists_every_market_at_the_current_version(fresh_version):
+    async def scenario():
+        db = FakeDB([])
+        broadcaster = _broadcaster()
+        await asyncio.wait_for(broadcaster.start(db), timeout=2)
+        broadcaster.stop()
+        return db, _event(broadcaster.snapshot_message())
+
+    db, (event, snapshot) = asyncio.run(scenario())
+    assert event == "snapshot"
+    assert snapshot["version"] == 1
+    assert sorted(m["id"] for m in snapshot["markets"]) == sorted(doc["id"] for doc in db.markets.docs)
+    assert snapshot["stats"]["markets_count"] == 2
+
+def test_polling_publishes_changes_when_the_markets_version_moves(fresh_version):
+    async def scenario():
+        db = FakeDB([OperationFailure("no replica set", code=CHANGE_STREAMS_UNSUPPORTED)])
+        broadcaster = _broadcaster()
+        await asyncio.wait_for(broadcaster.start(db), timeout=2)
+        queue = broadcaster.subscribe()
+        await asyncio.sleep(0.01)
+        assert queue.empty()
+
+        # A write elsewhere: one market changed, one removed, then the version bumped
+        first, second = db.markets.docs
+        db.markets.docs = [{**first, "borrow_apy": 33.0}]
+        db.collection_versions.docs[0] = {**db.collection_versions.docs[0], "version": 2}
+        message = await asyncio.wait_for(queue.get(), timeout=2)
+        broadcaster.stop()
+        return broadcaster, message, first, second
+
+    broadcaster, message, first, second = asyncio.run(scenario())
+    event, update = _event(message)
+    assert event == "markets"
+    assert [m["id"] for m in update["changed"]] == [first["id"]]
+    assert update["changed"][0]["borrow_apy"] == 33.0
+    assert update["removed"] == [second["id"]]
+    assert update["version"] == 2
+    assert broadcaster.version == 2
+
+def test_stream_is_unavailable_until_the_snapshot_is_loaded(api_client, monkeypatch):
+    from markets.broadcaster import market_broadcaster
+    monkeypatch.setattr(market_broadcaster, "ready", False)
+
+    async def scenario():
+        async with api_client(None) as client:
+            return await client.get("/api/markets/stream")
+
+    assert asyncio.run(scenario()).status_code == 503
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+from cardano import cache as cache_module
+from cardano.cache import ChainCache, TTLCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    monkeypatch.setattr(cache_module, "METRICS_ENABLED", False)
+    return clock
+
+def test_get_returns_stored_value_until_it_expires(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    clock.now += 9.9
+    assert cache.get("a") == 1
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_per_entry_ttl_overrides_the_default(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("short", 1, ttl=1)
+    cache.set("long", 2, ttl=100)
+    clock.now += 50
+    assert cache.get("short", "gone") == "gone"
+    assert cache.get("long") == 2
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_set_refreshes_expiry_and_value(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    clock.now += 8
+    cache.set("a", 2)
+    clock.now += 8
+    assert cache.get("a") == 2
+
+def test_delete_and_clear(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
+
+def test_chain_cache_keeps_final_objects_past_the_pending_ttl(clock):
+    cache = ChainCache(maxsize=4, pending_ttl=20)
+    cache.set("tx-final", {"block": 1}, final=True)
+    cache.set("tx-pending", {"block": 2}, final=False)
+    clock.now += 1e6
+    assert cache.get("tx-final") == {"block": 1}
+    assert cache.get("tx-pending", "expired") == "expired"
+
+def test_chain_cache_promotes_pending_objects_once_final(clock):
+    cache = ChainCache(maxsize=4, pending_ttl=20)
+    cache.set("tx", "unconfirmed", final=False)
+    cache.set("tx", "confirmed", final=True)
+    assert cache.get("tx") == "confirmed"
+    assert len(cache.pending) == 0
+    assert len(cache.final) == 1
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pymongo")
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from api.market_router import market_etag
+from benchmarks.fixtures import make_markets
+from markets.derived import backfill_derived_fields
+from markets.version import markets_version
+
+def test_backfill_moves_market_and_collection_versions(with_db, monkeypatch):
+    # Fresh view of the counter: re-read on every call and nothing remembered from other tests
+    monkeypatch.setattr(markets_version, "ttl", 0)
+    monkeypatch.setattr(markets_version, "version", None)
+
+    async def scenario(db):
+        markets = make_markets(2, seed=5)
+        await db.markets.insert_many([dict(market) for market in markets])
+        before = await db.markets.find_one({"id": markets[0]["id"]})
+        collection_before, _ = await markets_version.current(db)
+
+        await backfill_derived_fields(db)
+        after = await db.markets.find_one({"id": markets[0]["id"]})
+        collection_after, _ = await markets_version.current(db)
+
+        # Nothing left to backfill, so nothing moves
+        await backfill_derived_fields(db)
+        collection_unchanged, _ = await markets_version.current(db)
+        return before, after, collection_before, collection_after, collection_unchanged
+
+    before, after, collection_before, collection_after, collection_unchanged = with_db(scenario)
+    assert "scores" in after
+    assert market_etag(after) != market_etag(before)
+    assert after["version"] == 2
+    assert collection_after == collection_before + 1
+    assert collection_unchanged == collection_after
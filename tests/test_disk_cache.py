@@ -0,0 +1,86 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+from cardano import cache as cache_module
+from cardano import disk_cache as disk_cache_module
+from cardano.cache import TTLCache
+from cardano.disk_cache import DiskCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(disk_cache_module.time, "time", clock)
+    monkeypatch.setattr(cache_module, "METRICS_ENABLED", False)
+    return clock
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "cache" / "chain.sqlite3"
+
+def _count(cache):
+    return cache._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+def test_entries_survive_a_restart(clock, path):
+    DiskCache(path, max_bytes=10**6).set("final", ["tx", 1], {"hash": "ab"}, ttl=None)
+    DiskCache(path, max_bytes=10**6).set("pending", "tip", 42, ttl=20)
+
+    reopened = DiskCache(path, max_bytes=10**6)
+    assert reopened.get("final", ["tx", 1]) == ({"hash": "ab"}, None)
+    assert reopened.get("pending", "tip") == (42, clock.now + 20)
+    assert reopened.get("final", ["tx", 2]) is None
+
+def test_expired_and_other_version_entries_are_ignored(clock, path):
+    cache = DiskCache(path, max_bytes=10**6)
+    cache.set("pending", "tip", 42, ttl=20)
+    cache.set("final", "block", 7)
+    clock.now += 20
+    assert cache.get("pending", "tip") is None
+    assert DiskCache(path, max_bytes=10**6, version=2).get("final", "block") is None
+
+def test_memory_tier_is_refilled_from_disk_after_a_restart(clock, path):
+    TTLCache(ttl=60, backing=DiskCache(path, max_bytes=10**6), namespace="assets").set("ada", {"supply": 45})
+
+    restarted = TTLCache(ttl=60, backing=DiskCache(path, max_bytes=10**6), namespace="assets")
+    assert len(restarted) == 0
+    assert restarted.get("ada") == {"supply": 45}
+    assert len(restarted) == 1
+
+def test_compaction_drops_expired_and_stale_version_entries(clock, path):
+    DiskCache(path, max_bytes=10**6, version=1).set("final", "old-format", 1)
+    cache = DiskCache(path, max_bytes=10**6, version=2)
+    cache.set("pending", "expired", 1, ttl=5)
+    cache.set("final", "kept", 2)
+    clock.now += 10
+
+    cache.compact()
+    assert _count(cache) == 1
+    assert cache.get("final", "kept") == (2, None)
+
+def test_compaction_evicts_oldest_entries_until_under_the_size_limit(clock, path):
+    cache = DiskCache(path, max_bytes=1000, compact_every=10**6)
+    for i in range(20):
+        cache.set("final", i, "x" * 98)  # 100 bytes of JSON each
+        clock.now += 1
+    assert _count(cache) == 20
+
+    cache.compact()
+    remaining = sorted(key for key in range(20) if cache.get("final", key) is not None)
+    assert remaining == list(range(11, 20))
+
+def test_writes_trigger_compaction_every_compact_every_writes(clock, path):
+    cache = DiskCache(path, max_bytes=10**6, compact_every=3)
+    cache.set("pending", "a", 1, ttl=1)
+    cache.set("pending", "b", 2, ttl=1)
+    clock.now += 2
+    assert _count(cache) == 2
+
+    cache.set("final", "c", 3)
+    assert _count(cache) == 1
@@ -0,0 +1,145 @@
+import asyncio
+import copy
+import math
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from positions import exposure
+from positions.exposure import (
+    ensure_exposure,
+    exposure_delta,
+    get_exposure,
+    health_bucket,
+    rebuild_exposure,
+)
+
+def _leg(asset_id, amount, amount_usd, used_as_collateral=True):
+    return {"asset_id": asset_id, "amount": str(amount), "amount_usd": amount_usd, "used_as_collateral": used_as_collateral}
+
+def _position(address, supplies, borrows=(), health_factor=math.inf):
+    return {
+        "user_address": address,
+        "supplies": list(supplies),
+        "borrows": list(borrows),
+        "health_factor": health_factor,
+        "updated_at": datetime(2024, 1, 1),
+    }
+
+@pytest.mark.parametrize("health_factor, bucket", [
+    (None, "no_debt"), (math.inf, "no_debt"), (0.5, "<100"), (1.0, "100-110"),
+    (1.2, "110-125"), (1.49, "125-150"), (1.5, "150-200"), (2.0, "200+"), (50.0, "200+"),
+])
+def test_health_bucket(health_factor, bucket):
+    assert health_bucket(health_factor) == bucket
+
+def test_new_position_adds_holders_amounts_and_health():
+    position = _position("addr1", [_leg("ada", 10, 20.0), _leg("ada", 5, 10.0)], [_leg("djed", 3, 3.0)], health_factor=1.3)
+    assert exposure_delta(None, position) == {
+        "ada": {"suppliers": 1, "supplied": 15.0, "supplied_usd": 30.0, "health.125-150": 1},
+        "djed": {"borrowers": 1, "borrowed": 3.0, "borrowed_usd": 3.0, "health.125-150": 1},
+    }
+
+def test_deleted_position_is_the_negated_insert():
+    position = _position("addr1", [_leg("ada", 10, 20.0)])
+    inserted = exposure_delta(None, position)
+    deleted = exposure_delta(position, None)
+    assert deleted == {asset: {name: -value for name, value in counters.items()} for asset, counters in inserted.items()}
+
+def test_repricing_moves_only_usd_amounts_and_health():
+    before = _position("addr1", [_leg("ada", 10, 20.0)], [_leg("djed", 4, 4.0)], health_factor=2.5)
+    after = _position("addr1", [_leg("ada", 10, 12.0)], [_leg("djed", 4, 4.0)], health_factor=1.5)
+    assert exposure_delta(before, after) == {
+        "ada": {"supplied_usd": -8.0, "health.200+": -1, "health.150-200": 1},
+        "djed": {"health.200+": -1, "health.150-200": 1},
+    }
+
+def test_unchanged_position_has_no_delta():
+    position = _position("addr1", [_leg("ada", 10, 20.0)])
+    assert exposure_delta(position, copy.deepcopy(position)) == {}
+
+def _counters(rows):
+    """Exposure rows without timestamps, with float counters rounded for comparison"""
+    return {
+        row["asset_id"]: {
+            name: round(value, 6) if isinstance(value, float) else value
+            for name, value in row.items() if name not in ("asset_id", "updated_at")
+        }
+        for row in rows
+    }
+
+async def _seed(db):
+    await db.markets.insert_many([
+        {"asset_id": "ada", "price_usd": 0.5, "collateral_factor": 0.7},
+        {"asset_id": "djed", "price_usd": 1.0, "collateral_factor": 0.8},
+    ])
+    await db.user_positions.insert_many([
+        _position(f"addr{i}", [_leg("ada", 100 * (i + 1), 100.0 * (i + 1))], [_leg("djed", 30 + i, 30.0 + i)], health_factor=1.0)
+        for i in range(20)
+    ])
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(exposure, "_built", False)
+
+def test_concurrent_workers_build_the_counters_once(with_db, fresh, monkeypatch):
+    calls = []
+    real_rebuild = exposure.rebuild_exposure
+
+    async def counting_rebuild(db):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return await real_rebuild(db)
+
+    monkeypatch.setattr(exposure, "rebuild_exposure", counting_rebuild)
+
+    async def scenario(db):
+        await _seed(db)
+        await asyncio.gather(*(ensure_exposure(db) for _ in range(5)))
+        await exposure.wait_for_exposure(db, poll=0.01)
+        state = await db.sync_state.find_one({"_id": exposure.STATE_ID})
+        return state, await get_exposure(db)
+
+    state, rows = with_db(scenario)
+    assert len(calls) == 1
+    assert state["built"] is True
+    assert "lease_until" not in state
+    ada = next(row for row in rows if row["asset_id"] == "ada")
+    assert ada["suppliers"] == 20
+    assert ada["health"]["100-110"] == 20
+
+def test_same_batch_written_twice_applies_its_delta_once(with_db, fresh):
+    from positions.revaluation import _write_batch
+
+    async def scenario(db):
+        await _seed(db)
+        await ensure_exposure(db)
+        batch = [doc async for doc in db.user_positions.find({}, {"_id": 0})]
+        prices, factors = {"ada": 0.5, "djed": 1.0}, {"ada": 0.7, "djed": 0.8}
+        first = await _write_batch(db, copy.deepcopy(batch), prices, factors, "run-a")
+        second = await _write_batch(db, copy.deepcopy(batch), prices, factors, "run-b")
+        incremental = _counters(await get_exposure(db))
+        await rebuild_exposure(db)
+        return first, second, incremental, _counters(await get_exposure(db))
+
+    first, second, incremental, rebuilt = with_db(scenario)
+    assert (first, second) == (20, 0)
+    assert incremental == rebuilt
+
+def test_concurrent_revaluations_keep_counters_exact(with_db, fresh):
+    from positions.revaluation import revalue_positions
+
+    async def scenario(db):
+        await _seed(db)
+        reports = await asyncio.gather(*(revalue_positions(db, batch_size=3, max_rate=0) for _ in range(3)))
+        incremental = _counters(await get_exposure(db))
+        await rebuild_exposure(db)
+        return reports, incremental, _counters(await get_exposure(db))
+
+    reports, incremental, rebuilt = with_db(scenario)
+    assert all(report["positions"] == 20 for report in reports)
+    assert incremental == rebuilt
+    assert rebuilt["ada"]["supplied_usd"] == pytest.approx(0.5 * sum(100 * (i + 1) for i in range(20)))
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from markets.history import _bucket, pick_resolution
+
+def test_short_recent_range_uses_minutes():
+    end = datetime.utcnow()
+    assert pick_resolution(end - timedelta(hours=2), end, max_points=500) == "1m"
+
+def test_range_with_too_many_minutes_uses_hours():
+    end = datetime.utcnow()
+    assert pick_resolution(end - timedelta(days=1), end, max_points=500) == "1h"
+
+def test_range_with_too_many_hours_uses_days():
+    end = datetime.utcnow()
+    assert pick_resolution(end - timedelta(days=60), end, max_points=500) == "1d"
+
+def test_max_points_is_inclusive():
+    end = datetime.utcnow()
+    assert pick_resolution(end - timedelta(minutes=500), end, max_points=500) == "1m"
+    assert pick_resolution(end - timedelta(minutes=501), end, max_points=500) == "1h"
+
+def test_short_range_past_the_minute_retention_uses_hours():
+    start = datetime.utcnow() - timedelta(days=30)
+    assert pick_resolution(start, start + timedelta(hours=1), max_points=500) == "1h"
+
+def test_short_range_past_every_retention_uses_days():
+    start = datetime.utcnow() - timedelta(days=800)
+    assert pick_resolution(start, start + timedelta(hours=1), max_points=500) == "1d"
+
+def test_bucket_truncates_to_the_start_of_its_width():
+    ts = datetime(2024, 5, 17, 13, 42, 31, 500000)
+    assert _bucket(ts, timedelta(minutes=1)) == datetime(2024, 5, 17, 13, 42)
+    assert _bucket(ts, timedelta(hours=1)) == datetime(2024, 5, 17, 13)
+    assert _bucket(ts, timedelta(days=1)) == datetime(2024, 5, 17)
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pymongo")
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+
+from api import market_router
+from benchmarks.fixtures import make_markets
+from markets.version import markets_version
+
+@pytest.fixture(autouse=True)
+def fresh_version(monkeypatch):
+    # Re-read the counter on every call and remember nothing from other tests
+    monkeypatch.setattr(markets_version, "ttl", 0)
+    monkeypatch.setattr(markets_version, "version", None)
+
+def _create_payload(market):
+    """A POST body for a fixture market; ids and timestamps are assigned by the API"""
+    return {k: v for k, v in market.items() if k not in ("id", "created_at", "updated_at")}
+
+async def _seed(db, count):
+    markets = make_markets(count, seed=31)
+    await db.markets.insert_many([dict(market, version=1) for market in markets])
+    return markets
+
+def test_bulk_requests_over_the_limit_are_413(api_client, monkeypatch):
+    monkeypatch.setattr(market_router, "MARKETS_BULK_MAX_ITEMS", 2)
+
+    async def scenario():
+        async with api_client(None) as client:
+            return await asyncio.gather(
+                client.post("/api/markets/bulk", json=[_create_payload(m) for m in make_markets(3)]),
+                client.put("/api/markets/bulk", json=[{"id": f"m{i}", "update": {}} for i in range(3)]),
+                client.post("/api/markets/batch-get", json={"ids": ["a", "b", "c"]}),
+            )
+
+    assert [response.status_code for response in asyncio.run(scenario())] == [413, 413, 413]
+
+def test_bulk_update_of_rate_derived_fields_is_422(api_client, monkeypatch):
+    monkeypatch.setattr("markets.derived.RATE_MODEL_ENABLED", True)
+
+    async def scenario():
+        async with api_client(None) as client:
+            return await client.put("/api/markets/bulk", json=[
+                {"id": "a", "update": {"collateral_factor": 0.5}},
+                {"id": "b", "update": {"supply_apy": 4.0}},
+            ])
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Item 1: supply_apy")
+
+def test_bulk_create_reports_each_item(with_db, api_client):
+    async def scenario(db):
+        (existing,) = await _seed(db, 1)
+        # A unique index the existence check does not know about, to fail one insert in the bulk write
+        await db.markets.create_index("name", unique=True)
+        new = [{**market, "name": f"New market {i}"} for i, market in enumerate(make_markets(3, seed=32))]
+        payload = [
+            _create_payload(new[0]),
+            _create_payload(existing),                              # asset already has a market
+            _create_payload(new[0]),                                # repeated within the request
+            _create_payload({**new[1], "name": existing["name"]}),  # rejected by the index
+            _create_payload(new[2]),
+        ]
+        version_before, _ = await markets_version.current(db)
+        async with api_client(db) as client:
+            response = await client.post("/api/markets/bulk", json=payload)
+        version_after, _ = await markets_version.current(db)
+        stored = await db.markets.find({}, {"_id": 0}).to_list(None)
+        return response, stored, version_before, version_after
+
+    response, stored, version_before, version_after = with_db(scenario)
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == ["created", "duplicate", "duplicate", "duplicate", "created"]
+    assert body["created"] == 2
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3, 4]
+    created_ids = {result["id"] for result in body["results"] if result["status"] == "created"}
+    assert created_ids <= {market["id"] for market in stored}
+    assert len(stored) == 3
+    assert all("scores" in market for market in stored)
+    assert version_after == version_before + 1
+
+def test_bulk_update_applies_good_items_and_reports_the_rest(with_db, api_client):
+    async def scenario(db):
+        first, second, third = await _seed(db, 3)
+        await db.markets.update_one({"id": third["id"]}, {"$set": {"version": 4}})
+        version_before, _ = await markets_version.current(db)
+        async with api_client(db) as client:
+            response = await client.put("/api/markets/bulk", json=[
+                {"id": first["id"], "update": {"collateral_factor": 0.5}},
+                {"id": second["id"], "update": {"collateral_factor": 0.6}, "version": 1},
+                {"id": third["id"], "update": {"collateral_factor": 0.7}, "version": 3},
+                {"id": "missing", "update": {"collateral_factor": 0.8}},
+            ])
+        version_after, _ = await markets_version.current(db)
+        stored = {doc["id"]: doc async for doc in db.markets.find({}, {"_id": 0})}
+        return response, stored, (first, second, third), version_before, version_after
+
+    response, stored, (first, second, third), version_before, version_after = with_db(scenario)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["updated"] == 2
+    assert [result["status"] for result in body["results"]] == ["updated", "updated", "conflict", "not_found"]
+    assert stored[first["id"]]["collateral_factor"] == 0.5
+    assert stored[first["id"]]["version"] == 2
+    assert stored[second["id"]]["collateral_factor"] == 0.6
+    assert stored[second["id"]]["version"] == 2
+    assert stored[third["id"]]["collateral_factor"] == third["collateral_factor"]
+    assert stored[third["id"]]["version"] == 4
+    assert version_after == version_before + 1
+
+def test_bulk_update_with_nothing_to_apply_leaves_the_version(with_db, api_client):
+    async def scenario(db):
+        await _seed(db, 1)
+        version_before, _ = await markets_version.current(db)
+        async with api_client(db) as client:
+            response = await client.put("/api/markets/bulk", json=[{"id": "missing", "update": {"collateral_factor": 0.5}}])
+        version_after, _ = await markets_version.current(db)
+        return response, version_before, version_after
+
+    response, version_before, version_after = with_db(scenario)
+    assert response.json()["updated"] == 0
+    assert version_after == version_before
+
+def test_batch_get_returns_found_markets_and_lists_the_missing(with_db, api_client):
+    async def scenario(db):
+        markets = await _seed(db, 3)
+        await db.markets.update_one({"id": markets[0]["id"]}, {"$set": {"write_id": "w1", "score_state": {}}})
+        async with api_client(db) as client:
+            response = await client.post("/api/markets/batch-get", json={"ids": [markets[0]["id"], "missing", markets[2]["id"]]})
+        return markets, response
+
+    markets, response = with_db(scenario)
+    assert response.status_code == 200
+    body = response.json()
+    assert sorted(market["id"] for market in body["markets"]) == sorted([markets[0]["id"], markets[2]["id"]])
+    assert body["missing"] == ["missing"]
+    for market in body["markets"]:
+        assert "analytics" in market
+        assert not {"_id", "write_id", "score_state"} & set(market)
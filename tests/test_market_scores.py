@@ -0,0 +1,146 @@
+import random
+
+import pytest
+
+from markets.kernels import compute_market_recommendations, compute_market_scores, update_apy_volatility
+
+CALM = {"supply_var": 0.0, "borrow_var": 0.0}
+
+def _market(market_id, **overrides):
+    market = {
+        "id": market_id,
+        "name": market_id.upper(),
+        "supply_apy": 4.0,
+        "borrow_apy": 6.0,
+        "collateral_factor": 0.75,
+        "utilization_rate": 0.5,
+        "liquidity_usd": 1e7,
+        "total_supply": "1000",
+        "total_borrow": "500",
+        "liquidity": "500",
+        "is_active": True,
+        "can_supply": True,
+        "can_borrow": True,
+        "can_use_as_collateral": True,
+    }
+    market.update(overrides)
+    return market
+
+def _scored(market_id, supply, borrow=0.0, safety=0.5, **overrides):
+    return _market(market_id, scores={"supply": supply, "borrow": borrow, "safety": safety}, **overrides)
+
+def test_deep_calm_market_scores_its_raw_apys():
+    scores = compute_market_scores(_market("ada"), CALM)
+    assert scores["usable_depth"] == pytest.approx(1.0)
+    assert scores["supply"] == pytest.approx(4.0)
+    assert scores["borrow"] == pytest.approx(-6.0)
+    assert scores["safety"] == pytest.approx(0.75)
+
+def test_volatility_is_penalised():
+    scores = compute_market_scores(_market("ada"), {"supply_var": 0.25, "borrow_var": 1.0}, volatility_penalty=2.0)
+    assert scores["supply_volatility"] == pytest.approx(0.5)
+    assert scores["supply"] == pytest.approx(4.0 - 1.0)
+    assert scores["borrow"] == pytest.approx(-6.0 - 2.0)
+    assert scores["safety"] == pytest.approx(0.75 / 1.5)
+
+def test_utilization_past_the_kink_reduces_usable_depth():
+    scores = compute_market_scores(_market("ada", utilization_rate=0.9), CALM, utilization_kink=0.8)
+    assert scores["usable_depth"] == pytest.approx(0.5)
+    assert scores["supply"] == pytest.approx(4.0 - 5.0 * 0.5)
+
+def test_empty_market_has_no_usable_depth():
+    scores = compute_market_scores(_market("ada", liquidity_usd=0), CALM)
+    assert scores["usable_depth"] == 0
+    assert scores["safety"] == 0
+
+def test_apy_volatility_starts_at_zero_then_tracks_changes():
+    state = update_apy_volatility(None, 4.0, 6.0, alpha=0.5)
+    assert state["supply_var"] == 0.0
+    state = update_apy_volatility(state, 6.0, 6.0, alpha=0.5)
+    assert state["supply_var"] == pytest.approx(2.0)
+    assert state["borrow_var"] == 0.0
+
+def test_recommendations_rank_by_score_and_leave_out_unscored_markets():
+    markets = [
+        _scored("low", supply=1.0, borrow=-9.0, safety=0.2),
+        _scored("high", supply=8.0, borrow=-3.0, safety=0.9),
+        _market("new"),
+        _scored("mid", supply=4.0, borrow=-5.0, safety=0.5),
+    ]
+    result = compute_market_recommendations(markets, high_score=5, low_score=2, k=2)
+    assert [m["id"] for m in result["best_supply_opportunities"]] == ["high", "mid"]
+    assert [m["id"] for m in result["best_borrow_opportunities"]] == ["high", "mid"]
+    assert [m["id"] for m in result["safest_supply_markets"]] == ["high", "mid"]
+    assert result["best_supply_opportunities"][0]["score"] == 8.0
+
+def test_overall_text_ignores_k_and_filters():
+    markets = [_scored("a", supply=9.0, liquidity_usd=10), _scored("b", supply=0.0), _scored("c", supply=0.0)]
+    everything = compute_market_recommendations(markets, high_score=5, low_score=2)
+    top_one = compute_market_recommendations(markets, high_score=5, low_score=2, k=1, min_liquidity_usd=1e6)
+    assert everything["overall_recommendation"] == top_one["overall_recommendation"]
+    assert "balanced" in everything["overall_recommendation"]
+    assert [m["id"] for m in top_one["best_supply_opportunities"]] == ["b"]
+
+def test_overall_text_follows_thresholds():
+    high = compute_market_recommendations([_scored("a", supply=6.0)], high_score=5, low_score=2)
+    low = compute_market_recommendations([_scored("a", supply=1.0)], high_score=5, low_score=2)
+    assert "high" in high["overall_recommendation"]
+    assert "low" in low["overall_recommendation"]
+
+def test_no_scored_markets_gives_empty_lists_and_no_overall_text():
+    result = compute_market_recommendations([_market("new")], high_score=5, low_score=2)
+    assert result["best_supply_opportunities"] == []
+    assert result["overall_recommendation"] is None
+
+def test_inactive_and_non_collateral_markets_are_filtered():
+    markets = [
+        _scored("off", supply=9.0, is_active=False),
+        _scored("plain", supply=7.0, can_use_as_collateral=False),
+        _scored("ok", supply=3.0),
+    ]
+    result = compute_market_recommendations(markets, high_score=5, low_score=2, collateral_only=True)
+    assert [m["id"] for m in result["best_supply_opportunities"]] == ["ok"]
+
+def _full_sort(markets, flag, score, k, min_liquidity_usd=0, collateral_only=False):
+    """Reference ranking: filter, then sort everything (stable, so ties keep input order)"""
+    eligible = [
+        m for m in markets
+        if m.get("scores") and m["is_active"] and m[flag]
+        and m["liquidity_usd"] >= min_liquidity_usd
+        and (not collateral_only or m["can_use_as_collateral"])
+    ]
+    return [m["id"] for m in sorted(eligible, key=lambda m: m["scores"][score], reverse=True)[:k]]
+
+@pytest.mark.parametrize("k", [1, 3, 7, 50])
+@pytest.mark.parametrize("min_liquidity_usd,collateral_only", [(0, False), (5e6, False), (0, True)])
+def test_top_k_selection_matches_a_full_sort_including_ties(k, min_liquidity_usd, collateral_only):
+    rng = random.Random(k)
+    markets = []
+    for i in range(40):
+        # Few distinct values, so most scores are tied with several others
+        market = _scored(
+            f"m{i}",
+            supply=rng.choice([1.0, 2.5, 4.0]),
+            borrow=rng.choice([-3.0, -1.0]),
+            safety=rng.choice([0.2, 0.5, 0.9]),
+            liquidity_usd=rng.choice([1e6, 1e7]),
+            is_active=rng.random() > 0.1,
+            can_borrow=rng.random() > 0.2,
+            can_use_as_collateral=rng.random() > 0.3,
+        )
+        if i % 9 == 0:
+            market.pop("scores")
+        markets.append(market)
+
+    result = compute_market_recommendations(
+        markets, high_score=5, low_score=2, k=k, min_liquidity_usd=min_liquidity_usd, collateral_only=collateral_only,
+    )
+    filters = {"k": k, "min_liquidity_usd": min_liquidity_usd, "collateral_only": collateral_only}
+    assert [m["id"] for m in result["best_supply_opportunities"]] == _full_sort(markets, "can_supply", "supply", **filters)
+    assert [m["id"] for m in result["best_borrow_opportunities"]] == _full_sort(markets, "can_borrow", "borrow", **filters)
+    assert [m["id"] for m in result["safest_supply_markets"]] == _full_sort(markets, "can_supply", "safety", **filters)
+
+def test_tied_scores_keep_market_order():
+    markets = [_scored("b", supply=3.0), _scored("a", supply=3.0), _scored("c", supply=5.0), _scored("d", supply=3.0)]
+    result = compute_market_recommendations(markets, high_score=5, low_score=2, k=3)
+    assert [m["id"] for m in result["best_supply_opportunities"]] == ["c", "b", "a"]
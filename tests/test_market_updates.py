@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from benchmarks.fixtures import make_markets
+
+UPDATE = {"collateral_factor": 0.6}
+
+async def _seed(db):
+    (market,) = make_markets(1, seed=11)
+    await db.markets.insert_one(dict(market, version=1))
+    return market["id"]
+
+def test_update_without_if_match_is_428(api_client):
+    async def scenario():
+        async with api_client(None) as client:
+            return await client.put("/api/markets/ada0", json=UPDATE)
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 428
+    assert "If-Match" in response.json()["detail"]
+
+def test_malformed_if_match_is_400(api_client):
+    async def scenario():
+        async with api_client(None) as client:
+            return await client.put("/api/markets/ada0", json=UPDATE, headers={"If-Match": '"abc"'})
+
+    assert asyncio.run(scenario()).status_code == 400
+
+def test_update_at_the_current_version_returns_the_new_etag(with_db, api_client):
+    async def scenario(db):
+        market_id = await _seed(db)
+        async with api_client(db) as client:
+            etag = (await client.get(f"/api/markets/{market_id}")).headers["etag"]
+            response = await client.put(f"/api/markets/{market_id}", json=UPDATE, headers={"If-Match": etag})
+        return etag, response, await db.markets.find_one({"id": market_id})
+
+    etag, response, stored = with_db(scenario)
+    assert etag == '"1"'
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"2"'
+    assert response.json()["collateral_factor"] == 0.6
+    assert stored["version"] == 2
+    assert "scores" in stored
+
+def test_update_at_a_stale_version_is_412_and_writes_nothing(with_db, api_client):
+    async def scenario(db):
+        market_id = await _seed(db)
+        async with api_client(db) as client:
+            first = await client.put(f"/api/markets/{market_id}", json=UPDATE, headers={"If-Match": '"1"'})
+            stale = await client.put(f"/api/markets/{market_id}", json={"collateral_factor": 0.1}, headers={"If-Match": '"1"'})
+        return first, stale, await db.markets.find_one({"id": market_id})
+
+    first, stale, stored = with_db(scenario)
+    assert first.status_code == 200
+    assert stale.status_code == 412
+    assert "current version 2" in stale.json()["detail"]
+    assert stored["collateral_factor"] == 0.6
+    assert stored["version"] == 2
+
+def test_concurrent_updates_at_one_version_apply_once(with_db, api_client):
+    async def scenario(db):
+        market_id = await _seed(db)
+        async with api_client(db) as client:
+            responses = await asyncio.gather(*(
+                client.put(f"/api/markets/{market_id}", json={"collateral_factor": value}, headers={"If-Match": '"1"'})
+                for value in (0.5, 0.6, 0.7)
+            ))
+        return responses, await db.markets.find_one({"id": market_id})
+
+    responses, stored = with_db(scenario)
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 412, 412]
+    assert stored["version"] == 2
+
+def test_if_match_star_updates_the_current_version(with_db, api_client):
+    async def scenario(db):
+        market_id = await _seed(db)
+        async with api_client(db) as client:
+            await client.put(f"/api/markets/{market_id}", json=UPDATE, headers={"If-Match": '"1"'})
+            return await client.put(f"/api/markets/{market_id}", json={"reserve_factor": 0.2}, headers={"If-Match": "*"})
+
+    response = with_db(scenario)
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"3"'
+
+def test_update_of_a_missing_market_is_404(with_db, api_client):
+    async def scenario(db):
+        async with api_client(db) as client:
+            return [
+                await client.put("/api/markets/missing", json=UPDATE, headers={"If-Match": if_match})
+                for if_match in ('"1"', "*")
+            ]
+
+    assert [response.status_code for response in with_db(scenario)] == [404, 404]
+
+def test_delete_at_a_stale_version_is_412(with_db, api_client):
+    async def scenario(db):
+        market_id = await _seed(db)
+        async with api_client(db) as client:
+            stale = await client.delete(f"/api/markets/{market_id}", headers={"If-Match": '"7"'})
+            current = await client.delete(f"/api/markets/{market_id}", headers={"If-Match": '"1"'})
+            missing = await client.delete(f"/api/markets/{market_id}")
+        return stale, current, missing
+
+    stale, current, missing = with_db(scenario)
+    assert (stale.status_code, current.status_code, missing.status_code) == (412, 200, 404)
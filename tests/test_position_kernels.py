@@ -0,0 +1,34 @@
+import math
+
+from markets.kernels import compute_borrow_limit, compute_health_factor, compute_position_health
+
+def _supply(asset_id, amount_usd, used_as_collateral=True):
+    return {"asset_id": asset_id, "amount_usd": amount_usd, "used_as_collateral": used_as_collateral}
+
+def test_borrow_limit_weights_collateral_by_factor():
+    supplies = [_supply("ada", 1000.0), _supply("djed", 200.0)]
+    assert compute_borrow_limit(supplies, {"ada": 0.75, "djed": 0.5}) == 850.0
+
+def test_borrow_limit_skips_non_collateral_and_unknown_markets():
+    supplies = [_supply("ada", 1000.0, used_as_collateral=False), _supply("gone", 500.0), _supply("djed", 100.0)]
+    assert compute_borrow_limit(supplies, {"ada": 0.75, "djed": 0.5}) == 50.0
+
+def test_borrow_limit_of_no_supplies_is_zero():
+    assert compute_borrow_limit([], {"ada": 0.75}) == 0
+
+def test_health_factor_is_limit_over_borrowed():
+    assert compute_health_factor(750.0, 500.0) == 1.5
+
+def test_health_factor_is_infinite_without_debt():
+    assert math.isinf(compute_health_factor(750.0, 0.0))
+    assert math.isinf(compute_health_factor(0.0, 0.0))
+
+def test_position_health_keeps_input_order():
+    positions = [
+        {"supplies": [_supply("ada", 1000.0)], "total_borrowed_usd": 500.0},
+        {"supplies": [_supply("ada", 100.0)], "total_borrowed_usd": 0.0},
+    ]
+    first, second = compute_position_health(positions, {"ada": 0.8})
+    assert first == {"borrow_limit_usd": 800.0, "health_factor": 1.6}
+    assert second["borrow_limit_usd"] == 80.0
+    assert math.isinf(second["health_factor"])
@@ -0,0 +1,102 @@
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+pymongo = pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from benchmarks.fixtures import make_markets
+from markets import prices as prices_module
+from markets.prices import ingest_prices, price_changed, usd_values
+
+def test_price_changed_is_relative():
+    assert price_changed(100.0, 100.5, min_change=0.01) is False
+    assert price_changed(100.0, 101.0, min_change=0.01) is True
+    assert price_changed(100.0, 99.0, min_change=0.01) is True
+
+def test_first_price_always_counts_as_changed():
+    assert price_changed(None, 1.0, min_change=0.01) is True
+    assert price_changed(0.0, 1.0, min_change=0.01) is True
+
+def test_usd_values_scale_by_decimals():
+    market = {"decimals": 6, "total_supply": "5000000", "total_borrow": "2000000", "liquidity": "3000000"}
+    assert usd_values(market, 2.0) == {"total_supply_usd": 10.0, "total_borrow_usd": 4.0, "liquidity_usd": 6.0}
+
+async def _seed(db, count=3):
+    markets = make_markets(count, seed=3)
+    for market in markets:
+        market["price_updated_at"] = datetime.utcnow()
+    await db.markets.insert_many([dict(market) for market in markets])
+    return markets
+
+async def _version(db):
+    doc = await db.collection_versions.find_one({"_id": "markets"})
+    return doc["version"] if doc else 0
+
+def test_ingest_applies_changed_prices_in_one_versioned_write(with_db):
+    async def scenario(db):
+        markets = await _seed(db)
+        results = await ingest_prices(db, [
+            {"asset_id": markets[0]["asset_id"], "price_usd": markets[0]["price_usd"] * 2},
+            {"asset_id": markets[1]["asset_id"], "price_usd": markets[1]["price_usd"]},
+            {"asset_id": "unknown", "price_usd": 1.0},
+        ])
+        stored = {doc["id"]: doc async for doc in db.markets.find({}, {"_id": 0})}
+        return markets, results, stored, await _version(db)
+
+    markets, results, stored, version = with_db(scenario)
+    assert [result["status"] for result in results] == ["updated", "skipped", "not_found"]
+    updated = stored[markets[0]["id"]]
+    assert updated["price_usd"] == pytest.approx(markets[0]["price_usd"] * 2)
+    assert updated["total_supply_usd"] == pytest.approx(usd_values(markets[0], updated["price_usd"])["total_supply_usd"])
+    assert updated["version"] == 2
+    assert "scores" in updated
+    assert stored[markets[1]["id"]].get("version", 1) == 1
+    assert version == 1
+
+def test_market_changed_between_read_and_write_is_a_conflict(with_db, monkeypatch):
+    real_derive_fields = prices_module.derive_fields
+
+    async def scenario(db):
+        markets = await _seed(db, count=2)
+        client = pymongo.MongoClient(os.environ["TEST_MONGO_URL"])
+
+        def derive_after_concurrent_write(applied):
+            # Another writer moves the first market on after the batch read it
+            client[db.name].markets.update_one({"id": markets[0]["id"]}, {"$set": {"version": 2, "reserve_factor": 0.5}})
+            return real_derive_fields(applied)
+
+        monkeypatch.setattr(prices_module, "derive_fields", derive_after_concurrent_write)
+        try:
+            results = await ingest_prices(db, [
+                {"asset_id": market["asset_id"], "price_usd": market["price_usd"] * 3} for market in markets
+            ])
+        finally:
+            client.close()
+        stored = {doc["id"]: doc async for doc in db.markets.find({}, {"_id": 0})}
+        return markets, results, stored
+
+    markets, results, stored = with_db(scenario)
+    assert [result["status"] for result in results] == ["conflict", "updated"]
+    assert results[0]["error"]
+    conflicted, updated = stored[markets[0]["id"]], stored[markets[1]["id"]]
+    assert conflicted["price_usd"] == pytest.approx(markets[0]["price_usd"])
+    assert conflicted["reserve_factor"] == 0.5
+    assert conflicted["version"] == 2
+    assert updated["price_usd"] == pytest.approx(markets[1]["price_usd"] * 3)
+    assert updated["version"] == 2
+
+def test_concurrent_batches_never_both_apply_to_one_version(with_db):
+    async def scenario(db):
+        (market,) = await _seed(db, count=1)
+        batches = [[{"asset_id": market["asset_id"], "price_usd": market["price_usd"] * factor}] for factor in (2, 3, 4)]
+        results = await asyncio.gather(*(ingest_prices(db, batch) for batch in batches))
+        return results, await db.markets.find_one({"id": market["id"]}, {"_id": 0})
+
+    results, stored = with_db(scenario)
+    statuses = [batch[0]["status"] for batch in results]
+    assert set(statuses) <= {"updated", "conflict"}
+    assert stored["version"] == 1 + statuses.count("updated")
@@ -0,0 +1,69 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("dotenv")
+
+from markets.rates import compute_rates, rate_fields
+
+MODEL = {"base_rate": 2.0, "slope1": 4.0, "slope2": 75.0, "optimal_utilization": 0.8}
+
+def _rates(total_supply, total_borrow, reserve_factor=0.0, **model):
+    params = {**MODEL, **model}
+    return compute_rates(
+        np.array([float(total_supply)]),
+        np.array([float(total_borrow)]),
+        np.array([reserve_factor]),
+        *(np.array([params[name]]) for name in ("base_rate", "slope1", "slope2", "optimal_utilization")),
+    )
+
+def _apy(rate):
+    return math.expm1(rate / 100) * 100
+
+def test_empty_market_pays_nothing_and_charges_the_base_rate():
+    utilization, supply_apy, borrow_apy = _rates(0, 0)
+    assert utilization[0] == 0
+    assert supply_apy[0] == 0
+    assert borrow_apy[0] == pytest.approx(_apy(2.0))
+
+def test_rates_below_the_kink_follow_slope1():
+    utilization, supply_apy, borrow_apy = _rates(1000, 400, reserve_factor=0.1)
+    borrow_rate = 2.0 + 4.0 * 0.4 / 0.8
+    assert utilization[0] == pytest.approx(0.4)
+    assert borrow_apy[0] == pytest.approx(_apy(borrow_rate))
+    assert supply_apy[0] == pytest.approx(_apy(borrow_rate * 0.4 * 0.9))
+
+def test_rates_above_the_kink_follow_slope2():
+    _, _, borrow_apy = _rates(1000, 900)
+    assert borrow_apy[0] == pytest.approx(_apy(2.0 + 4.0 + 75.0 * 0.1 / 0.2))
+
+def test_rates_are_continuous_at_the_kink():
+    _, _, at_kink = _rates(1000, 800)
+    _, _, just_above = _rates(1000, 800.001)
+    assert just_above[0] == pytest.approx(at_kink[0], abs=1e-3)
+
+def test_over_borrowed_market_is_clipped_to_full_utilization():
+    utilization, _, borrow_apy = _rates(100, 150)
+    assert utilization[0] == 1.0
+    assert borrow_apy[0] == pytest.approx(_apy(2.0 + 4.0 + 75.0))
+
+def test_rates_are_computed_per_market():
+    utilization, _, _ = compute_rates(
+        np.array([100.0, 200.0]), np.array([50.0, 50.0]), np.zeros(2),
+        np.zeros(2), np.full(2, 4.0), np.full(2, 75.0), np.full(2, 0.8),
+    )
+    assert utilization.tolist() == [0.5, 0.25]
+
+def test_rate_fields_store_the_default_model_when_missing():
+    fields = rate_fields([
+        {"total_supply": "1000", "total_borrow": "400", "rate_model": MODEL},
+        {"total_supply": "1000", "total_borrow": "0"},
+    ])
+    assert fields[0]["rate_model"] == MODEL
+    assert fields[0]["utilization_rate"] == 0.4
+    assert set(fields[1]["rate_model"]) == set(MODEL)
+    assert fields[1]["supply_apy"] == 0
+
+def test_rate_fields_of_nothing_is_empty():
+    assert rate_fields([]) == []
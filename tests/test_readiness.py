@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import readiness
+
+class FakeSyncState:
+    """Warm-up records keyed by _id; only the queries readiness makes are supported"""
+
+    def __init__(self):
+        self.docs = {}
+        self.failing = False
+
+    async def update_one(self, query, update, upsert=False):
+        if self.failing:
+            raise RuntimeError("not primary")
+        self.docs.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+
+    async def delete_many(self, query):
+        pass
+
+    async def count_documents(self, query):
+        return sum(1 for doc in self.docs.values() if doc.get("boot_id") == query["boot_id"] and "warmed_at" in doc)
+
+class FakeDB:
+    def __init__(self):
+        self.sync_state = FakeSyncState()
+
+    async def command(self, name):
+        return {"ok": 1}
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(readiness, "BLOCKFROST_API_KEY", "")
+    monkeypatch.setattr(readiness, "READINESS_CACHE_TTL", 0)
+    monkeypatch.setattr(readiness, "SERVER_BOOT_ID", "boot-1")
+    monkeypatch.setattr(readiness, "SERVER_WORKERS", 2)
+    monkeypatch.setattr(readiness, "_warmers", [])
+    monkeypatch.setattr(readiness, "_warm_state", {})
+    monkeypatch.setattr(readiness, "_last_check", {})
+    monkeypatch.setattr(readiness, "_warm_recorded", False)
+    monkeypatch.setattr(readiness, "_workers_warm", False)
+    return FakeDB()
+
+def _other_worker(db, pid, boot_id="boot-1"):
+    db.sync_state.docs[f"warmup:{boot_id}:{pid}"] = {"boot_id": boot_id, "pid": pid, "warmed_at": 1}
+
+def test_not_ready_until_this_worker_has_warmed_up(fresh):
+    readiness.register_warmer("slow", lambda: asyncio.sleep(0))
+    _other_worker(fresh, 1)
+    result = asyncio.run(readiness.check_readiness(fresh))
+    assert not result["ready"]
+    assert result["caches"] == {"slow": "pending"}
+
+def test_not_ready_until_every_worker_has_warmed_up(fresh):
+    readiness.register_warmer("quick", lambda: asyncio.sleep(0))
+
+    async def scenario():
+        await readiness.warm_up(fresh)
+        alone = await readiness.check_readiness(fresh)
+        _other_worker(fresh, 1, boot_id="an-earlier-start")
+        still_alone = await readiness.check_readiness(fresh)
+        _other_worker(fresh, 1)
+        both = await readiness.check_readiness(fresh)
+        return alone, still_alone, both
+
+    alone, still_alone, both = asyncio.run(scenario())
+    assert not alone["ready"]
+    assert alone["workers"] == {"warm": 1, "expected": 2}
+    assert not still_alone["ready"]
+    assert both["ready"]
+    assert both["workers"] == {"warm": 2, "expected": 2}
+
+def test_failed_warmers_still_count_as_warm(fresh):
+    async def broken():
+        raise RuntimeError("cold")
+
+    readiness.register_warmer("broken", broken)
+    _other_worker(fresh, 1)
+
+    async def scenario():
+        await readiness.warm_up(fresh)
+        return await readiness.check_readiness(fresh)
+
+    result = asyncio.run(scenario())
+    assert result["ready"]
+    assert result["caches"] == {"broken": "failed"}
+
+def test_warm_up_is_recorded_by_a_later_check_if_the_first_write_failed(fresh):
+    _other_worker(fresh, 1)
+    fresh.sync_state.failing = True
+    asyncio.run(readiness.warm_up(fresh))
+    assert not readiness._warm_recorded
+
+    fresh.sync_state.failing = False
+    result = asyncio.run(readiness.check_readiness(fresh))
+    assert result["ready"]
+
+def test_readiness_is_latched_once_every_worker_was_warm(fresh):
+    _other_worker(fresh, 1)
+
+    async def scenario():
+        await readiness.warm_up(fresh)
+        first = await readiness.check_readiness(fresh)
+        fresh.sync_state.docs.clear()
+        return first, await readiness.check_readiness(fresh)
+
+    first, later = asyncio.run(scenario())
+    assert first["ready"]
+    assert later["ready"]
@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import orjson
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("bson")
+pytest.importorskip("dotenv")
+
+from bson import Decimal128, ObjectId
+from fastapi import Request
+
+from api.responses import FastJSONResponse, dumps, is_not_modified, public_market, validator_headers
+
+MODIFIED = datetime(2024, 5, 17, 13, 42, 31, 500000)
+
+def _request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+def test_validator_headers_use_http_dates():
+    headers = validator_headers('"7"', MODIFIED)
+    assert headers == {"ETag": '"7"', "Last-Modified": "Fri, 17 May 2024 13:42:31 GMT"}
+
+def test_no_validators_is_modified():
+    assert not is_not_modified(_request(), '"7"', MODIFIED)
+
+@pytest.mark.parametrize("if_none_match", ['"7"', 'W/"7"', '"3", "7"', "*"])
+def test_matching_etag_is_not_modified(if_none_match):
+    assert is_not_modified(_request(if_none_match=if_none_match), '"7"', MODIFIED)
+
+def test_weak_etag_matches_strong_tag():
+    assert is_not_modified(_request(if_none_match='"markets-4"'), 'W/"markets-4"', MODIFIED)
+
+def test_other_etag_is_modified_even_if_dates_match():
+    request = _request(if_none_match='"6"', if_modified_since="Fri, 17 May 2024 13:42:31 GMT")
+    assert not is_not_modified(request, '"7"', MODIFIED)
+
+def test_if_modified_since_compares_at_second_resolution():
+    assert is_not_modified(_request(if_modified_since="Fri, 17 May 2024 13:42:31 GMT"), '"7"', MODIFIED)
+    assert not is_not_modified(_request(if_modified_since="Fri, 17 May 2024 13:42:30 GMT"), '"7"', MODIFIED)
+
+def test_unparseable_if_modified_since_is_modified():
+    assert not is_not_modified(_request(if_modified_since="yesterday"), '"7"', MODIFIED)
+
+def test_dumps_encodes_bson_and_decimal_values():
+    object_id = ObjectId("65f0c0ffee0123456789abcd")
+    document = {
+        "_id": object_id,
+        "amount": Decimal("12.5"),
+        "stored": Decimal128("0.25"),
+        "ids": [object_id],
+    }
+    assert orjson.loads(dumps(document)) == {
+        "_id": "65f0c0ffee0123456789abcd",
+        "amount": 12.5,
+        "stored": 0.25,
+        "ids": ["65f0c0ffee0123456789abcd"],
+    }
+
+def test_dumps_writes_datetimes_in_iso_8601():
+    assert dumps({"at": MODIFIED}) == b'{"at":"2024-05-17T13:42:31.500000"}'
+    assert dumps(MODIFIED.replace(tzinfo=timezone.utc)) == b'"2024-05-17T13:42:31.500000+00:00"'
+
+def test_dumps_writes_non_finite_floats_as_null_and_keeps_non_string_keys():
+    assert orjson.loads(dumps([float("nan"), float("inf"), -float("inf")])) == [None, None, None]
+    assert orjson.loads(dumps({1: "a", 2.5: "b"})) == {"1": "a", "2.5": "b"}
+
+def test_dumps_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+def test_fast_json_response_renders_with_dumps():
+    response = FastJSONResponse({"id": ObjectId("65f0c0ffee0123456789abcd"), "at": MODIFIED})
+    assert response.media_type == "application/json"
+    assert response.body == dumps({"id": "65f0c0ffee0123456789abcd", "at": MODIFIED})
+
+def test_public_market_drops_private_fields():
+    market = {"_id": ObjectId(), "id": "ada", "write_id": "w1", "score_state": {"supply_apy": 3.0}, "scores": {}}
+    assert public_market(market) == {"id": "ada", "scores": {}}
@@ -0,0 +1,66 @@
+import math
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from positions import exposure
+from positions.revaluation import revalue, revalue_positions
+
+def _leg(asset_id, amount, amount_usd=0.0, used_as_collateral=True):
+    return {"asset_id": asset_id, "amount": str(amount), "amount_usd": amount_usd, "used_as_collateral": used_as_collateral}
+
+def _position(address, supplies, borrows=()):
+    return {"user_address": address, "supplies": list(supplies), "borrows": list(borrows), "updated_at": datetime(2024, 1, 1)}
+
+def test_revalue_reprices_legs_and_recomputes_totals():
+    position = _position("addr1", [_leg("ada", 100), _leg("djed", 50, used_as_collateral=False)], [_leg("djed", 20)])
+    (totals,) = revalue([position], {"ada": 2.0, "djed": 1.0}, {"ada": 0.5, "djed": 0.9})
+    assert [leg["amount_usd"] for leg in position["supplies"]] == [200.0, 50.0]
+    assert position["borrows"][0]["amount_usd"] == 20.0
+    assert totals == {"total_supplied_usd": 250.0, "total_borrowed_usd": 20.0, "borrow_limit_usd": 100.0, "health_factor": 5.0}
+
+def test_revalue_keeps_stored_value_for_unpriced_markets():
+    position = _position("addr1", [_leg("gone", 10, amount_usd=33.0), _leg("ada", 1)])
+    (totals,) = revalue([position], {"ada": 2.0}, {"ada": 0.5, "gone": 0.5})
+    assert position["supplies"][0]["amount_usd"] == 33.0
+    assert totals["total_supplied_usd"] == 35.0
+
+def test_revalue_keeps_positions_separate_and_in_order():
+    positions = [
+        _position("addr1", [_leg("ada", 10)]),
+        _position("addr2", [], [_leg("ada", 1)]),
+        _position("addr3", [_leg("ada", 1)], [_leg("ada", 1)]),
+    ]
+    first, second, third = revalue(positions, {"ada": 3.0}, {"ada": 0.5})
+    assert first["total_supplied_usd"] == 30.0
+    assert math.isinf(first["health_factor"])
+    assert second == {"total_supplied_usd": 0.0, "total_borrowed_usd": 3.0, "borrow_limit_usd": 0.0, "health_factor": 0.0}
+    assert third["health_factor"] == 0.5
+
+def test_revalue_positions_writes_prices_and_reports(with_db, monkeypatch):
+    monkeypatch.setattr(exposure, "_built", False)
+
+    async def scenario(db):
+        await db.markets.insert_many([
+            {"asset_id": "ada", "price_usd": 2.0, "collateral_factor": 0.5},
+            {"asset_id": "djed", "price_usd": 1.0, "collateral_factor": 0.8},
+        ])
+        await db.user_positions.insert_many([
+            _position("addr1", [_leg("ada", 100)], [_leg("djed", 20)]),
+            _position("addr2", [_leg("djed", 10)]),
+        ])
+        report = await revalue_positions(db, ["ada"], batch_size=1, max_rate=0)
+        return report, await db.user_positions.find_one({"user_address": "addr1"})
+
+    report, stored = with_db(scenario)
+    assert report["positions"] == 1
+    assert report["updated"] == 1
+    assert report["skipped"] == 0
+    assert stored["supplies"][0]["amount_usd"] == 200.0
+    assert stored["total_borrowed_usd"] == 20.0
+    assert stored["health_factor"] == 5.0
+    assert stored["revalued_at"] is not None
@@ -0,0 +1,89 @@
+import random
+import statistics
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from markets.rolling import RollingSeries
+
+def _brute_force(samples, window):
+    """TWAP and volatility over the last `window` intervals, recomputed from scratch"""
+    intervals = list(zip(samples, samples[1:]))[-window:]
+    durations = [end_ts - ts for (ts, _), (end_ts, _) in intervals]
+    weighted = [value * duration for ((_, value), _), duration in zip(intervals, durations)]
+    returns = [end_value / value - 1 for (_, value), (_, end_value) in intervals]
+    twap = sum(weighted) / sum(durations)
+    volatility = statistics.stdev(returns) if len(returns) > 1 else 0.0
+    return twap, volatility
+
+def _random_samples(count, seed=7):
+    rng = random.Random(seed)
+    ts, value, samples = 0.0, 100.0, []
+    for _ in range(count):
+        ts += rng.uniform(1, 120)
+        value *= 1 + rng.gauss(0, 0.02)
+        samples.append((ts, value))
+    return samples
+
+def test_first_sample_only_sets_last_value_and_ema():
+    series = RollingSeries(window=4, alpha=0.5)
+    series.add(10.0, 2.0)
+    assert series.metrics() == {"last": 2.0, "twap": 2.0, "ema": 2.0, "volatility": 0.0, "samples": 0}
+
+def test_twap_weights_values_by_how_long_they_held():
+    series = RollingSeries(window=4, alpha=0.5)
+    series.add(0.0, 1.0)
+    series.add(30.0, 4.0)
+    series.add(40.0, 9.0)
+    metrics = series.metrics()
+    assert metrics["twap"] == pytest.approx((1.0 * 30 + 4.0 * 10) / 40)
+    assert metrics["ema"] == pytest.approx(0.5 * 9.0 + 0.5 * (0.5 * 4.0 + 0.5 * 1.0))
+    assert metrics["last"] == 9.0
+    assert metrics["samples"] == 2
+
+@pytest.mark.parametrize("count", [3, 8, 9, 50, 333])
+def test_metrics_match_a_full_recomputation(count):
+    samples = _random_samples(count)
+    series = RollingSeries(window=8, alpha=0.2)
+    for ts, value in samples:
+        series.add(ts, value)
+    twap, volatility = _brute_force(samples, window=8)
+    metrics = series.metrics()
+    assert metrics["samples"] == min(count - 1, 8)
+    assert metrics["twap"] == pytest.approx(twap, rel=1e-9)
+    assert metrics["volatility"] == pytest.approx(volatility, rel=1e-6, abs=1e-12)
+
+def test_out_of_order_sample_counts_as_zero_duration():
+    series = RollingSeries(window=4, alpha=0.5)
+    series.add(100.0, 1.0)
+    series.add(50.0, 2.0)
+    series.add(60.0, 3.0)
+    assert series.metrics()["twap"] == pytest.approx(2.0)
+
+def test_checkpoint_restores_the_same_series():
+    samples = _random_samples(21)
+    series = RollingSeries(window=8, alpha=0.2)
+    for ts, value in samples[:13]:
+        series.add(ts, value)
+
+    restored = RollingSeries.from_state(series.to_state(), window=8, alpha=0.2)
+    assert restored.metrics() == pytest.approx(series.metrics())
+
+    for ts, value in samples[13:]:
+        series.add(ts, value)
+        restored.add(ts, value)
+    assert restored.metrics() == pytest.approx(series.metrics())
+
+def test_checkpoint_with_another_window_keeps_only_the_latest_value():
+    series = RollingSeries(window=8, alpha=0.2)
+    for ts, value in _random_samples(5):
+        series.add(ts, value)
+
+    restored = RollingSeries.from_state(series.to_state(), window=16, alpha=0.2)
+    metrics = restored.metrics()
+    assert metrics["samples"] == 0
+    assert metrics["last"] == series.last_value
+    assert metrics["ema"] == series.ema
+    assert metrics["twap"] == series.last_value
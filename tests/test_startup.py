@@ -0,0 +1,21 @@
+import pytest
+
+# The probe imports server.py in a fresh interpreter, which needs the full web stack
+pytest.importorskip("fastapi")
+pytest.importorskip("dotenv")
+pytest.importorskip("prometheus_client")
+
+from benchmarks.bench_startup import IMPORT_BUDGET_MS, LAZY_MODULES, measure_import
+
+@pytest.fixture(scope="module")
+def cold_import():
+    return measure_import(repeat=3)
+
+def test_heavy_modules_stay_out_of_server_import(cold_import):
+    _, lazy_loaded = cold_import
+    assert {"motor", "pymongo", "numpy"} <= set(LAZY_MODULES)
+    assert lazy_loaded == []
+
+def test_server_import_is_within_budget(cold_import):
+    seconds, _ = cold_import
+    assert seconds * 1000 <= IMPORT_BUDGET_MS
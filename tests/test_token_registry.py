@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("dotenv")
+
+from cardano import token_registry
+from cardano.token_registry import STATE_ID, sync_token_registry
+
+def _unit(i):
+    return f"{i:056x}" + "746f6b656e"
+
+class FakeApi:
+    """Blockfrost listing of count assets, newest (highest i) first; on_call runs before every call"""
+
+    def __init__(self, count, on_call=None):
+        self.units = [_unit(i) for i in reversed(range(count))]
+        self.on_call = on_call
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.on_call is not None:
+            self.on_call(self.calls)
+
+    def assets(self, count, page, order):
+        self._call()
+        start = (page - 1) * count
+        return [SimpleNamespace(asset=unit) for unit in self.units[start:start + count]]
+
+    def asset(self, unit):
+        self._call()
+        return SimpleNamespace(
+            asset=unit, policy_id=unit[:56], asset_name=unit[56:], fingerprint=None, quantity="1",
+            initial_mint_tx_hash=None, metadata={"ticker": "TKN", "name": "Token"},
+        )
+
+class FakeSyncState:
+    def __init__(self, owner):
+        self.owner = owner
+        self.updates = 0
+
+    async def update_one(self, query, update):
+        self.updates += 1
+        return SimpleNamespace(matched_count=int(query["lease_owner"] == self.owner))
+
+def test_lease_is_renewed_once_half_of_it_has_passed(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(token_registry.time, "monotonic", lambda: clock.now)
+    db = SimpleNamespace(sync_state=FakeSyncState("me"))
+    lease = token_registry._Lease(db, "me", duration=60)
+
+    async def scenario():
+        await lease.renew()
+        clock.now += 29
+        await lease.renew()
+        assert db.sync_state.updates == 0
+        clock.now += 2
+        await lease.renew()
+        assert db.sync_state.updates == 1
+        await lease.renew()
+        assert db.sync_state.updates == 1
+
+        db.sync_state.owner = "someone else"
+        clock.now += 31
+        with pytest.raises(token_registry._LeaseLost):
+            await lease.renew()
+
+    asyncio.run(scenario())
+
+def test_sync_stores_tokens_and_releases_the_lease(with_db):
+    async def scenario(db):
+        api = FakeApi(150)
+        synced = await sync_token_registry(db, api, max_pages=3, lease_duration=60)
+        return synced, await db.sync_state.find_one({"_id": STATE_ID}), await db.token_registry.count_documents({})
+
+    synced, state, stored = with_db(scenario)
+    assert synced == stored == 150
+    assert state["head_asset"] == _unit(149)
+    assert state["tail_done"]
+    assert "lease_until" not in state
+    assert "lease_owner" not in state
+
+def test_sync_skips_while_another_worker_holds_the_lease(with_db):
+    async def scenario(db):
+        await sync_token_registry(db, FakeApi(0), lease_duration=60)
+        await db.sync_state.update_one({"_id": STATE_ID}, {"$set": {"lease_until": datetime(2999, 1, 1)}})
+        api = FakeApi(10)
+        return await sync_token_registry(db, api, lease_duration=60), api.calls
+
+    assert with_db(scenario) == (0, 0)
+
+def test_run_whose_lease_was_taken_over_stops_without_moving_the_high_water_mark(with_db):
+    async def scenario(db):
+        loop = asyncio.get_running_loop()
+
+        def take_over(calls):
+            # Another worker takes the expired lease while this run is still fetching details
+            if calls == 5:
+                asyncio.run_coroutine_threadsafe(
+                    db.sync_state.update_one({"_id": STATE_ID}, {"$set": {"lease_owner": "other", "head_asset": "theirs"}}),
+                    loop,
+                ).result()
+
+        api = FakeApi(50, on_call=take_over)
+        # A zero-length lease is renewed (and checked) after every Blockfrost call
+        synced = await sync_token_registry(db, api, max_pages=1, lease_duration=0)
+        return synced, api.calls, await db.sync_state.find_one({"_id": STATE_ID})
+
+    synced, calls, state = with_db(scenario)
+    assert synced == 0
+    assert calls == 5
+    assert state["lease_owner"] == "other"
+    assert state["head_asset"] == "theirs"